@@ -0,0 +1,139 @@
+"""Budget alerts: concurrent entries racing past a threshold, and the cost per save.
+
+    python benchmarks/bench_budgets.py [--workers 8] [--threads 2] [--entries 25]
+
+race   --workers processes x --threads threads save --entries ₹10 Food entries
+       each for one user at the same moment, against a Food budget they
+       overrun together. Exactly one save may report the 80% alert and
+       exactly one the 100% alert, and the month-to-date total must equal
+       the sum of the entries (rollups.verify finds no drift). Exits 1 if not.
+cost   one process: save_transactions with the budget check, against a plain
+       save followed by a month-to-date get_summary (what a check without
+       running totals would cost).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER = "racer"
+AMOUNT = 10
+
+
+def _import_app(workdir):
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("GROQ_KEY", "bench")
+    import main
+    return main
+
+
+def _entry(category="Food"):
+    return {"amount": AMOUNT, "category": category, "description": "bench", "is_unnecessary": False,
+            "tx_type": "expense"}
+
+
+def setup(workdir, limit):
+    main = _import_app(workdir)
+    main.init()
+    main.budgets.set_budget(USER, "Food", limit)
+
+
+def racer(workdir, threads, entries, barrier, results):
+    main = _import_app(workdir)
+    alerts = []
+
+    def save():
+        for _ in range(entries):
+            _, triggered = main.save_transactions(USER, [_entry()])
+            alerts.extend(triggered)
+
+    workers = [threading.Thread(target=save) for _ in range(threads)]
+    barrier.wait()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    results.put(alerts)
+
+
+def race(args):
+    ctx = multiprocessing.get_context("spawn")
+    workdir = tempfile.mkdtemp(prefix="bench_budgets_")
+    total = args.workers * args.threads * args.entries * AMOUNT
+    limit = total // 2
+    init = ctx.Process(target=setup, args=(workdir, limit))
+    init.start()
+    init.join()
+
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=racer, args=(workdir, args.threads, args.entries, barrier, results))
+             for _ in range(args.workers)]
+    started = time.perf_counter()
+    for p in procs:
+        p.start()
+    alerts = [alert for _ in procs for alert in results.get()]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    main = _import_app(workdir)
+    import database
+    import rollups
+    (_, _, spent), = main.budgets.budget_report(USER)
+    drift = rollups.verify(database.engine_for(USER), USER)
+    by_threshold = {t: [a for a in alerts if a[1] == t] for t in main.budgets.THRESHOLDS}
+    ok = all(len(hits) == 1 for hits in by_threshold.values()) and spent == total * 100 and not drift
+
+    print(f"race: {args.workers} processes x {args.threads} threads x {args.entries} entries of ₹{AMOUNT} "
+          f"into a ₹{limit} Food budget in {elapsed:.1f}s")
+    for threshold, hits in by_threshold.items():
+        at = ", ".join(f"₹{spent_minor // 100}" for _, _, spent_minor, _ in hits)
+        print(f"  {threshold:>3}% alerts: {len(hits)} (at {at})")
+    print(f"  month-to-date ₹{spent // 100} of ₹{total} saved, rollup drift: {len(drift)} -> {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def cost(args):
+    main = _import_app(tempfile.mkdtemp(prefix="bench_budgets_cost_"))
+    import utils
+    main.init()
+    for category in ("Food", "Travel", "Bills"):
+        main.budgets.set_budget(USER, category, 10 ** 7)
+
+    started = time.perf_counter()
+    for _ in range(args.saves):
+        main.save_transactions(USER, [_entry("Food")])
+    with_check = (time.perf_counter() - started) / args.saves
+
+    started = time.perf_counter()
+    for _ in range(args.saves):
+        main.save_transactions("other", [_entry("Food")])
+        utils.get_summary("other", period="this_month", tx_type="expense")
+    with_summary = (time.perf_counter() - started) / args.saves
+
+    print(f"cost: save + budget check {with_check * 1000:.2f} ms/entry, "
+          f"save + month-to-date get_summary {with_summary * 1000:.2f} ms/entry "
+          f"({args.saves} sequential saves each)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8, help="racing processes")
+    parser.add_argument("--threads", type=int, default=2, help="racing threads per process")
+    parser.add_argument("--entries", type=int, default=25, help="entries per thread")
+    parser.add_argument("--saves", type=int, default=2000, help="saves timed in the cost run")
+    args = parser.parse_args()
+
+    ok = race(args)
+    # Its own process: main is bound to the race's database directory.
+    cost_run = multiprocessing.get_context("spawn").Process(target=cost, args=(args,))
+    cost_run.start()
+    cost_run.join()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,92 @@
+"""Concurrent webhook throughput with a slow, fake Groq and Telegram.
+
+Measures the time until every update has been processed by the job queue,
+not just acknowledged.
+
+    python benchmarks/bench_concurrency.py --requests 200 --concurrency 50 --llm-latency 0.2
+    python benchmarks/bench_concurrency.py --blocking   # the old, loop-blocking LLM call
+
+Runs against a throwaway SQLite file in a temp directory.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench_concurrency_"))
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+import llm  # noqa: E402
+import database  # noqa: E402
+import telegram_sender  # noqa: E402
+
+LLM_REPLY = '{"amount": 50, "category": "Other", "description": "gift", "is_unnecessary": false, "tx_type": "expense"}'
+
+
+def fake_groq(latency, blocking):
+    async def create(**kwargs):
+        if blocking:
+            time.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=LLM_REPLY))])
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def update(i):
+    # Two numbers and no lexicon keyword, so the fast parser and cache both miss.
+    return {"message": {"text": f"{i} for gift number {i}", "chat": {"id": i}, "from": {"id": i}}}
+
+
+async def run(args):
+    database.engine.echo = False
+    main.init()
+    llm.client = fake_groq(args.llm_latency, args.blocking)
+    telegram_sender.sender = telegram_sender.TelegramSender(
+        "bench",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True})),
+        global_rate=1e9,
+        global_burst=10 ** 9,
+    )
+
+    main.job_queue.workers = args.workers
+    main.job_queue.start()
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                response = await client.post("/webhook", json=update(i))
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        acked = time.perf_counter() - started
+        await main.job_queue.join()
+        elapsed = time.perf_counter() - started
+
+    mode = "blocking" if args.blocking else "async"
+    print(f"{mode}: {args.requests} requests, concurrency {args.concurrency}, "
+          f"llm latency {args.llm_latency}s -> acked in {acked:.2f}s, done in {elapsed:.2f}s, "
+          f"{args.requests / elapsed:.1f} req/s")
+    print("job queue:", main.job_queue.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=50, help="job queue workers")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--blocking", action="store_true", help="simulate the old sync Groq client")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,173 @@
+"""Scheduled digests for a large user base, and a crash halfway through.
+
+    python benchmarks/bench_digests.py [--users 100000] [--shards 0]
+
+Seeds --users subscribers with a week of daily rollups, then runs the
+weekly digest against benchmarks/fake_telegram.py in-process with the rate
+limits lifted, so the numbers are the job's own cost (query, render,
+claim, send) rather than Telegram's ~30 msg/s cap:
+
+    batch      digests.run: one grouped query per database, rendered and fanned out
+    per-user   what the same build costs as one get_summary call per user (sampled)
+    crash      a run killed mid-way, then rerun: nobody may get the digest twice;
+               then --resend-unconfirmed for the claims the crash left open
+
+At the real limit, delivery takes users / DIGEST_RATE seconds.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.environ["FAKE_TELEGRAM_GLOBAL_LIMIT"] = str(10 ** 9)
+os.environ["FAKE_TELEGRAM_LATENCY"] = "0.002"
+os.chdir(tempfile.mkdtemp(prefix="bench_digests_"))
+
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Health"]
+TODAY = date(2026, 3, 9)  # a Monday: the weekly digest covers Mar 2-8
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingSender:
+    """Delivers through sender, then raises on call number crash_after, like a killed process."""
+
+    def __init__(self, sender, crash_after):
+        self.sender = sender
+        self.crash_after = crash_after
+        self.calls = 0
+
+    async def send_message(self, chat_id, text):
+        self.calls += 1
+        if self.calls > self.crash_after:
+            raise Crash()
+        return await self.sender.send_message(chat_id, text)
+
+
+def seed(args):
+    from sqlalchemy.dialects import sqlite
+    import database
+    from models import DailyRollup, DigestSubscription
+
+    rng = random.Random(1)
+    start = TODAY - timedelta(days=7)
+    started = time.perf_counter()
+    by_engine = collections.defaultdict(list)
+    for n in range(args.users):
+        user_id = str(10 ** 6 + n)
+        for _ in range(args.rows_per_user):
+            by_engine[database.engine_for(user_id)].append({
+                "user_id": user_id,
+                "day": start + timedelta(days=rng.randrange(7)),
+                "tx_type": "income" if rng.random() < 0.1 else "expense",
+                "category": rng.choice(CATEGORIES),
+                "is_unnecessary": rng.random() < 0.3,
+                "total_minor": rng.randint(1000, 500000),
+                "count": 1,
+            })
+    # Random picks can repeat a rollup key; keep the first.
+    insert = sqlite.insert(DailyRollup).on_conflict_do_nothing()
+    for engine, rows in by_engine.items():
+        with engine.begin() as conn:
+            conn.execute(insert, rows)
+    with database.engine.begin() as conn:
+        conn.execute(DigestSubscription.__table__.insert(), [
+            {"user_id": str(10 ** 6 + n), "chat_id": 10 ** 6 + n, "weekly": True, "monthly": False,
+             "created_at": datetime.utcnow()}
+            for n in range(args.users)
+        ])
+    print(f"seeded {args.users} subscribers, {sum(map(len, by_engine.values()))} rollup rows "
+          f"over {len(by_engine)} database(s) in {time.perf_counter() - started:.1f}s")
+
+
+def report(name, stats):
+    print(f"{name:<9} {stats['sent']:>7} sent {stats['failed']:>3} failed | "
+          f"build {stats['build_seconds']:6.2f}s send {stats['send_seconds']:6.2f}s "
+          f"({stats['messages_per_second']:.0f} msg/s) | already sent {stats['already_sent']}, "
+          f"unconfirmed {stats['unconfirmed']}, claimed elsewhere {stats['claimed_elsewhere']}")
+
+
+def duplicates(messages):
+    per_chat = collections.Counter(payload["chat_id"] for _, payload in messages)
+    return sum(1 for count in per_chat.values() if count > 1)
+
+
+async def main(args):
+    import httpx
+    import database
+    import digests
+    import utils
+    from sqlalchemy import delete
+    from models import DigestDelivery
+    from telegram_sender import TelegramSender
+    from benchmarks import fake_telegram
+
+    database.create_db()
+    seed(args)
+
+    def unthrottled():
+        return TelegramSender("bench", base_url="http://fake", transport=httpx.ASGITransport(app=fake_telegram.app),
+                              global_rate=1e9, global_burst=10 ** 9, chat_rate=1e9, chat_burst=10 ** 9)
+
+    fake_telegram.reset()
+    sender = unthrottled()
+    started = time.perf_counter()
+    stats = await digests.run("weekly", TODAY, sender)
+    total = time.perf_counter() - started
+    report("batch", stats)
+    print(f"          {stats['sent'] / total:.0f} users/s end to end ({total:.1f}s), "
+          f"{duplicates(fake_telegram.state['messages'])} users messaged twice")
+    await sender.close()
+
+    # The same build, one get_summary call per user, over a sample.
+    sample = [str(10 ** 6 + n) for n in random.Random(2).sample(range(args.users), min(args.sample, args.users))]
+    now = datetime.combine(TODAY, datetime.min.time())
+    start, end = utils.resolve_period("last_week", now=now)
+    started = time.perf_counter()
+    for user_id in sample:
+        utils.build_summary_reply(utils.get_summary(
+            user_id, start_date=start.date().isoformat(), end_date=(end.date() - timedelta(days=1)).isoformat()
+        ), "Weekly")
+    per_user = (time.perf_counter() - started) / len(sample)
+    print(f"per-user  get_summary x {len(sample)}: {per_user * 1000:.2f} ms/user, "
+          f"{per_user * args.users:.1f}s projected for {args.users} users vs {stats['build_seconds']:.1f}s batched")
+
+    # Crash halfway, then rerun the same period.
+    with database.engine.begin() as conn:
+        conn.execute(delete(DigestDelivery))
+    fake_telegram.reset()
+    sender = unthrottled()
+    try:
+        await digests.run("weekly", TODAY, CrashingSender(sender, args.users // 2))
+    except Crash:
+        pass
+    delivered = len(fake_telegram.state['messages'])
+    print(f"crash     killed after {delivered} deliveries")
+    for name, resend in (("rerun", False), ("resend", True)):
+        report(name, await digests.run("weekly", TODAY, sender, resend_unconfirmed=resend))
+        messages = fake_telegram.state['messages']
+        print(f"          {len({p['chat_id'] for _, p in messages})} of {args.users} users reached, "
+              f"{duplicates(messages)} messaged twice")
+    await sender.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--rows-per-user", type=int, default=4, help="rollup rows per user in the week")
+    parser.add_argument("--shards", type=int, default=0, help="DB_SHARDS for the run")
+    parser.add_argument("--sample", type=int, default=2000, help="users timed through get_summary")
+    args = parser.parse_args()
+    os.environ["DB_SHARDS"] = str(args.shards)
+    asyncio.run(main(args))
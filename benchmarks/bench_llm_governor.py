@@ -0,0 +1,111 @@
+"""LLM governor under a burst, under 429s and through a Groq outage.
+
+    python benchmarks/bench_llm_governor.py [--requests 200]
+
+Groq is benchmarks/fake_groq.py in-process; every message misses the fast
+parser, so each one needs the LLM (or its local fallback).
+
+    burst    --requests concurrent categorize calls over --distinct texts:
+             Groq calls made vs. messages (single-flight coalescing)
+    429s     the same burst with 30% of Groq answers rate-limited
+    outage   Groq hangs: the first calls time out, the circuit opens and the
+             rest are answered by the local parser; then Groq recovers and a
+             probe call closes the circuit again
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench_llm_governor_"))
+
+import httpx  # noqa: E402
+from groq import AsyncGroq  # noqa: E402
+import database  # noqa: E402
+import llm  # noqa: E402
+import llm_cache  # noqa: E402
+import llm_governor  # noqa: E402
+from benchmarks import fake_groq  # noqa: E402
+
+NAMES = ["priya", "rahul", "amit", "neha", "arjun", "kavya", "rohan", "isha", "dev", "meera"]
+
+
+def fresh(timeout=2.0, cooldown=1.0):
+    """A new governor and an empty LLM cache, so every run starts cold."""
+    llm_governor.governor = llm_governor.LLMGovernor(
+        timeout=timeout, retry_base=0.05, breaker=llm_governor.CircuitBreaker(failures=5, cooldown=cooldown),
+    )
+    llm_cache._memory.clear()
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM llmcacheentry")
+    fake_groq.reset()
+
+
+def message(i, distinct):
+    n = i % distinct
+    return f"{100 + n} for {NAMES[n % len(NAMES)]}'s present"
+
+
+async def timed(text):
+    started = time.perf_counter()
+    try:
+        await llm.categorize_expense(text)
+        ok = True
+    except Exception as e:
+        print("failed:", type(e).__name__, e)
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def report(name, results):
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+    ok = sum(1 for _, success in results if success)
+    print(f"{name:<9} {ok}/{len(results)} answered | p50 {statistics.median(latencies):7.1f} ms "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:7.1f} ms | groq calls {fake_groq.state['calls']:4} "
+          f"(429: {fake_groq.state['rate_limited']}) | {llm_governor.governor.stats()}")
+
+
+async def main(args):
+    database.create_db()
+    llm.client = AsyncGroq(
+        api_key="bench", base_url="http://fake-groq", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_groq.app)),
+    )
+    fake_groq.LATENCY = args.latency
+
+    fresh()
+    report("burst", await asyncio.gather(*(timed(message(i, args.distinct)) for i in range(args.requests))))
+
+    fresh(timeout=10.0)
+    fake_groq.ERROR_RATE = 0.3
+    report("429s", await asyncio.gather(*(timed(message(i, args.distinct)) for i in range(args.requests))))
+    fake_groq.ERROR_RATE = 0.0
+
+    # Outage: one message at a time, as a trickle of users would send them.
+    fresh(timeout=0.5, cooldown=1.0)
+    fake_groq.LATENCY = 60.0
+    rng = random.Random(1)
+    results = [await timed(message(rng.randrange(10 ** 6), 10 ** 6)) for _ in range(args.outage_requests)]
+    report("outage", results)
+
+    fake_groq.LATENCY = args.latency
+    await asyncio.sleep(1.1)
+    results = [await timed(message(rng.randrange(10 ** 6), 10 ** 6)) for _ in range(5)]
+    report("recovery", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct texts in the burst")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency when healthy, seconds")
+    parser.add_argument("--outage-requests", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""Per-entry latency: N single-entry messages vs one N-entry message.
+
+    python benchmarks/bench_multi_entry.py --sizes 1 5 10 20 --llm-latency 0.3
+
+Entries use words the fast parser doesn't know, so every message costs one
+(fake) LLM call; the difference is how many calls and commits N entries take.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench_multi_entry_"))
+
+import httpx  # noqa: E402
+import database  # noqa: E402
+import llm  # noqa: E402
+import main  # noqa: E402
+import telegram_sender  # noqa: E402
+
+MESSAGE_RE = re.compile(r'Message: "(.*)"')
+
+
+def fake_groq(latency):
+    async def create(messages, **kwargs):
+        await asyncio.sleep(latency)
+        text = MESSAGE_RE.search(messages[0]["content"]).group(1)
+        entries = [
+            {"amount": 10, "category": "Other", "description": part.strip(), "is_unnecessary": False, "tx_type": "expense"}
+            for part in text.split(",")
+        ]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(entries)))])
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def update(user, text):
+    return {"message": {"text": text, "chat": {"id": user}, "from": {"id": user}}}
+
+
+async def run(args):
+    database.engine.echo = False
+    main.init()
+    llm.client = fake_groq(args.llm_latency)
+    telegram_sender.sender = telegram_sender.TelegramSender(
+        "bench",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True})),
+        global_rate=1e9, global_burst=10 ** 9, chat_rate=1e9, chat_burst=10 ** 9,
+    )
+
+    for n in args.sizes:
+        # Distinct texts for the two runs so the LLM cache can't help either.
+        entries = [f"{10 + i} for gift item {n}-{i}" for i in range(n)]
+        batch = [f"{10 + i} for gift box {n}-{i}" for i in range(n)]
+
+        started = time.perf_counter()
+        for entry in entries:
+            await main.handle_update(update(f"single{n}", entry))
+        single = (time.perf_counter() - started) / n
+
+        started = time.perf_counter()
+        await main.handle_update(update(f"batch{n}", ", ".join(batch)))
+        batched = (time.perf_counter() - started) / n
+
+        print(f"{n:>3} entries: one per message {single * 1000:7.1f} ms/entry | "
+              f"one message {batched * 1000:7.1f} ms/entry | {single / batched:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""Long-polling ingestion throughput against the fake Telegram API.
+
+Queues updates in benchmarks/fake_telegram.py, runs poller.Poller until
+every one has been processed, and reports updates/s. Groq is faked with a
+fixed latency; the fake API's send limits are lifted so only ingestion and
+processing are measured.
+
+    python benchmarks/bench_poller.py --updates 1000 --chats 100 --limit 100
+
+Runs against a throwaway SQLite file in a temp directory.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench_poller_"))
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+import llm  # noqa: E402
+import database  # noqa: E402
+import poller  # noqa: E402
+import telegram_sender  # noqa: E402
+from benchmarks import fake_telegram  # noqa: E402
+from benchmarks.bench_concurrency import fake_groq  # noqa: E402
+
+
+async def run(args):
+    database.engine.echo = False
+    llm.client = fake_groq(args.llm_latency, blocking=False)
+    fake_telegram.reset()
+    fake_telegram.GLOBAL_LIMIT = fake_telegram.CHAT_LIMIT = 10 ** 9
+    telegram_sender.sender = telegram_sender.TelegramSender(
+        "bench",
+        base_url="http://fake",
+        transport=httpx.ASGITransport(app=fake_telegram.app),
+        global_rate=1e9, global_burst=10 ** 9, chat_rate=1e9, chat_burst=10 ** 9,
+    )
+    main.job_queue.workers = args.workers
+
+    for i in range(args.updates):
+        # Distinct amounts and no lexicon keyword: every update takes the LLM path.
+        fake_telegram.push_update(i % args.chats, f"{i} for gift number {i}")
+
+    runner = poller.Poller(timeout=1, limit=args.limit)
+    started = time.perf_counter()
+    task = asyncio.create_task(runner.run())
+    while runner.stats()['updates'] < args.updates:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    runner.stop()
+    await task
+
+    print(f"{args.updates} updates from {args.chats} chats, batch limit {args.limit}, "
+          f"{args.workers} workers, llm latency {args.llm_latency}s -> "
+          f"{elapsed:.2f}s, {args.updates / elapsed:.1f} updates/s")
+    print("poller:", runner.stats())
+    print("left unconfirmed on the fake API:", len(fake_telegram.state['updates']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=100, help="getUpdates batch size")
+    parser.add_argument("--workers", type=int, default=50, help="job queue workers")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
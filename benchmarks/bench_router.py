@@ -0,0 +1,101 @@
+"""Message router: accuracy on the labeled corpus and messages/s.
+
+    python benchmarks/bench_router.py [--seconds 2] [--show-misses]
+
+Compares router.route() with the checks it replaced in main.handle_update
+(exact command comparisons, then is_expense_message). The old path only
+decided "entry or not", so it is scored on that question; the router is
+also scored on the full command / entry / summary / unknown label.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from router import route  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_corpus.tsv")
+
+
+def legacy_is_expense_message(text):
+    """main.is_expense_message as it was before the router."""
+    text_lower = text.lower()
+    if re.search(r'\d+(\.\d+)?', text):
+        return True
+    number_words = [
+        'zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+        'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen',
+        'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety',
+        'hundred', 'thousand', 'million', 'billion'
+    ]
+    words = re.findall(r'\b\w+\b', text_lower)
+    if any(word in number_words for word in words):
+        return True
+    currency_indicators = ['₹', 'rs', 'rupee', 'rupees', 'dollar', 'dollars', '$', 'euro', 'euros', '£', 'pound', 'pounds']
+    if any(ind in text_lower for ind in currency_indicators):
+        return True
+    summary_keywords = ['summary', 'report', 'show', 'waste', 'month', 'week', 'expenses', 'spent last']
+    if any(keyword in text_lower for keyword in summary_keywords):
+        return False
+    return False
+
+
+def legacy_route(text):
+    if text in ('/start', '/help', '/undo', '/export') or text.startswith('/export '):
+        return "command"
+    return "entry" if legacy_is_expense_message(text) else "other"
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [tuple(line.rstrip("\n").split("\t", 1)) for line in f if line.strip() and not line.startswith("#")]
+
+
+def throughput(fn, messages, seconds):
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for message in messages:
+            fn(message)
+        count += len(messages)
+    return count / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0, help="timing run length per router")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    messages = [text for _, text in corpus]
+    labels = Counter(label for label, _ in corpus)
+    print(f"corpus: {len(corpus)} messages ({', '.join(f'{k} {v}' for k, v in sorted(labels.items()))})")
+
+    misses = Counter()
+    entry_right = {"legacy": 0, "router": 0}
+    for label, text in corpus:
+        decided = route(text)
+        if decided["kind"] != label:
+            misses[label] += 1
+            if args.show_misses:
+                print(f"  miss: {label:>7} -> {decided['kind']:<7} {decided['confidence']:.2f}  {text!r}")
+        old = legacy_route(text)
+        entry_right["legacy"] += (old == "entry") == (label == "entry") and (old == "command") == (label == "command")
+        entry_right["router"] += (decided["kind"] == "entry") == (label == "entry") and \
+            (decided["kind"] == "command") == (label == "command")
+
+    total = len(corpus)
+    print(f"router label accuracy: {(total - sum(misses.values())) / total:.1%}  "
+          + "  ".join(f"{label} {labels[label] - misses[label]}/{labels[label]}" for label in sorted(labels)))
+    for name in ("legacy", "router"):
+        print(f"{name:>6} command/entry/other accuracy: {entry_right[name] / total:.1%}")
+
+    legacy_rate = throughput(legacy_route, messages, args.seconds)
+    router_rate = throughput(route, messages, args.seconds)
+    print(f"legacy: {legacy_rate:10,.0f} messages/s")
+    print(f"router: {router_rate:10,.0f} messages/s ({router_rate / legacy_rate:.1f}x)")
@@ -0,0 +1,128 @@
+"""Legacy vs compact transaction schema: file size, insert rate, query time.
+
+    python benchmarks/bench_schema.py --rows 1000000
+
+legacy:  uuid4 text primary key, float amount (the schema before migration 3)
+compact: time-ordered integer primary key (the SQLite rowid), amount in paise
+
+Both tables carry the same (user_id, date) indexes and are filled in
+arrival order, in 1000-row transactions, through the tuned SQLite profile.
+Each schema gets its own file in a temp directory.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import (  # noqa: E402
+    Boolean, Column, DateTime, Float, Index, MetaData, String, Table, bindparam, func, select, text,
+)
+from database import make_engine  # noqa: E402
+from models import Transaction, time_ordered_id  # noqa: E402
+from money import from_minor  # noqa: E402
+
+CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health"]
+
+legacy_metadata = MetaData()
+legacy = Table(
+    "transaction", legacy_metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("category", String, nullable=False),
+    Column("description", String, nullable=False),
+    Column("is_unnecessary", Boolean, nullable=False),
+    Column("tx_type", String, nullable=False),
+    Column("date", DateTime, nullable=False),
+    Index("ix_transaction_user_date", "user_id", "date"),
+    Index("ix_transaction_user_type_date", "user_id", "tx_type", "date"),
+)
+
+
+def rows(count, users, compact):
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=365)
+    step = timedelta(days=365) / count
+    for i in range(count):
+        minor = rng.randint(1000, 500000)
+        yield {
+            "id": time_ordered_id() if compact else str(uuid.uuid4()),
+            "user_id": f"user{rng.randrange(users)}",
+            "amount_minor" if compact else "amount": minor if compact else minor / 100,
+            "category": rng.choice(CATEGORIES),
+            "description": "bench",
+            "is_unnecessary": rng.random() < 0.3,
+            "tx_type": "expense",
+            "date": start + step * i,
+        }
+
+
+def run(name, args):
+    compact = name == "compact"
+    path = os.path.join(tempfile.mkdtemp(prefix=f"bench_schema_{name}_"), "bench.db")
+    engine = make_engine("sqlite", url=f"sqlite:///{path}")
+    table = Transaction.__table__ if compact else legacy
+    table.create(engine)
+    amount = table.c.amount_minor if compact else table.c.amount
+
+    started = time.perf_counter()
+    batch = []
+    for row in rows(args.rows, args.users, compact):
+        batch.append(row)
+        if len(batch) == 1000:
+            with engine.begin() as conn:
+                conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(table.insert(), batch)
+    insert_seconds = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        page_size = conn.execute(text("PRAGMA page_size")).scalar()
+        pages = conn.execute(text("PRAGMA page_count")).scalar()
+
+        # A month of one user's spending by category, straight off the raw table.
+        rng = random.Random(7)
+        end = datetime.utcnow()
+        statement = (
+            select(table.c.category, func.sum(amount))
+            .where(table.c.user_id == bindparam("user"))
+            .where(table.c.date >= end - timedelta(days=30))
+            .where(table.c.date < end)
+            .group_by(table.c.category)
+        )
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            conn.execute(statement, {"user": f"user{rng.randrange(args.users)}"}).all()
+        summary_ms = (time.perf_counter() - started) / args.queries * 1000
+
+        started = time.perf_counter()
+        grand_total = conn.execute(select(func.sum(amount))).scalar()
+        if compact:
+            grand_total = from_minor(grand_total)
+        full_scan_ms = (time.perf_counter() - started) * 1000
+    engine.dispose()
+
+    print(f"{name:>8}: file {pages * page_size / 1e6:7.1f} MB | "
+          f"insert {args.rows / insert_seconds:8.0f} rows/s | "
+          f"user-month summary {summary_ms:6.2f} ms | full SUM(amount) {full_scan_ms:7.1f} ms "
+          f"(= ₹{grand_total!r})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200, help="summary queries to average over")
+    args = parser.parse_args()
+    for name in ("legacy", "compact"):
+        run(name, args)
@@ -0,0 +1,51 @@
+"""Delivery throughput of TelegramSender against the fake Telegram API.
+
+    python benchmarks/bench_sender.py --messages 300 --chats 100
+
+Compares the rate-limited sender with an unthrottled one and reports how
+many 429s each run caused.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+from telegram_sender import TelegramSender  # noqa: E402
+from benchmarks import fake_telegram  # noqa: E402
+
+
+async def run_once(args, throttled):
+    fake_telegram.reset()
+    rate = {} if throttled else {"global_rate": 1e9, "global_burst": 10 ** 9, "chat_rate": 1e9, "chat_burst": 10 ** 9}
+    sender = TelegramSender("bench", base_url="http://fake", transport=httpx.ASGITransport(app=fake_telegram.app), **rate)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        sender.send_message(i % args.chats, f"message {i}") for i in range(args.messages)
+    ))
+    elapsed = time.perf_counter() - started
+    await sender.close()
+
+    label = "throttled" if throttled else "unthrottled"
+    print(f"{label}: {args.messages} messages to {args.chats} chats in {elapsed:.2f}s "
+          f"({args.messages / elapsed:.1f} msg/s), fake API rejected {fake_telegram.state['rejected']}")
+    print("  sender:", sender.stats())
+
+
+async def main(args):
+    await run_once(args, throttled=True)
+    if args.compare:
+        await run_once(args, throttled=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--compare", action="store_true", help="also run without client-side throttling")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+"""Write throughput of sharded SQLite (DB_SHARDS) by shard and worker count.
+
+Writer processes stand in for uvicorn workers: each calls
+main.save_transactions with one entry at a time for random users, for
+--seconds. With one file they all queue on its write lock; with N shards
+writers for users on different shards commit in parallel.
+
+    python benchmarks/bench_shards.py --shards 0,2,4,8 --workers 1,2,4,8 --seconds 5
+    SQLITE_SYNCHRONOUS=FULL python benchmarks/bench_shards.py   # every commit waits for fsync
+
+DB_SHARDS=0 is the single expensess.db. Each point gets a fresh temp
+directory. Disk and core count bound the result: on a single core the
+writers mostly take turns on the CPU, and sharding only removes lock waits.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+def _import_app(shards, workdir):
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    os.environ["DB_PROFILE"] = "sqlite"
+    os.environ["DB_SHARDS"] = str(shards)
+    os.environ["SQLITE_SYNCHRONOUS"] = SYNCHRONOUS
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("GROQ_KEY", "bench")
+    import main
+    return main
+
+
+def setup(shards, workdir):
+    _import_app(shards, workdir).init()
+
+
+def writer(shards, workdir, users, seconds, barrier, results):
+    main = _import_app(shards, workdir)
+    from sqlalchemy.exc import OperationalError
+
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            entry = {"amount": rng.randint(10, 500), "category": "Food", "description": "bench",
+                     "is_unnecessary": False, "tx_type": "expense"}
+            started = time.perf_counter()
+            try:
+                main.save_transactions(f"u{rng.randrange(users)}", [entry])
+            except OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        results.put((latencies, errors))
+
+
+def run_point(ctx, shards, workers, args):
+    workdir = tempfile.mkdtemp(prefix=f"bench_shards_{shards}_{workers}_")
+    init = ctx.Process(target=setup, args=(shards, workdir))
+    init.start()
+    init.join()
+
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(shards, workdir, args.users, args.seconds, barrier, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(l for ls, _ in collected for l in ls)
+    errors = sum(e for _, e in collected)
+    if not latencies:
+        return 0.0, 0.0, 0.0, errors
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return len(latencies) / args.seconds, latencies[len(latencies) // 2] * 1000, p95 * 1000, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", default="0,2,4,8", help="comma-separated DB_SHARDS values (0 = single file)")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated writer process counts")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{os.cpu_count()} CPUs, synchronous={SYNCHRONOUS}, {args.seconds:g}s per point")
+    print(f"{'shards':>6} {'workers':>7} {'writes/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'errors':>6}")
+    for shards in (int(s) for s in args.shards.split(",")):
+        for workers in (int(w) for w in args.workers.split(",")):
+            rate, p50, p95, errors = run_point(ctx, shards, workers, args)
+            print(f"{shards:>6} {workers:>7} {rate:9.1f} {p50:7.2f} {p95:7.2f} {errors:>6}")
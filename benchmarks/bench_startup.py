@@ -0,0 +1,105 @@
+"""Cold start: how long a fresh process takes to import, start up and answer.
+
+    python benchmarks/bench_startup.py [--runs 15] [--root PATH]
+
+Each run is a new interpreter in a new temp directory (so the database is
+created and migrated from scratch, like a fresh serverless instance), and
+reports:
+
+    import        import main (builds the app)
+    startup       the lifespan startup hook (schema, job queue)
+    first update  POST /webhook "120 lunch" until the reply reaches Telegram
+    groq client   first llm.get_client(), paid by the first LLM-bound update
+    process       interpreter launch to exit, as seen by this script
+
+Telegram is benchmarks/fake_telegram.py in-process. --root points at another
+checkout of the bot (e.g. a git worktree of an older commit) to compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+PHASES = ("import", "startup", "first_update", "groq_client", "process")
+
+
+def child(root):
+    results = {}
+    started = time.perf_counter()
+    sys.path.insert(0, root)
+    import main
+    results["import"] = time.perf_counter() - started
+
+    # fake_telegram comes from this checkout, whatever --root is.
+    sys.path.insert(0, BENCH_DIR)
+    import httpx
+    import fake_telegram
+    import llm
+    import telegram_sender
+    telegram_sender.sender = telegram_sender.TelegramSender(
+        "bench", base_url="http://fake", transport=httpx.ASGITransport(app=fake_telegram.app),
+        global_rate=1e9, global_burst=10 ** 9, chat_rate=1e9, chat_burst=10 ** 9,
+    )
+
+    async def serve():
+        started = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            results["startup"] = time.perf_counter() - started
+
+            replied = asyncio.Event()
+            fake_telegram.on_message = lambda method, payload: replied.set()
+            update = {"update_id": 1, "message": {"chat": {"id": 1}, "from": {"id": 1}, "text": "120 lunch"}}
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bot") as client:
+                started = time.perf_counter()
+                response = await client.post("/webhook", json=update)
+                response.raise_for_status()
+                await replied.wait()
+                results["first_update"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            if hasattr(llm, "get_client"):
+                llm.get_client()
+            results["groq_client"] = time.perf_counter() - started
+
+    asyncio.run(serve())
+    print(json.dumps(results))
+
+
+def run_once(root):
+    env = {**os.environ, "TELEGRAM_TOKEN": "bench", "GROQ_KEY": "bench"}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", root],
+        cwd=tempfile.mkdtemp(prefix="bench_startup_"), env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    results["process"] = time.perf_counter() - started
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--root", default=ROOT, help="checkout of the bot to measure")
+    parser.add_argument("--child", metavar="ROOT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit(0)
+
+    root = os.path.abspath(args.root)
+    run_once(root)  # warm the OS file cache and __pycache__
+    runs = [run_once(root) for _ in range(args.runs)]
+    print(f"{root}: {args.runs} cold starts")
+    print(f"  {'phase':<13} {'p50 ms':>8} {'p90 ms':>8}")
+    for phase in PHASES:
+        values = sorted(r[phase] * 1000 for r in runs)
+        print(f"  {phase:<13} {statistics.median(values):8.1f} {values[int(0.9 * (len(values) - 1))]:8.1f}")
@@ -0,0 +1,121 @@
+"""Write and summary throughput per storage profile (DB_PROFILE).
+
+Runs separate writer and reader processes against one database, the way
+several uvicorn workers share it: writers call main.save_transactions,
+readers call utils.get_summary with the summary cache disabled.
+
+    python benchmarks/bench_storage.py --profiles dev,sqlite --writers 4 --readers 4 --seconds 10
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_storage.py --profiles postgres
+
+SQLite profiles get a fresh file in a temp directory per run; the Postgres
+database is used as given, so point it at a scratch database.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_app(profile, workdir):
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    os.environ["DB_PROFILE"] = profile
+    os.environ["SUMMARY_CACHE_SIZE"] = "0"
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("GROQ_KEY", "bench")
+    # The dev profile logs every statement.
+    sys.stdout = open(os.devnull, "w")
+    import main
+    import utils
+    main.init()
+    return main, utils
+
+
+def _entry(rng):
+    return {"amount": rng.randint(10, 500), "category": rng.choice(["Food", "Travel", "Bills", "Shopping"]),
+            "description": "bench", "is_unnecessary": rng.random() < 0.3, "tx_type": "expense"}
+
+
+def seed(profile, workdir, users, rows):
+    main, _ = _import_app(profile, workdir)
+    rng = random.Random(0)
+    per_user = max(1, rows // users)
+    for user in range(users):
+        for start in range(0, per_user, 500):
+            main.save_transactions(f"u{user}", [_entry(rng) for _ in range(min(500, per_user - start))])
+
+
+def worker(role, profile, workdir, users, seconds, barrier, results):
+    main, utils = _import_app(profile, workdir)
+    from sqlalchemy.exc import OperationalError
+
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            user = f"u{rng.randrange(users)}"
+            started = time.perf_counter()
+            try:
+                if role == "write":
+                    main.save_transactions(user, [_entry(rng)])
+                else:
+                    utils.get_summary(user, period="this_month")
+            except OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        # Always report, so a crashed worker can't leave the parent waiting.
+        results.put((role, latencies, errors))
+
+
+def run_profile(ctx, profile, args):
+    workdir = tempfile.mkdtemp(prefix=f"bench_storage_{profile}_")
+    setup = ctx.Process(target=seed, args=(profile, workdir, args.users, args.rows))
+    setup.start()
+    setup.join()
+
+    barrier = ctx.Barrier(args.writers + args.readers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=("write", profile, workdir, args.users, args.seconds, barrier, results))
+             for _ in range(args.writers)]
+    procs += [ctx.Process(target=worker, args=("read", profile, workdir, args.users, args.seconds, barrier, results))
+              for _ in range(args.readers)]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    for role, label in (("write", "writes"), ("read", "summaries")):
+        latencies = sorted(l for r, ls, _ in collected if r == role for l in ls)
+        errors = sum(e for r, _, e in collected if r == role)
+        if not latencies:
+            print(f"{profile:>8} {label:>9}: no successful operations, {errors} errors")
+            continue
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{profile:>8} {label:>9}: {len(latencies) / args.seconds:8.1f}/s  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms  "
+              f"errors {errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default="dev,sqlite", help="comma-separated DB_PROFILE names")
+    parser.add_argument("--writers", type=int, default=4, help="writer processes")
+    parser.add_argument("--readers", type=int, default=4, help="reader processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=20000, help="transactions seeded before the run")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    for profile in args.profiles.split(","):
+        run_profile(ctx, profile.strip(), args)
@@ -0,0 +1,106 @@
+"""get_summary over a year of history: daily rollups vs loading ORM rows.
+
+    python benchmarks/bench_summary.py --rows 10000 100000 1000000
+
+Each size gets a fresh SQLite file in a temp directory with one heavy user
+(plus a few light ones) and transactions spread over the past year.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+os.environ.setdefault("GROQ_KEY", "bench")
+os.chdir(tempfile.mkdtemp(prefix="bench_summary_"))
+
+from sqlmodel import Session, select  # noqa: E402
+import database  # noqa: E402
+from models import Transaction, time_ordered_id  # noqa: E402
+import utils  # noqa: E402
+import rollups  # noqa: E402
+
+CATEGORIES = ["Food", "Transport", "Shopping", "Bills", "Entertainment", "Health", "Salary", "Freelance"]
+USER = "heavy"
+
+
+def populate(rows):
+    database.engine.echo = False
+    Transaction.metadata.drop_all(database.engine)
+    database.create_db()
+
+    now = datetime.utcnow()
+    raw = database.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        batch = []
+        for i in range(rows):
+            category = random.choice(CATEGORIES)
+            tx_type = "income" if category in ("Salary", "Freelance") else "expense"
+            batch.append((
+                time_ordered_id(), USER if i % 10 else f"light{i % 7}", random.randint(1000, 500000),
+                category, "bench", tx_type == "expense" and random.random() < 0.3, tx_type,
+                (now - timedelta(seconds=random.randint(0, 365 * 24 * 3600))).isoformat(sep=" "),
+            ))
+            if len(batch) == 10000:
+                cursor.executemany('INSERT INTO "transaction" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                batch.clear()
+        if batch:
+            cursor.executemany('INSERT INTO "transaction" VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        raw.commit()
+    finally:
+        raw.close()
+
+    with database.engine.begin() as conn:
+        rollups.rebuild(conn)
+
+
+def orm_summary(user_id, start_date, end_date):
+    """The previous implementation: load every row, then four Python passes."""
+    start, end = utils.resolve_period("custom", start_date, end_date)
+    with Session(database.engine) as session:
+        statement = (
+            select(Transaction)
+            .where(Transaction.user_id == user_id)
+            .where(Transaction.date >= start)
+            .where(Transaction.date < end)
+        )
+        results = session.exec(statement).all()
+        expenses = sum(tx.amount for tx in results if tx.tx_type == "expense")
+        income = sum(tx.amount for tx in results if tx.tx_type == "income")
+        total = sum(tx.amount for tx in results)
+        breakdown = {}
+        for tx in results:
+            breakdown[tx.category] = breakdown.get(tx.category, 0) + tx.amount
+        return total, expenses, income, breakdown
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args):
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=366)
+    for rows in args.rows:
+        populate(rows)
+        fast = timed(lambda: utils.get_summary(USER, "custom", start_date=start.isoformat(), end_date=end.isoformat()), args.repeat)
+        orm = timed(lambda: orm_summary(USER, start.isoformat(), end.isoformat()), args.repeat)
+        print(f"{rows:>9} rows: get_summary {fast * 1000:8.1f} ms | ORM rows {orm * 1000:8.1f} ms | {orm / fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
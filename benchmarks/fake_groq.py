@@ -0,0 +1,122 @@
+"""A local stand-in for Groq's chat completions API.
+
+Answers the bot's three prompts (entry categorization, summary parsing,
+bank-description categorization) with plausible JSON after a configurable
+delay, and reports token usage like the real API. Run it standalone with
+
+    uvicorn benchmarks.fake_groq:app --port 8082
+
+and point the bot at it with GROQ_BASE_URL=http://127.0.0.1:8082 (read by
+the groq SDK), or use it in-process:
+
+    llm.client = AsyncGroq(api_key="x", base_url="http://fake-groq",
+                           http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)))
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_GROQ_LATENCY", "0.3"))
+# Spread of the delay: each call sleeps LATENCY * uniform(1 - JITTER, 1 + JITTER).
+JITTER = float(os.getenv("FAKE_GROQ_JITTER", "0.3"))
+# Fraction of calls answered with 429, to exercise retries.
+ERROR_RATE = float(os.getenv("FAKE_GROQ_ERROR_RATE", "0"))
+
+# Lazy up to the quote that ends the line, so the rest of the prompt isn't captured.
+MESSAGE_RE = re.compile(r'Message: "(.*?)"\s*\n', re.S)
+USER_MESSAGE_RE = re.compile(r'User message: "(.*?)"\s*\n', re.S)
+NUMBERED_LINE_RE = re.compile(r"^\s*\d+\. (income|expense): ", re.M)
+AMOUNT_RE = re.compile(r"\d+(?:\.\d+)?")
+SUMMARY_WORDS = ("summary", "spend", "spent", "expense", "income", "waste", "report", "earn")
+
+app = FastAPI()
+
+state = {'calls': 0, 'rate_limited': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+
+def reset():
+    for key in state:
+        state[key] = 0
+
+
+def _categorize(text):
+    entries = []
+    for part in re.split(r",|\n| and ", text):
+        part = part.strip()
+        if not part:
+            continue
+        amount = AMOUNT_RE.search(part)
+        income = any(w in part.lower() for w in ("salary", "freelance", "received", "got paid"))
+        entries.append({
+            "amount": float(amount.group()) if amount else 1,
+            "category": "Salary" if income else "Other",
+            "description": AMOUNT_RE.sub("", part).strip() or part,
+            "is_unnecessary": False,
+            "tx_type": "income" if income else "expense",
+        })
+    return entries or [{"amount": 1, "category": "Other", "description": text, "is_unnecessary": False,
+                        "tx_type": "expense"}]
+
+
+def _summary(message):
+    lower = message.lower()
+    if not any(word in lower for word in SUMMARY_WORDS):
+        return {"is_summary": False}
+    return {
+        "is_summary": True,
+        "period": "last_month" if "last" in lower else "this_month",
+        "unnecessary_only": "waste" in lower,
+        "tx_type": "income" if "income" in lower or "earn" in lower else None,
+        "start_date": None,
+        "end_date": None,
+    }
+
+
+def answer(prompt):
+    """The JSON reply the bot expects for this prompt."""
+    if "query parser" in prompt:
+        match = USER_MESSAGE_RE.search(prompt)
+        return _summary(match.group(1) if match else "")
+    if "bank statement lines" in prompt:
+        return [{"category": "Other", "is_unnecessary": False} for _ in NUMBERED_LINE_RE.finditer(prompt)]
+    match = MESSAGE_RE.search(prompt)
+    return _categorize(match.group(1) if match else "")
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    state['calls'] += 1
+    await asyncio.sleep(max(0.0, LATENCY * random.uniform(1 - JITTER, 1 + JITTER)))
+
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        state['rate_limited'] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+        )
+
+    prompt = body["messages"][-1]["content"]
+    content = json.dumps(answer(prompt))
+    # Roughly four characters per token, like the real tokenizer on English.
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+    state['prompt_tokens'] += prompt_tokens
+    state['completion_tokens'] += completion_tokens
+    return {
+        "id": f"chatcmpl-fake-{state['calls']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
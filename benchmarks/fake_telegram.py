@@ -0,0 +1,122 @@
+"""A local stand-in for the Telegram Bot API.
+
+Enforces its own global and per-chat limits and answers over-limit calls
+with 429 + retry_after, like the real API. Run it standalone with
+
+    uvicorn benchmarks.fake_telegram:app --port 8081
+
+and point the bot at it with TELEGRAM_API_BASE=http://127.0.0.1:8081, or
+use it in-process through httpx.ASGITransport(app=app).
+
+It also serves getUpdates for poller.py: queue incoming messages with
+push_update(); an offset confirms (drops) every update below it, as in the
+real API.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_TELEGRAM_LATENCY", "0.01"))
+GLOBAL_LIMIT = int(os.getenv("FAKE_TELEGRAM_GLOBAL_LIMIT", "30"))
+CHAT_LIMIT = int(os.getenv("FAKE_TELEGRAM_CHAT_LIMIT", "1"))
+
+app = FastAPI()
+
+state = {
+    'messages': [],
+    'rejected': 0,
+    'updates': [],
+    'next_update_id': 1,
+}
+_new_updates = asyncio.Event()
+# Optional callback(method, payload), called for every accepted call; the
+# load test uses it to timestamp replies.
+on_message = None
+_global_window = []
+_chat_windows = defaultdict(list)
+
+
+def _over_limit(window, limit, now):
+    # Sliding one-second window.
+    while window and window[0] <= now - 1.0:
+        window.pop(0)
+    if len(window) >= limit:
+        return 1.0 - (now - window[0])
+    window.append(now)
+    return 0.0
+
+
+def reset():
+    state['messages'].clear()
+    state['rejected'] = 0
+    _global_window.clear()
+    _chat_windows.clear()
+    state['updates'].clear()
+    state['next_update_id'] = 1
+    global _new_updates
+    _new_updates = asyncio.Event()
+
+
+def push_update(chat_id, text, user_id=None):
+    """Queue an incoming text message for getUpdates; returns its update_id."""
+    update_id = state['next_update_id']
+    state['next_update_id'] += 1
+    state['updates'].append({
+        "update_id": update_id,
+        "message": {"text": text, "chat": {"id": chat_id}, "from": {"id": user_id or chat_id}},
+    })
+    _new_updates.set()
+    return update_id
+
+
+async def _get_updates(payload):
+    offset = int(payload.get("offset") or 0)
+    limit = int(payload.get("limit") or 100)
+    timeout = float(payload.get("timeout") or 0)
+    state['updates'][:] = [u for u in state['updates'] if u["update_id"] >= offset]
+    if not state['updates'] and timeout:
+        _new_updates.clear()
+        try:
+            await asyncio.wait_for(_new_updates.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return {"ok": True, "result": state['updates'][:limit]}
+
+
+@app.post("/bot{token}/{method}")
+async def bot_method(token: str, method: str, request: Request):
+    if request.headers.get("content-type", "").startswith("application/json"):
+        payload = await request.json()
+    else:
+        payload = dict(await request.form())
+
+    # Update polling isn't subject to the sending limits.
+    if method == "getUpdates":
+        return await _get_updates(payload)
+    if method in ("deleteWebhook", "setWebhook"):
+        return {"ok": True, "result": True}
+
+    await asyncio.sleep(LATENCY)
+    now = time.monotonic()
+    chat_id = payload.get("chat_id")
+
+    # Small grace on the chat limit: Telegram tolerates short bursts.
+    wait = _over_limit(_chat_windows[chat_id], CHAT_LIMIT + 2, now) if chat_id is not None else 0.0
+    if not wait:
+        wait = _over_limit(_global_window, GLOBAL_LIMIT, now)
+    if wait:
+        state['rejected'] += 1
+        return JSONResponse(status_code=429, content={
+            "ok": False,
+            "error_code": 429,
+            "description": "Too Many Requests",
+            "parameters": {"retry_after": max(1, round(wait))},
+        })
+
+    state['messages'].append((method, payload))
+    if on_message is not None:
+        on_message(method, payload)
+    return {"ok": True, "result": {"message_id": len(state['messages']), "chat": {"id": chat_id}}}
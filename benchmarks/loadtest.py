@@ -0,0 +1,319 @@
+"""End-to-end load test: synthetic Telegram updates through the FastAPI app.
+
+Replays a mix of entries, summaries, /undo and chatter against POST /webhook,
+with benchmarks/fake_groq.py and benchmarks/fake_telegram.py standing in for
+the real services (in-process, over ASGI). For every combination of DB size
+and concurrency it reports throughput and p50/p95/p99 latency per route:
+"ack" is the webhook's HTTP response, "e2e" is until the reply reaches the
+fake Telegram API.
+
+    python benchmarks/loadtest.py --db-sizes 0 100000 --concurrency 10 50 --updates 500
+    python benchmarks/loadtest.py --compare benchmarks/results/loadtest-<old>.json benchmarks/results/loadtest-<new>.json
+
+Results are written to benchmarks/results/loadtest-<commit>.json, so two
+commits can be diffed with --compare. Runs against a throwaway SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+# ----------------------
+# Workload
+# ----------------------
+FAST_ENTRIES = ["coffee", "uber", "groceries", "movie", "lunch", "petrol"]
+GRAMMAR_SUMMARIES = ["this month summary", "last month expenses", "how much did I waste this week?",
+                     "last week income", "this week spending"]
+LLM_SUMMARIES = ["how did my spending look lately", "where did my money go",
+                 "what have I been splurging on", "give me the usual breakdown"]
+CHATTER = ["hello", "thanks!", "good morning", "what can you do"]
+
+# (route, weight, text factory). Routes are named after the path the text
+# takes through handle_update.
+MIX = [
+    ("entry", 35, lambda i, rng: f"{rng.randint(20, 900)} {rng.choice(FAST_ENTRIES)}"),
+    # Two numbers and no lexicon keyword: the fast parser defers to the LLM.
+    ("entry_llm", 20, lambda i, rng: f"{rng.randint(20, 900)} for gift number {i}"),
+    ("summary", 15, lambda i, rng: rng.choice(GRAMMAR_SUMMARIES)),
+    ("summary_llm", 10, lambda i, rng: rng.choice(LLM_SUMMARIES)),
+    ("undo", 10, lambda i, rng: "/undo"),
+    ("chatter", 10, lambda i, rng: rng.choice(CHATTER)),
+]
+
+
+def build_updates(count, users, first_update_id, rng):
+    """[(route, update)]. Every update gets its own chat, so its reply can be matched to it."""
+    routes = [route for route, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    factories = {route: factory for route, _, factory in MIX}
+    updates = []
+    for i in range(count):
+        route = rng.choices(routes, weights)[0]
+        update_id = first_update_id + i
+        updates.append((route, {
+            "update_id": update_id,
+            "message": {
+                "text": factories[route](update_id, rng),
+                "chat": {"id": update_id},
+                "from": {"id": rng.randrange(users)},
+            },
+        }))
+    return updates
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def latency_stats(values):
+    return {f"p{int(p * 100)}": percentile(values, p) * 1000 for p in (0.50, 0.95, 0.99)}
+
+
+# ----------------------
+# Run
+# ----------------------
+def setup_app(args):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("GROQ_KEY", "bench")
+    os.chdir(tempfile.mkdtemp(prefix="loadtest_"))
+
+    import httpx
+    from groq import AsyncGroq
+    import main
+    import llm
+    import telegram_sender
+    from benchmarks import fake_groq, fake_telegram
+
+    fake_groq.LATENCY = args.llm_latency
+    llm.client = AsyncGroq(
+        api_key="bench", base_url="http://fake-groq",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_groq.app)),
+    )
+
+    limits = {}
+    if not args.real_rate_limits:
+        fake_telegram.GLOBAL_LIMIT = fake_telegram.CHAT_LIMIT = 10 ** 9
+        limits = dict(global_rate=1e9, global_burst=10 ** 9, chat_rate=1e9, chat_burst=10 ** 9)
+    telegram_sender.sender = telegram_sender.TelegramSender(
+        "bench", base_url="http://fake-telegram",
+        transport=httpx.ASGITransport(app=fake_telegram.app), **limits,
+    )
+
+    main.job_queue.workers = args.workers
+    return main
+
+
+def reset_database(db_size, users):
+    """Empty the database, then seed db_size transactions over the past year."""
+    from sqlmodel import SQLModel
+    import database
+    import llm_cache
+    import rollups
+    import summary_cache
+    from models import Transaction, time_ordered_id
+
+    SQLModel.metadata.drop_all(database.engine)
+    database.create_db()
+    summary_cache.cache = summary_cache.SummaryCache()
+    llm_cache._memory.clear()
+
+    rng = random.Random(db_size)
+    now = datetime.utcnow()
+    batch = []
+    with database.engine.begin() as conn:
+        for _ in range(db_size):
+            batch.append({
+                "id": time_ordered_id(),
+                "user_id": str(rng.randrange(users)),
+                "amount_minor": rng.randint(1000, 500000),
+                "category": rng.choice(["Food", "Transport", "Shopping", "Bills", "Entertainment"]),
+                "description": "seed",
+                "is_unnecessary": rng.random() < 0.3,
+                "tx_type": "expense",
+                "date": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            })
+            if len(batch) == 10000:
+                conn.execute(Transaction.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Transaction.__table__.insert(), batch)
+        rollups.rebuild(conn)
+
+
+async def run_point(main, db_size, concurrency, args, first_update_id):
+    import httpx
+    from benchmarks import fake_groq, fake_telegram
+
+    reset_database(db_size, args.users)
+    fake_groq.reset()
+    fake_telegram.reset()
+
+    updates = build_updates(args.updates, args.users, first_update_id, random.Random(args.seed))
+    routes = {update["update_id"]: route for route, update in updates}
+    sent_at, replied_at, ack = {}, {}, {route: [] for route, _, _ in MIX}
+
+    def on_message(method, payload):
+        replied_at.setdefault(int(payload["chat_id"]), time.perf_counter())
+
+    fake_telegram.on_message = on_message
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bot") as client:
+        async def post(i, route, update):
+            if args.rate:
+                # Open-loop arrivals at a fixed rate, so e2e shows service time
+                # rather than the backlog of an all-at-once burst.
+                await asyncio.sleep(max(0.0, started + i / args.rate - time.perf_counter()))
+            async with semaphore:
+                posted = time.perf_counter()
+                sent_at[update["update_id"]] = posted
+                response = await client.post("/webhook", json=update)
+                response.raise_for_status()
+                ack[route].append(time.perf_counter() - posted)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i, route, update) for i, (route, update) in enumerate(updates)))
+        await main.job_queue.join()
+        elapsed = time.perf_counter() - started
+    fake_telegram.on_message = None
+
+    e2e = {route: [] for route, _, _ in MIX}
+    for update_id, sent in sent_at.items():
+        if update_id in replied_at:
+            e2e[routes[update_id]].append(replied_at[update_id] - sent)
+
+    return {
+        "db_size": db_size,
+        "concurrency": concurrency,
+        "updates": len(updates),
+        "elapsed": elapsed,
+        "throughput": len(updates) / elapsed,
+        "unanswered": len(sent_at) - len(replied_at),
+        "llm_calls": fake_groq.state['calls'],
+        "routes": {
+            route: {
+                "count": len(ack[route]),
+                "throughput": len(e2e[route]) / elapsed,
+                "ack_ms": latency_stats(ack[route]),
+                "e2e_ms": latency_stats(e2e[route]),
+            }
+            for route, _, _ in MIX
+        },
+    }
+
+
+def print_point(point):
+    print(f"\ndb {point['db_size']} rows, concurrency {point['concurrency']}: {point['updates']} updates "
+          f"in {point['elapsed']:.2f}s ({point['throughput']:.1f}/s), {point['llm_calls']} LLM calls, "
+          f"{point['unanswered']} unanswered")
+    print(f"  {'route':<12} {'count':>5} {'/s':>7}   {'ack p50/p95/p99 ms':>22}   {'e2e p50/p95/p99 ms':>24}")
+    for route, r in point["routes"].items():
+        a, e = r["ack_ms"], r["e2e_ms"]
+        print(f"  {route:<12} {r['count']:>5} {r['throughput']:>7.1f}   "
+              f"{a['p50']:6.1f} {a['p95']:6.1f} {a['p99']:6.1f}     "
+              f"{e['p50']:7.1f} {e['p95']:7.1f} {e['p99']:7.1f}")
+
+
+def git_commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args):
+    main = setup_app(args)
+    main.job_queue.start()
+    points = []
+    next_update_id = 1
+    for db_size in args.db_sizes:
+        for concurrency in args.concurrency:
+            point = await run_point(main, db_size, concurrency, args, next_update_id)
+            next_update_id += args.updates
+            print_point(point)
+            points.append(point)
+    await main.job_queue.stop()
+
+    commit = git_commit()
+    result = {"commit": commit, "created": datetime.utcnow().isoformat(), "config": vars(args), "points": points}
+    path = args.output or os.path.join(RESULTS_DIR, f"loadtest-{commit}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults saved to {path}")
+
+
+# ----------------------
+# Compare
+# ----------------------
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_points = {(p["db_size"], p["concurrency"]): p for p in old["points"]}
+
+    print(f"{old['commit']} -> {new['commit']} (e2e latency, ! marks a slowdown over {threshold:.0%})")
+    for key in ("updates", "users", "workers", "llm_latency", "rate", "real_rate_limits", "seed"):
+        if old["config"].get(key) != new["config"].get(key):
+            print(f"warning: runs differ in {key}: {old['config'].get(key)} vs {new['config'].get(key)}")
+    regressions = 0
+    for point in new["points"]:
+        before = old_points.get((point["db_size"], point["concurrency"]))
+        if before is None:
+            continue
+        print(f"\ndb {point['db_size']} rows, concurrency {point['concurrency']}: "
+              f"{before['throughput']:.1f} -> {point['throughput']:.1f} updates/s")
+        for route, r in point["routes"].items():
+            if route not in before["routes"]:
+                continue
+            cells = []
+            for p in ("p50", "p95", "p99"):
+                a, b = before["routes"][route]["e2e_ms"][p], r["e2e_ms"][p]
+                change = (b - a) / a if a else 0.0
+                flag = "!" if change > threshold else " "
+                regressions += flag == "!"
+                cells.append(f"{p} {a:7.1f} -> {b:7.1f} ({change:+6.1%}){flag}")
+            print(f"  {route:<12} " + "  ".join(cells))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-sizes", type=int, nargs="+", default=[0, 100000], help="transactions seeded per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50], help="in-flight webhook requests")
+    parser.add_argument("--updates", type=int, default=500, help="updates per run")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="arrivals per second (default: as fast as --concurrency allows)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="job queue workers (WEBHOOK_WORKERS)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mean fake Groq latency, seconds")
+    parser.add_argument("--real-rate-limits", action="store_true",
+                        help="keep Telegram's send limits in the sender and the fake API")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/loadtest-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two saved results and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    asyncio.run(run(args))
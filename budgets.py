@@ -0,0 +1,123 @@
+import re
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, delete
+from database import engine_for
+from models import CategoryBudget, MonthlySpend
+from money import from_minor, to_minor
+
+
+# Monthly per-category budgets (/budget Food 5000).
+#
+# rollups.add_many keeps month-to-date spend per (user, month, category) in
+# monthlyspend and hands back each moved total as (before, after) from its
+# own upsert. check() compares those with the user's limits inside the same
+# DB transaction: one primary-key lookup per category in the message, no
+# summary query. Because every saver sees the totals in commit order, when
+# concurrent entries race past a threshold exactly one of them alerts.
+
+THRESHOLDS = (80, 100)  # percent of the limit
+
+BUDGET_RE = re.compile(r'(?P<category>[a-z][a-z ]*?)\s+(?:(?P<off>off|0)|₹?(?P<amount>\d+(?:,\d{3})*(?:\.\d+)?))')
+
+
+def parse_argument(argument):
+    """Parse /budget's argument into (category, amount).
+
+    "" -> ("", None) to list budgets, "food 5000" -> ("Food", 5000.0),
+    "food off" -> ("Food", 0) to remove one; None if it doesn't parse.
+    """
+    argument = argument.strip().lower()
+    if not argument:
+        return "", None
+    match = BUDGET_RE.fullmatch(argument)
+    if not match:
+        return None
+    category = match.group("category").strip().title()
+    if match.group("off"):
+        return category, 0
+    return category, float(match.group("amount").replace(",", ""))
+
+
+def set_budget(user_id, category, amount):
+    """Set a category's monthly limit, or remove it when amount is 0."""
+    with Session(engine_for(user_id)) as session:
+        if not amount:
+            session.exec(delete(CategoryBudget).where(
+                CategoryBudget.user_id == user_id, CategoryBudget.category == category
+            ))
+        else:
+            insert = postgresql.insert if session.get_bind().dialect.name == "postgresql" else sqlite.insert
+            statement = insert(CategoryBudget).values(
+                user_id=user_id, category=category, limit_minor=to_minor(amount), updated_at=datetime.utcnow()
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "category"],
+                set_={"limit_minor": statement.excluded.limit_minor, "updated_at": statement.excluded.updated_at},
+            )
+            session.exec(statement)
+        session.commit()
+
+
+def budget_report(user_id, today=None):
+    """[(category, limit_minor, spent_minor this month)] for every budget the user set."""
+    month = (today or datetime.utcnow().date()).replace(day=1)
+    with Session(engine_for(user_id)) as session:
+        limits = session.exec(
+            select(CategoryBudget.category, CategoryBudget.limit_minor)
+            .where(CategoryBudget.user_id == user_id)
+            .order_by(CategoryBudget.category)
+        ).all()
+        spent = dict(session.exec(
+            select(MonthlySpend.category, MonthlySpend.spent_minor)
+            .where(MonthlySpend.user_id == user_id, MonthlySpend.month == month)
+        ).all())
+    return [(category, limit, spent.get(category, 0)) for category, limit in limits]
+
+
+def check(session, user_id, moved):
+    """Alerts for budgets that moved past a threshold: [(category, percent, spent_minor, limit_minor)].
+
+    moved is rollups.add_many's {(month, category): (before, after)}. Call
+    before session.commit(), so the check sees this transaction's totals.
+    """
+    if not moved:
+        return []
+    limits = dict(session.exec(
+        select(CategoryBudget.category, CategoryBudget.limit_minor).where(
+            CategoryBudget.user_id == user_id,
+            CategoryBudget.category.in_([category for _, category in moved]),
+        )
+    ).all())
+
+    alerts = []
+    for (_, category), (before, after) in moved.items():
+        limit = limits.get(category)
+        if not limit:
+            continue
+        # Only the highest threshold crossed by this save.
+        crossed = [t for t in THRESHOLDS if before * 100 < limit * t <= after * 100]
+        if crossed:
+            alerts.append((category, crossed[-1], after, limit))
+    return alerts
+
+
+def build_alert_reply(alerts):
+    lines = []
+    for category, percent, spent, limit in alerts:
+        emoji = "🔴" if percent >= 100 else "⚠️"
+        lines.append(
+            f"{emoji} {category}: ₹{from_minor(spent):.0f} of your ₹{from_minor(limit):.0f} "
+            f"monthly budget ({spent * 100 // limit}%)"
+        )
+    return "\n".join(lines)
+
+
+def build_budgets_reply(rows):
+    if not rows:
+        return "No budgets yet. Set one with /budget Food 5000"
+    lines = ["💼 *Budgets this month*"]
+    for category, limit, spent in rows:
+        lines.append(f"  • {category}: ₹{from_minor(spent):.0f} / ₹{from_minor(limit):.0f} ({spent * 100 // limit}%)")
+    lines.append("\nChange with /budget <category> <amount>, remove with /budget <category> off")
+    return "\n".join(lines)
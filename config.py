@@ -0,0 +1,15 @@
+import os
+from dotenv import load_dotenv
+
+
+# .env is loaded once, by the first module that imports this one (database,
+# llm and telegram_sender all do); everything else reads os.getenv.
+load_dotenv()
+
+
+def require(name):
+    """The value of a required setting; raises if it is missing or empty."""
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"{name} not set in .env")
+    return value
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import itertools
+import os
+import time
+from datetime import date, datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+import config
+import database
+from database import engine, user_engines
+from models import DigestDelivery, DigestSubscription
+import rollups
+import telegram_sender
+from utils import build_summary, build_summary_reply, resolve_period
+
+
+# Scheduled summaries for users who opted in with /digest weekly|monthly:
+#
+#   python digests.py weekly    # last Monday-Sunday; cron: 0 8 * * 1
+#   python digests.py monthly   # last calendar month; cron: 0 8 1 * *
+#
+# One grouped query per database reads every user's per-category totals for
+# the period from the daily rollups (no get_summary per user). Each
+# subscriber with activity gets the usual build_summary_reply text, sent
+# through a TelegramSender capped at DIGEST_RATE messages/s.
+#
+# Users are claimed in digestdelivery before sending (INSERT ... ON CONFLICT
+# DO NOTHING RETURNING, so two runs can't both win a user) and marked sent
+# after, DIGEST_CONCURRENCY at a time: one claim per round of concurrent
+# sends, settled as soon as that round is done. Rerunning a period after a
+# crash, or a second cron firing, skips everyone already claimed. The trade,
+# as in idempotency.py: a hard crash leaves the claims of the round in flight
+# (at most DIGEST_CONCURRENCY users) unconfirmed. A plain rerun skips them;
+# --resend-unconfirmed sends them again, repeating any that were delivered
+# just before the crash.
+
+KINDS = {"weekly": ("last_week", "Weekly"), "monthly": ("last_month", "Monthly")}
+# Added to the bot's own TELEGRAM_GLOBAL_RATE; keep the sum under ~30/s.
+DIGEST_RATE = float(os.getenv("DIGEST_RATE", "20"))
+DIGEST_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "50"))
+DIGEST_BATCH = int(os.getenv("DIGEST_BATCH", "1000"))  # rollup rows fetched at a time while building
+
+
+def _insert():
+    return postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+
+
+# ----------------------
+# Subscriptions (/digest)
+# ----------------------
+def set_subscription(user_id, chat_id, choice):
+    """Apply /digest weekly|monthly|off (or just read, for "status"); returns the kinds now on."""
+    with engine.begin() as conn:
+        if choice == "off":
+            conn.execute(delete(DigestSubscription).where(DigestSubscription.user_id == user_id))
+        elif choice in KINDS:
+            statement = _insert()(DigestSubscription).values(
+                user_id=user_id, chat_id=chat_id, weekly=choice == "weekly", monthly=choice == "monthly",
+                created_at=datetime.utcnow(),
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id"], set_={choice: True, "chat_id": chat_id}
+            )
+            conn.execute(statement)
+        row = conn.execute(
+            select(DigestSubscription.weekly, DigestSubscription.monthly)
+            .where(DigestSubscription.user_id == user_id)
+        ).first()
+    return [kind for kind, on in zip(KINDS, row or ()) if on]
+
+
+def subscribers(kind):
+    """{user_id: chat_id} of everyone subscribed to kind."""
+    statement = select(DigestSubscription.user_id, DigestSubscription.chat_id).where(
+        getattr(DigestSubscription, kind) == True
+    )
+    with engine.connect() as conn:
+        return dict(conn.execute(statement).all())
+
+
+# ----------------------
+# Building the digests
+# ----------------------
+def period(kind, today=None):
+    """[start, end) of the digest period before today (a date)."""
+    today = today or datetime.utcnow().date()
+    return resolve_period(KINDS[kind][0], now=datetime.combine(today, datetime.min.time()))
+
+
+def render(kind, start, end, recipients):
+    """Yield (user_id, text) for every user in recipients with activity in [start, end)."""
+    title = KINDS[kind][1]
+    statement = rollups.all_users_statement(start, end)
+    for shard in user_engines():
+        with shard.connect() as conn:
+            rows = conn.execution_options(stream_results=True, yield_per=DIGEST_BATCH).execute(statement)
+            for user_id, user_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                if user_id not in recipients:
+                    continue
+                summary = build_summary([row[1:] for row in user_rows], start, end)
+                yield user_id, build_summary_reply(summary, title)
+
+
+# ----------------------
+# Delivery ledger
+# ----------------------
+def deliveries(kind, period_start):
+    """{user_id: sent_at} already claimed for this digest; sent_at is None if unconfirmed."""
+    statement = select(DigestDelivery.user_id, DigestDelivery.sent_at).where(
+        DigestDelivery.kind == kind, DigestDelivery.period_start == period_start
+    )
+    with engine.connect() as conn:
+        return dict(conn.execute(statement).all())
+
+
+def _ledger(statement, kind, period_start, user_ids):
+    return statement.where(
+        DigestDelivery.kind == kind,
+        DigestDelivery.period_start == period_start,
+        DigestDelivery.user_id.in_(user_ids),
+    )
+
+
+def claim(kind, period_start, user_ids):
+    """Claim user_ids for this digest; returns the ones this call won."""
+    now = datetime.utcnow()
+    statement = (
+        _insert()(DigestDelivery)
+        .values([
+            {"kind": kind, "period_start": period_start, "user_id": user_id, "claimed_at": now}
+            for user_id in user_ids
+        ])
+        .on_conflict_do_nothing(index_elements=["kind", "period_start", "user_id"])
+        .returning(DigestDelivery.user_id)
+    )
+    with engine.begin() as conn:
+        return set(conn.execute(statement).scalars())
+
+
+def settle(kind, period_start, sent, failed):
+    """Mark sent claims as delivered and drop failed ones so a rerun retries them."""
+    with engine.begin() as conn:
+        if sent:
+            conn.execute(_ledger(update(DigestDelivery), kind, period_start, sent).values(sent_at=datetime.utcnow()))
+        if failed:
+            conn.execute(_ledger(delete(DigestDelivery), kind, period_start, failed))
+
+
+def release_unconfirmed(kind, period_start):
+    """Drop claims a crashed run never confirmed, so they are sent again."""
+    statement = delete(DigestDelivery).where(
+        DigestDelivery.kind == kind,
+        DigestDelivery.period_start == period_start,
+        DigestDelivery.sent_at == None,
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).rowcount
+
+
+# ----------------------
+# Batch job
+# ----------------------
+async def run(kind, today=None, sender=None, resend_unconfirmed=False, concurrency=DIGEST_CONCURRENCY):
+    """Send one period's digest to every subscriber of kind. Returns run stats."""
+    sender = sender or telegram_sender.sender
+    start, end = period(kind, today)
+    period_start = start.date()
+    stats = {'kind': kind, 'period_start': str(period_start), 'subscribers': 0, 'with_activity': 0,
+             'already_sent': 0, 'unconfirmed': 0, 'claimed_elsewhere': 0, 'sent': 0, 'failed': 0}
+
+    started = time.perf_counter()
+    if resend_unconfirmed:
+        await asyncio.to_thread(release_unconfirmed, kind, period_start)
+    recipients = await asyncio.to_thread(subscribers, kind)
+    done = await asyncio.to_thread(deliveries, kind, period_start)
+    stats['subscribers'] = len(recipients)
+    stats['already_sent'] = sum(1 for sent_at in done.values() if sent_at is not None)
+    stats['unconfirmed'] = len(done) - stats['already_sent']
+
+    def build():
+        digests = list(render(kind, start, end, recipients))
+        stats['with_activity'] = len(digests)
+        return [(user_id, text) for user_id, text in digests if user_id not in done]
+
+    pending = await asyncio.to_thread(build)
+    stats['build_seconds'] = round(time.perf_counter() - started, 3)
+
+    async def deliver(user_id, text, sent, failed):
+        ok = await sender.send_message(recipients[user_id], text) is not None
+        (sent if ok else failed).append(user_id)
+
+    started = time.perf_counter()
+    # Claim only what is about to be sent, so a hard crash leaves at most
+    # one round of claims unconfirmed.
+    for offset in range(0, len(pending), concurrency):
+        chunk = dict(pending[offset:offset + concurrency])
+        won = await asyncio.to_thread(claim, kind, period_start, list(chunk))
+        stats['claimed_elsewhere'] += len(chunk) - len(won)
+        sent, failed = [], []
+        try:
+            await asyncio.gather(*(deliver(user_id, chunk[user_id], sent, failed) for user_id in won))
+        finally:
+            # Also on an error or Ctrl-C mid-round, so only the sends still
+            # in flight are left unconfirmed. Shielded so that a cancelled
+            # run still records the round; the copies are what was done by now.
+            await asyncio.shield(asyncio.to_thread(settle, kind, period_start, list(sent), list(failed)))
+        stats['sent'] += len(sent)
+        stats['failed'] += len(failed)
+
+    elapsed = time.perf_counter() - started
+    stats['send_seconds'] = round(elapsed, 3)
+    stats['messages_per_second'] = round(stats['sent'] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+async def _main(args):
+    sender = telegram_sender.TelegramSender(config.require("TELEGRAM_TOKEN"), global_rate=DIGEST_RATE)
+    try:
+        stats = await run(args.kind, args.date, sender, args.resend_unconfirmed)
+    finally:
+        await sender.close()
+    print(f"{stats['kind']} digest for {stats['period_start']}: {stats['sent']} sent, {stats['failed']} failed "
+          f"of {stats['subscribers']} subscribers ({stats['with_activity']} with activity, "
+          f"{stats['already_sent']} already sent, {stats['unconfirmed']} unconfirmed from an earlier run)")
+    print(f"built in {stats['build_seconds']}s, sent in {stats['send_seconds']}s "
+          f"({stats['messages_per_second']} msg/s); sender: {sender.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send the weekly or monthly digest to every subscriber.")
+    parser.add_argument("kind", choices=tuple(KINDS))
+    parser.add_argument("--date", type=date.fromisoformat, help="run as if today were this day (YYYY-MM-DD)")
+    parser.add_argument("--resend-unconfirmed", action="store_true",
+                        help="also send to users a crashed run claimed but never confirmed (may repeat a few)")
+    args = parser.parse_args()
+
+    database.create_db()
+    asyncio.run(_main(args))
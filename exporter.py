@@ -0,0 +1,117 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from sqlmodel import select
+from models import Transaction
+from money import from_minor
+from database import engine_for
+
+
+# Full-history export for one user, as CSV or JSON Lines. Rows are read with
+# a streaming cursor CHUNK_ROWS at a time and written out chunk by chunk, so
+# memory stays flat however many transactions the user has.
+#
+#     python exporter.py 123456789 --format jsonl > history.jsonl
+
+FORMATS = ("csv", "jsonl")
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+# Bots can upload documents up to 50 MB; bigger exports are gzipped first.
+TELEGRAM_DOCUMENT_LIMIT = 49 * 1024 * 1024
+
+COLUMNS = ("id", "date", "amount", "tx_type", "category", "description", "is_unnecessary")
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def export_statement(user_id):
+    return (
+        select(Transaction.id, Transaction.date, Transaction.amount_minor, Transaction.tx_type,
+               Transaction.category, Transaction.description, Transaction.is_unnecessary)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date, Transaction.id)
+    )
+
+
+def iter_rows(user_id, chunk_rows=CHUNK_ROWS):
+    """Yield lists of up to chunk_rows row tuples, oldest first."""
+    with engine_for(user_id).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(
+            export_statement(user_id)
+        )
+        for partition in result.partitions():
+            yield partition
+
+
+def _csv_chunk(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow((row.id, row.date.isoformat(), from_minor(row.amount_minor), row.tx_type,
+                         row.category, row.description, row.is_unnecessary))
+    return buffer.getvalue()
+
+
+def _jsonl_chunk(rows):
+    return "".join(
+        json.dumps(dict(zip(COLUMNS, (row.id, row.date.isoformat(), from_minor(row.amount_minor), row.tx_type,
+                                      row.category, row.description, row.is_unnecessary))),
+                   ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _iter_chunks(user_id, fmt, chunk_rows):
+    """Yield (text, row_count) pairs, starting with the CSV header."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+    if fmt == "csv":
+        yield _csv_chunk((), header=True), 0
+    for rows in iter_rows(user_id, chunk_rows):
+        yield (_csv_chunk(rows) if fmt == "csv" else _jsonl_chunk(rows)), len(rows)
+
+
+def iter_export(user_id, fmt="csv", chunk_rows=CHUNK_ROWS):
+    """Yield the export as text chunks, one per chunk_rows transactions."""
+    for text, _ in _iter_chunks(user_id, fmt, chunk_rows):
+        yield text
+
+
+def export_to_file(user_id, fmt="csv", limit=TELEGRAM_DOCUMENT_LIMIT):
+    """Write the export to a temp file for upload.
+
+    Returns (path, filename, row_count); the caller deletes path. Exports over
+    limit bytes are gzipped, which shrinks them roughly tenfold.
+    """
+    filename = f"transactions_{user_id}.{fmt}"
+    rows = 0
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    with open(fd, "w", encoding="utf-8", newline="") as f:
+        for text, count in _iter_chunks(user_id, fmt, CHUNK_ROWS):
+            f.write(text)
+            rows += count
+
+    if os.path.getsize(path) > limit:
+        gz_path = path + ".gz"
+        with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        path, filename = gz_path, filename + ".gz"
+    return path, filename, rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export one user's transactions to stdout.")
+    parser.add_argument("user", help="Telegram user id")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    args = parser.parse_args()
+
+    engine_for(args.user).echo = False
+    for chunk in iter_export(args.user, args.format):
+        sys.stdout.write(chunk)
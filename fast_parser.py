@@ -0,0 +1,265 @@
+import os
+import re
+
+
+# Most entries are just "<amount> <keyword>" ("100 on food", "5000 salary").
+# We read those locally and only hand the message to the LLM when we are
+# not confident about what it says.
+
+CONFIDENCE_THRESHOLD = float(os.getenv("FAST_PARSER_THRESHOLD", "0.8"))
+STATS_ENABLED = os.getenv("FAST_PARSER_STATS", "0") == "1"
+STATS_EVERY = 50
+
+# keyword -> (category, tx_type, is_unnecessary)
+LEXICON = {
+    # Food
+    'food': ('Food', 'expense', False),
+    'lunch': ('Food', 'expense', False),
+    'dinner': ('Food', 'expense', False),
+    'breakfast': ('Food', 'expense', False),
+    'grocery': ('Food', 'expense', False),
+    'groceries': ('Food', 'expense', False),
+    'vegetables': ('Food', 'expense', False),
+    'fruits': ('Food', 'expense', False),
+    'milk': ('Food', 'expense', False),
+    'restaurant': ('Food', 'expense', True),
+    'coffee': ('Food', 'expense', True),
+    'tea': ('Food', 'expense', False),
+    'snacks': ('Food', 'expense', True),
+    'pizza': ('Food', 'expense', True),
+    'burger': ('Food', 'expense', True),
+    'swiggy': ('Food', 'expense', True),
+    'zomato': ('Food', 'expense', True),
+    # Transport
+    'petrol': ('Transport', 'expense', False),
+    'diesel': ('Transport', 'expense', False),
+    'fuel': ('Transport', 'expense', False),
+    'uber': ('Transport', 'expense', False),
+    'ola': ('Transport', 'expense', False),
+    'cab': ('Transport', 'expense', False),
+    'taxi': ('Transport', 'expense', False),
+    'auto': ('Transport', 'expense', False),
+    'bus': ('Transport', 'expense', False),
+    'metro': ('Transport', 'expense', False),
+    'train': ('Transport', 'expense', False),
+    'parking': ('Transport', 'expense', False),
+    'transport': ('Transport', 'expense', False),
+    # Shopping
+    'shopping': ('Shopping', 'expense', True),
+    'clothes': ('Shopping', 'expense', True),
+    'shoes': ('Shopping', 'expense', True),
+    'amazon': ('Shopping', 'expense', True),
+    'flipkart': ('Shopping', 'expense', True),
+    # Bills
+    'bill': ('Bills', 'expense', False),
+    'bills': ('Bills', 'expense', False),
+    'electricity': ('Bills', 'expense', False),
+    'rent': ('Bills', 'expense', False),
+    'recharge': ('Bills', 'expense', False),
+    'internet': ('Bills', 'expense', False),
+    'wifi': ('Bills', 'expense', False),
+    'emi': ('Bills', 'expense', False),
+    # Entertainment
+    'movie': ('Entertainment', 'expense', True),
+    'movies': ('Entertainment', 'expense', True),
+    'netflix': ('Entertainment', 'expense', True),
+    'games': ('Entertainment', 'expense', True),
+    'party': ('Entertainment', 'expense', True),
+    'concert': ('Entertainment', 'expense', True),
+    # Health
+    'medicine': ('Health', 'expense', False),
+    'medicines': ('Health', 'expense', False),
+    'doctor': ('Health', 'expense', False),
+    'hospital': ('Health', 'expense', False),
+    'pharmacy': ('Health', 'expense', False),
+    'gym': ('Health', 'expense', False),
+    # Income
+    'salary': ('Salary', 'income', False),
+    'freelance': ('Freelance', 'income', False),
+    'freelancing': ('Freelance', 'income', False),
+    'business': ('Business', 'income', False),
+    'dividend': ('Investment', 'income', False),
+    'interest': ('Investment', 'income', False),
+}
+
+INCOME_VERBS = {'received', 'got', 'credited', 'earned'}
+EXPENSE_VERBS = {'spent', 'paid', 'bought', 'spend', 'pay'}
+FILLER_WORDS = {
+    'on', 'for', 'of', 'in', 'at', 'to', 'a', 'an', 'the', 'my', 'with',
+    'rs', 'inr', 'rupees', 'rupee', 'payment', 'today',
+}
+# Words that flip or blur what an entry means ("refund 500 amazon" is money
+# back, "salary deducted 500" is not income): always left to the LLM.
+AMBIGUOUS_WORDS = {
+    'refund', 'refunded', 'refunds', 'cashback', 'return', 'returned', 'reversed', 'reversal',
+    'chargeback', 'cancelled', 'canceled', 'deducted', 'deduction', 'back', 'lent', 'lend',
+    'borrowed', 'borrow', 'loan', 'owe', 'owes', 'owed', 'repaid', 'repay', 'split', 'settled',
+}
+
+# A digit-grouped number: thousands ("2,000", "1,000,000") or Indian lakh
+# grouping ("1,50,000", "12,00,000").
+GROUPED_NUMBER = r'\d{1,2}(?:,\d{2})+,\d{3}|\d{1,3}(?:,\d{3})+'
+AMOUNT_RE = re.compile(
+    rf'(?:₹|\$|\brs\.?|\binr)?\s*((?:{GROUPED_NUMBER}|\d+)(?:\.\d+)?)(k\b)?', re.IGNORECASE
+)
+WORD_RE = re.compile(r'[a-z]+')
+# Entry separators: new lines, semicolons, " and " and commas. A grouped
+# number is matched first so the commas inside it never split an entry.
+SPLIT_RE = re.compile(rf'(?<![\d,])(?:{GROUPED_NUMBER})(?![\d,])|(?P<sep>\n|;|\band\b|,)', re.IGNORECASE)
+MAX_ENTRIES = 20
+
+_stats = {'hits': 0, 'misses': 0, 'llm_calls': 0, 'llm_seconds': 0.0}
+
+
+def _amount(text: str):
+    """The one positive amount in text, or None if there isn't exactly one."""
+    amounts = AMOUNT_RE.findall(text)
+    if len(amounts) != 1:
+        return None
+
+    number, thousands = amounts[0]
+    amount = float(number.replace(',', ''))
+    if thousands:
+        amount *= 1000
+    return amount if amount > 0 else None
+
+
+def split_entries(text: str):
+    """The non-empty entries of a message, in order."""
+    segments, start = [], 0
+    for match in SPLIT_RE.finditer(text):
+        if match.group('sep') is not None:
+            segments.append(text[start:match.start()])
+            start = match.end()
+    segments.append(text[start:])
+    return [segment.strip() for segment in segments if segment.strip()]
+
+
+def score_entry(text: str):
+    """Parse a single entry locally.
+
+    Returns (parsed, confidence). parsed has the same keys as
+    categorize_expense, or is None when the message can't be read at all.
+    """
+    amount = _amount(text)
+    if amount is None:
+        return None, 0.0
+
+    words = WORD_RE.findall(AMOUNT_RE.sub(' ', text.lower()))
+    if any(w in AMBIGUOUS_WORDS for w in words):
+        return None, 0.0
+    matches = [LEXICON[w] for w in words if w in LEXICON]
+    if not matches:
+        return None, 0.0
+
+    # Every keyword must point at the same category ("electricity bill" is fine,
+    # "petrol and lunch" is not).
+    if len(set(matches)) != 1:
+        return None, 0.0
+    category, tx_type, is_unnecessary = matches[0]
+
+    confidence = 1.0
+
+    hinted = {'income' for w in words if w in INCOME_VERBS} | {'expense' for w in words if w in EXPENSE_VERBS}
+    if hinted and hinted != {tx_type}:
+        confidence -= 0.5
+
+    leftovers = [
+        w for w in words
+        if w not in LEXICON and w not in INCOME_VERBS and w not in EXPENSE_VERBS and w not in FILLER_WORDS
+    ]
+    confidence -= 0.1 * len(leftovers)
+
+    description = " ".join(w for w in words if w not in FILLER_WORDS and w not in INCOME_VERBS and w not in EXPENSE_VERBS)
+
+    parsed = {
+        "amount": amount,
+        "category": category,
+        "description": description.capitalize() or category,
+        "is_unnecessary": is_unnecessary if tx_type == "expense" else False,
+        "tx_type": tx_type,
+    }
+    return parsed, max(confidence, 0.0)
+
+
+def parse_entries(text: str):
+    """Return the parsed entries if we are confident about all of them, else None (use the LLM).
+
+    "100 food, 50 coffee, 2000 freelance" gives three entries; one entry we
+    can't read sends the whole message to the LLM, still as a single call.
+    """
+    segments = split_entries(text)
+
+    entries = []
+    if 0 < len(segments) <= MAX_ENTRIES:
+        for segment in segments:
+            parsed, confidence = score_entry(segment)
+            if parsed is None or confidence < CONFIDENCE_THRESHOLD:
+                entries = []
+                break
+            entries.append(parsed)
+
+    if entries:
+        _stats['hits'] += 1
+        result = entries
+    else:
+        _stats['misses'] += 1
+        result = None
+
+    if STATS_ENABLED and (_stats['hits'] + _stats['misses']) % STATS_EVERY == 0:
+        print("Fast parser stats:", stats())
+    return result
+
+
+def fallback_entries(text: str):
+    """Best-effort entries for when the LLM is unavailable.
+
+    parse_entries without the confidence bar: an entry we can't categorize is
+    recorded as "Other" (or "Other Income" after an income verb) rather than
+    sent to the LLM. None if some entry has no single readable amount or
+    uses one of AMBIGUOUS_WORDS.
+    """
+    segments = split_entries(text)
+    if not 0 < len(segments) <= MAX_ENTRIES:
+        return None
+
+    entries = []
+    for segment in segments:
+        parsed, _ = score_entry(segment)
+        if parsed is None:
+            amount = _amount(segment)
+            if amount is None:
+                return None
+            words = WORD_RE.findall(AMOUNT_RE.sub(' ', segment.lower()))
+            if any(w in AMBIGUOUS_WORDS for w in words):
+                return None
+            income = any(w in INCOME_VERBS for w in words)
+            description = " ".join(w for w in words if w not in FILLER_WORDS)
+            parsed = {
+                "amount": amount,
+                "category": "Other Income" if income else "Other",
+                "description": description.capitalize() or "Other",
+                "is_unnecessary": False,
+                "tx_type": "income" if income else "expense",
+            }
+        entries.append(parsed)
+    return entries
+
+
+def record_llm_call(seconds: float):
+    """Track how long a fallback LLM call took, to estimate what hits save."""
+    _stats['llm_calls'] += 1
+    _stats['llm_seconds'] += seconds
+
+
+def stats():
+    total = _stats['hits'] + _stats['misses']
+    avg_llm = _stats['llm_seconds'] / _stats['llm_calls'] if _stats['llm_calls'] else 0.0
+    return {
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'hit_rate': _stats['hits'] / total if total else 0.0,
+        'avg_llm_seconds': avg_llm,
+        'llm_calls_saved': _stats['hits'],
+        'llm_seconds_saved': _stats['hits'] * avg_llm,
+    }
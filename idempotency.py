@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import delete
+from models import ProcessedUpdate
+from database import engine
+from llm_cache import LRUCache
+
+
+# Telegram redelivers an update when the webhook is slow to answer. Each
+# update_id is claimed once: recent ids are remembered in memory, and every
+# claim is also an INSERT ... ON CONFLICT DO NOTHING into processedupdate, so
+# redeliveries are caught across restarts and across uvicorn workers.
+#
+# A claimed update is not retried if its handler later fails; that's the
+# trade for never saving the same entry twice.
+
+WINDOW_SIZE = int(os.getenv("UPDATE_DEDUPE_WINDOW", "10000"))
+# Telegram drops undelivered updates after 24 hours, so older ids can't recur.
+TTL_SECONDS = int(os.getenv("UPDATE_DEDUPE_TTL", str(24 * 3600)))
+CLEANUP_INTERVAL = 600
+
+
+class UpdateDeduper:
+    def __init__(self, window=WINDOW_SIZE, ttl=TTL_SECONDS):
+        self.ttl = ttl
+        self._recent = LRUCache(window, ttl)
+        self._last_cleanup = 0.0
+        self._stats = {'claimed': 0, 'duplicates': 0, 'memory_hits': 0, 'db_hits': 0, 'expired_rows': 0}
+
+    def _insert(self, update_id):
+        """Record update_id; True if this call inserted it."""
+        insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        statement = insert(ProcessedUpdate).values(
+            update_id=update_id, received_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=["update_id"])
+        with engine.begin() as conn:
+            inserted = conn.execute(statement).rowcount == 1
+            if time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL:
+                self._last_cleanup = time.monotonic()
+                cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+                expired = conn.execute(delete(ProcessedUpdate).where(ProcessedUpdate.received_at < cutoff))
+                self._stats['expired_rows'] += expired.rowcount
+        return inserted
+
+    async def claim(self, update_id):
+        """True the first time update_id is seen, False for a redelivery."""
+        if self._recent.get(update_id) is not None:
+            self._stats['memory_hits'] += 1
+            self._stats['duplicates'] += 1
+            return False
+
+        inserted = await asyncio.to_thread(self._insert, update_id)
+        self._recent.put(update_id, True)
+        if not inserted:
+            self._stats['db_hits'] += 1
+            self._stats['duplicates'] += 1
+            return False
+        self._stats['claimed'] += 1
+        return True
+
+    def stats(self):
+        return {**self._stats, 'window_entries': len(self._recent)}
+
+
+deduper = UpdateDeduper()
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import csv
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from dateutil import parser as date_parser
+from sqlmodel import Session, select
+from models import Transaction
+from money import to_minor
+from database import engine_for, create_db
+import fast_parser
+import llm
+import rollups
+
+
+# Backfill a user's history from a bank statement CSV:
+#
+#     python import_csv.py statement.csv --user 123456789
+#
+# The file is streamed row by row; rows are deduplicated against what is
+# already stored (as a multiset: two identical purchases on one day are two
+# rows, so a key is imported as many times as the file has it beyond what
+# was stored before the import), categorized with the local lexicon or in batched LLM calls
+# (each distinct description only once), and written in chunked inserts.
+
+DATE_COLUMNS = ["date", "txn date", "transaction date", "value date", "posting date"]
+DESCRIPTION_COLUMNS = ["description", "narration", "details", "particulars", "remarks", "memo"]
+AMOUNT_COLUMNS = ["amount", "transaction amount"]
+DEBIT_COLUMNS = ["debit", "withdrawal", "withdrawal amt.", "withdrawal amount", "debit amount", "dr"]
+CREDIT_COLUMNS = ["credit", "deposit", "deposit amt.", "deposit amount", "credit amount", "cr"]
+
+AMOUNT_CLEAN_RE = re.compile(r"[^\d.\-()]")
+
+
+def _find_column(header, wanted, override=None):
+    names = [h.strip().lower() for h in header]
+    for name in ([override.lower()] if override else wanted):
+        if name in names:
+            return names.index(name)
+    return None
+
+
+def _parse_amount(value):
+    value = AMOUNT_CLEAN_RE.sub("", value or "")
+    if not value or value in ("-", "()"):
+        return None
+    negative = value.startswith("(") and value.endswith(")")
+    amount = float(value.strip("()"))
+    return -amount if negative else amount
+
+
+def _parse_date(value, args):
+    if args.date_format:
+        return datetime.strptime(value, args.date_format)
+    try:
+        # dateutil's dayfirst would read 2026-01-02 as 1 Feb.
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return date_parser.parse(value, dayfirst=not args.month_first)
+
+
+def read_rows(path, args):
+    """Yield (date, description, amount, tx_type) from the CSV, one row at a time."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date_col = _find_column(header, DATE_COLUMNS, args.date_column)
+        desc_col = _find_column(header, DESCRIPTION_COLUMNS, args.description_column)
+        amount_col = _find_column(header, AMOUNT_COLUMNS, args.amount_column)
+        debit_col = _find_column(header, DEBIT_COLUMNS)
+        credit_col = _find_column(header, CREDIT_COLUMNS)
+
+        if date_col is None or desc_col is None or (amount_col is None and debit_col is None and credit_col is None):
+            raise ValueError(f"Could not find date/description/amount columns in header: {header}")
+
+        for row in reader:
+            if not row or len(row) <= max(date_col, desc_col):
+                continue
+            try:
+                day = _parse_date(row[date_col].strip(), args)
+            except (ValueError, OverflowError):
+                continue
+
+            if amount_col is not None:
+                amount = _parse_amount(row[amount_col])
+                if amount is None or amount == 0:
+                    continue
+                tx_type = "income" if amount > 0 else "expense"
+            else:
+                debit = _parse_amount(row[debit_col]) if debit_col is not None else None
+                credit = _parse_amount(row[credit_col]) if credit_col is not None else None
+                if debit:
+                    amount, tx_type = debit, "expense"
+                elif credit:
+                    amount, tx_type = credit, "income"
+                else:
+                    continue
+
+            yield day.replace(tzinfo=None), row[desc_col].strip(), round(abs(amount), 2), tx_type
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def existing_keys(user_id, chunk):
+    """Counter of this user's stored rows in the chunk's date range, by (date, amount, description)."""
+    start = min(row[0] for row in chunk)
+    end = max(row[0] for row in chunk)
+    statement = (
+        select(Transaction.date, Transaction.amount_minor, Transaction.description)
+        .where(Transaction.user_id == user_id)
+        .where(Transaction.date >= start)
+        .where(Transaction.date <= end)
+    )
+    with Session(engine_for(user_id)) as session:
+        return Counter((d, minor, desc) for d, minor, desc in session.exec(statement))
+
+
+async def categorize(rows, memo, batch_size):
+    """Fill memo[(description, tx_type)] for every row, locally or via batched LLM calls.
+
+    The lexicon's answer is only taken above the bot's FAST_PARSER_THRESHOLD;
+    less confident rows go to the LLM like unknown ones.
+    """
+    unknown = {}
+    for _, description, amount, tx_type in rows:
+        key = (description, tx_type)
+        if key in memo or key in unknown:
+            continue
+        parsed, confidence = fast_parser.score_entry(f"{amount} {description}")
+        if (parsed is not None and parsed["tx_type"] == tx_type
+                and confidence >= fast_parser.CONFIDENCE_THRESHOLD):
+            memo[key] = {"category": parsed["category"], "is_unnecessary": parsed["is_unnecessary"]}
+        else:
+            unknown[key] = None
+    unknown = list(unknown)
+
+    for i in range(0, len(unknown), batch_size):
+        batch = unknown[i:i + batch_size]
+        try:
+            results = await llm.categorize_descriptions(batch)
+        except Exception as e:
+            print(f"Categorization failed for {len(batch)} descriptions, using Other: {e}")
+            results = [{"category": "Other" if tx_type == "expense" else "Other Income", "is_unnecessary": False}
+                       for _, tx_type in batch]
+        memo.update(zip(batch, results))
+
+
+def insert_chunk(user_id, rows, memo):
+    with Session(engine_for(user_id), expire_on_commit=False) as session:
+        txs = [
+            Transaction(
+                user_id=user_id,
+                amount_minor=to_minor(amount),
+                category=memo[(description, tx_type)]["category"],
+                description=description,
+                is_unnecessary=memo[(description, tx_type)]["is_unnecessary"],
+                tx_type=tx_type,
+                date=day,
+            )
+            for day, description, amount, tx_type in rows
+        ]
+        session.add_all(txs)
+        rollups.add_many(session, txs)
+        session.commit()
+
+
+async def run(args):
+    create_db()
+    memo = {}
+    stats = {"read": 0, "imported": 0, "duplicates": 0}
+    started = time.perf_counter()
+    seen = Counter()      # occurrences of each key in the file so far
+    inserted = Counter()  # rows of each key this run has written
+
+    for chunk in _chunks(read_rows(args.path, args), args.chunk_size):
+        stats["read"] += len(chunk)
+        # Earlier chunks of this file are already in the table; subtracting
+        # what this run wrote leaves the rows stored before it started.
+        stored = existing_keys(args.user, chunk)
+
+        fresh = []
+        for row in chunk:
+            key = (row[0], to_minor(row[2]), row[1])
+            seen[key] += 1
+            if seen[key] <= stored[key] - inserted[key]:
+                stats["duplicates"] += 1
+                continue
+            fresh.append(row)
+
+        if fresh:
+            await categorize(fresh, memo, args.batch_size)
+            if not args.dry_run:
+                insert_chunk(args.user, fresh, memo)
+                inserted.update((row[0], to_minor(row[2]), row[1]) for row in fresh)
+            stats["imported"] += len(fresh)
+
+        elapsed = time.perf_counter() - started
+        print(f"read {stats['read']} | imported {stats['imported']} | duplicates {stats['duplicates']} "
+              f"| {stats['read'] / elapsed:.0f} rows/s")
+
+    print(f"Done in {time.perf_counter() - started:.1f}s. "
+          f"{len(memo)} distinct descriptions categorized.")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a bank statement CSV for one user.")
+    parser.add_argument("path")
+    parser.add_argument("--user", required=True, help="Telegram user id the rows belong to")
+    parser.add_argument("--date-column")
+    parser.add_argument("--description-column")
+    parser.add_argument("--amount-column", help="signed amount column (negative = expense)")
+    parser.add_argument("--date-format", help="strptime format, e.g. %%d/%%m/%%Y (default: guess, day first)")
+    parser.add_argument("--month-first", action="store_true", help="when guessing dates, read 01/02 as Jan 2")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per insert/commit")
+    parser.add_argument("--batch-size", type=int, default=40, help="descriptions per LLM call")
+    parser.add_argument("--dry-run", action="store_true", help="parse and categorize without writing")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except (OSError, ValueError) as e:
+        sys.exit(f"Import failed: {e}")
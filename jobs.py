@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import deque
+
+
+# Background processing for Telegram updates. Every chat gets its own FIFO
+# lane; a chat is handed to at most one worker at a time, so its updates run
+# in order ("/undo" never overtakes the entry it undoes) while different
+# chats are processed in parallel.
+
+LATENCY_SAMPLES = 1000
+
+
+class JobQueue:
+    def __init__(self, handler, workers=8):
+        self.handler = handler
+        self.workers = workers
+        self._lanes = {}  # chat_id -> deque of (job, enqueued_at)
+        self._ready = None
+        self._tasks = []
+        self._idle = None
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout=10.0):
+        """Let queued jobs finish (up to timeout), then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Job queue: stopping with {self.depth()} jobs left")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, chat_id, job):
+        self._stats['submitted'] += 1
+        self._idle.clear()
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            self._lanes[chat_id] = deque([(job, time.perf_counter())])
+            self._ready.put_nowait(chat_id)
+        else:
+            # The chat is already queued or being worked on; the worker that
+            # owns it picks this up after the jobs in front of it.
+            lane.append((job, time.perf_counter()))
+
+    async def join(self):
+        await self._idle.wait()
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            lane = self._lanes[chat_id]
+            job, enqueued_at = lane[0]
+
+            self._busy += 1
+            started = time.perf_counter()
+            try:
+                await self.handler(job)
+                self._stats['completed'] += 1
+            except Exception as e:
+                self._stats['failed'] += 1
+                print(f"Job failed for chat {chat_id}: {e}")
+            finally:
+                finished = time.perf_counter()
+                self._busy -= 1
+                self._busy_seconds += finished - started
+                self._latencies.append(finished - enqueued_at)
+
+                lane.popleft()
+                if lane:
+                    self._ready.put_nowait(chat_id)
+                else:
+                    del self._lanes[chat_id]
+                    if not self._lanes:
+                        self._idle.set()
+
+    def depth(self):
+        """Jobs waiting to start (not counting the ones being processed)."""
+        return sum(len(lane) for lane in self._lanes.values()) - self._busy
+
+    def stats(self):
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            **self._stats,
+            'depth': self.depth(),
+            'active_chats': len(self._lanes),
+            'workers': self.workers,
+            'busy_workers': self._busy,
+            'utilization': self._busy_seconds / (uptime * self.workers) if uptime else 0.0,
+            'latency_p50': percentile(0.50),
+            'latency_p95': percentile(0.95),
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
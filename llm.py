@@ -1,28 +1,53 @@
 import json
-from groq import Groq
-import os
+import math
 import re
-from dotenv import load_dotenv
-load_dotenv()
+import time
 from datetime import datetime
+import config
+import fast_parser
+import llm_cache
+import llm_governor
+import metrics
+import summary_grammar
+from llm_governor import LLMUnavailable
 
 
-client = Groq(api_key=os.getenv("GROQ_KEY"))
-  
-if not client:
-    raise ValueError("GROQ_API not set in .env")
+# Created on first use: importing the groq SDK is the slowest import in the
+# bot, and most updates never reach the LLM. Tests and benchmarks may assign
+# their own client here.
+client = None
+_own_client = None
 
 
-def categorize_expense(text: str):
-    prompt = f"""
-    You are a financial assistant. Analyze this message and determine if it's an income or expense.
+def get_client():
+    global client, _own_client
+    if client is None:
+        from groq import AsyncGroq
+        # Retries are llm_governor's job, not the SDK's.
+        client = _own_client = AsyncGroq(api_key=config.require("GROQ_KEY"), max_retries=0)
+    return client
+
+
+async def close():
+    """Close the client get_client() created; an assigned one belongs to its owner."""
+    if _own_client is not None:
+        await _own_client.close()
+
+
+MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+
+CATEGORIZE_PROMPT = """
+    You are a financial assistant. The message may contain one or more entries, separated by commas or new lines.
+    For each entry, determine if it's an income or expense.
 
     Message: "{text}"
 
     Income examples: "5000 salary", "1200 freelance", "got paid 3000", "received 500"
     Expense examples: "100 on food", "paid 50 for coffee", "spent 200 on groceries"
+    Several entries: "100 food, 50 coffee, 2000 freelance" → three objects
 
-    Return ONLY valid JSON:
+    Return ONLY a valid JSON array with one object per entry, in the order they appear:
+    [
     {{
     "amount": <positive number>,
     "category": "<category>",
@@ -30,43 +55,13 @@ def categorize_expense(text: str):
     "is_unnecessary": <true/false, always false for income>,
     "tx_type": "<income or expense>"
     }}
+    ]
 
     For income, use categories like: Salary, Freelance, Business, Investment, Gift, Other Income.
     For expense, use categories like: Food, Transport, Shopping, Bills, Entertainment, Health, Other.
     """
 
-    response = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
-
-
-    try:
-        content = response.choices[0].message.content.strip()
-        content = re.sub(r"```json|```", "", content).strip()
-        
-    except Exception as e:
-        print("Invalid LLM Output: ",e)
-    
-    decoder = json.JSONDecoder()
-
-    content = content.strip()
-
-    start = content.find('{')
-    if start != -1:
-        content, index = decoder.raw_decode(content[start:])
-        # print(content)
-    return content
-
-
-
-
-def parse_summary_query(message: str):
-    now = datetime.utcnow()
-    current_date = now.date().isoformat()
-
-    prompt = f"""
+SUMMARY_PROMPT = """
         You are a query parser for an expense and income tracking bot.
 
         Current date: {current_date}
@@ -112,20 +107,200 @@ def parse_summary_query(message: str):
         User message: "{message}"
         """
 
+DESCRIPTIONS_PROMPT = """
+    You are a financial assistant categorizing bank statement lines.
+    Each numbered line below is one transaction: its type (income or expense) and the bank's description.
+
+    {lines}
+
+    Return ONLY a valid JSON array with exactly one object per line, in the same order:
+    [
+    {{"category": "<category>", "is_unnecessary": <true/false, always false for income>}}
+    ]
+
+    For income, use categories like: Salary, Freelance, Business, Investment, Gift, Other Income.
+    For expense, use categories like: Food, Transport, Shopping, Bills, Entertainment, Health, Other.
+    """
+
+# Bump automatically whenever a template is edited, so old cache entries stop matching.
+CATEGORIZE_VERSION = llm_cache.prompt_version(CATEGORIZE_PROMPT)
+SUMMARY_VERSION = llm_cache.prompt_version(SUMMARY_PROMPT)
+DESCRIPTIONS_VERSION = llm_cache.prompt_version(DESCRIPTIONS_PROMPT)
+
+
+async def _request(prompt_name, prompt):
+    """One chat completion, recorded in the LLM latency/token/error metrics."""
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",  # Or your preferred model
+        response = await get_client().chat.completions.create(
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0  # Low temp for consistency
         )
-        content = response.choices[0].message.content.strip()
+    except Exception:
+        metrics.LLM_ERRORS.inc(prompt=prompt_name)
+        raise
+    finally:
+        metrics.LLM_SECONDS.observe(time.perf_counter() - started, prompt=prompt_name)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, prompt=prompt_name, type="prompt")
+        metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, prompt=prompt_name, type="completion")
+    return response.choices[0].message.content or ""
+
+
+async def _complete(prompt_name, prompt):
+    """A completion through the governor; raises LLMUnavailable if Groq can't answer."""
+    return await llm_governor.governor.call(prompt, lambda: _request(prompt_name, prompt))
+
+
+def invalidate_stale_cache():
+    llm_cache.invalidate_stale({
+        "categorize": CATEGORIZE_VERSION,
+        "summary": SUMMARY_VERSION,
+        "descriptions": DESCRIPTIONS_VERSION,
+    })
+
+
+ENTRY_KEYS = ("amount", "category", "description")
+TX_TYPES = ("income", "expense")
+
+
+def _checked_entry(entry):
+    """An LLM entry in the shape save_transactions expects; ValueError if it can't be saved."""
+    missing = [key for key in ENTRY_KEYS if entry.get(key) in (None, "")]
+    if missing:
+        raise ValueError(f"LLM entry without {', '.join(missing)}: {entry!r}")
+    try:
+        amount = float(str(entry["amount"]).replace(",", ""))
+    except ValueError:
+        amount = None
+    if isinstance(entry["amount"], bool) or amount is None or not (math.isfinite(amount) and amount > 0):
+        raise ValueError(f"LLM entry without a positive amount: {entry!r}")
+    tx_type = str(entry.get("tx_type") or "expense").lower()
+    if tx_type not in TX_TYPES:
+        raise ValueError(f"LLM entry with tx_type {tx_type!r}: {entry!r}")
+    return {
+        "amount": amount,
+        "category": str(entry["category"]),
+        "description": str(entry["description"]),
+        "is_unnecessary": bool(entry.get("is_unnecessary")) and tx_type == "expense",
+        "tx_type": tx_type,
+    }
+
+
+async def categorize_expense(text: str):
+    """Return the list of entries in the message (usually just one)."""
+    cache_key = llm_cache.make_key("categorize", text, MODEL, CATEGORIZE_VERSION)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = CATEGORIZE_PROMPT.format(text=text)
+    try:
+        content = await _complete("categorize", prompt)
+    except LLMUnavailable as e:
+        entries = fast_parser.fallback_entries(text)
+        if entries is None:
+            raise
+        print(f"Categorize fell back to the local parser: {e}")
+        metrics.LLM_GOVERNOR.inc(event="fallback")
+        return entries
+    content = re.sub(r"```json|```", "", content).strip()
+
+    try:
+        start = min((i for i in (content.find('['), content.find('{')) if i != -1), default=-1)
+        if start == -1:
+            raise ValueError(f"Invalid LLM Output: {content!r}")
+
+        # raw_decode ignores any chatter after the JSON.
+        parsed, _ = json.JSONDecoder().raw_decode(content[start:])
+        entries = parsed if isinstance(parsed, list) else [parsed]
+        entries = [entry for entry in entries if isinstance(entry, dict)]
+        if not entries:
+            raise ValueError(f"No entries in LLM output: {content!r}")
+        # Checked before caching, so a malformed answer isn't served again.
+        entries = [_checked_entry(entry) for entry in entries]
+    except ValueError:
+        metrics.LLM_PARSE_FAILURES.inc(prompt="categorize")
+        raise
+
+    await llm_cache.put(cache_key, "categorize", CATEGORIZE_VERSION, entries)
+    return entries
+
+
+async def categorize_descriptions(items):
+    """Categorize many (description, tx_type) pairs in one LLM call.
+
+    Returns one {"category", "is_unnecessary"} dict per item, in order.
+    Descriptions seen before are answered from the cache.
+    """
+    keys = [
+        llm_cache.make_key("descriptions", description, MODEL, DESCRIPTIONS_VERSION, tx_type)
+        for description, tx_type in items
+    ]
+    results = [await llm_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    lines = "\n".join(
+        f"{n}. {items[i][1]}: {items[i][0]}" for n, i in enumerate(missing, start=1)
+    )
+    content = await _complete("descriptions", DESCRIPTIONS_PROMPT.format(lines=lines))
+    content = re.sub(r"```json|```", "", content).strip()
+    try:
+        start = content.find('[')
+        if start == -1:
+            raise ValueError(f"Invalid LLM Output: {content!r}")
+        parsed, _ = json.JSONDecoder().raw_decode(content[start:])
+        if not isinstance(parsed, list) or len(parsed) != len(missing):
+            raise ValueError(f"Expected {len(missing)} categories, got {content!r}")
+        if not all(isinstance(result, dict) for result in parsed):
+            raise ValueError(f"Expected one object per description, got {content!r}")
+    except ValueError:
+        metrics.LLM_PARSE_FAILURES.inc(prompt="descriptions")
+        raise
+
+    for i, result in zip(missing, parsed):
+        result = {
+            "category": str(result.get("category") or "Other"),
+            "is_unnecessary": bool(result.get("is_unnecessary")) and items[i][1] == "expense",
+        }
+        results[i] = result
+        await llm_cache.put(keys[i], "descriptions", DESCRIPTIONS_VERSION, result)
+    return results
+
+
+async def parse_summary_query(message: str):
+    now = datetime.utcnow()
+    current_date = now.date().isoformat()
+
+    cache_key = llm_cache.make_key("summary", message, MODEL, SUMMARY_VERSION, current_date)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = SUMMARY_PROMPT.format(current_date=current_date, message=message)
+
+    try:
+        content = await _complete("summary", prompt)
+    except LLMUnavailable as e:
+        print(f"Summary query fell back to the local grammar: {e}")
+        metrics.LLM_GOVERNOR.inc(event="fallback")
+        return summary_grammar.parse(message, now.date(), strict=False) or {"is_summary": False}
+
+    try:
         content = re.sub(r"```json|```", "", content).strip()
         parsed = json.loads(content)
         if parsed.get("is_summary") and parsed.get("period") == "custom":
             if not (parsed.get("start_date") and parsed.get("end_date")):
                 raise ValueError("Missing dates for custom")
-        
-        return parsed
-    except Exception as e:
+    except (ValueError, AttributeError) as e:
+        metrics.LLM_PARSE_FAILURES.inc(prompt="summary")
         print(f"Query parse error: {e}")
-        return {"is_summary": False}
\ No newline at end of file
+        return {"is_summary": False}
+
+    await llm_cache.put(cache_key, "summary", SUMMARY_VERSION, parsed)
+    return parsed
\ No newline at end of file
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, delete, func
+from models import LLMCacheEntry
+from database import engine
+
+
+# LLM answers are requested at temperature=0, so the same prompt gives the
+# same answer. We keep recent answers in memory (LRU + TTL) and back them
+# with a table so they survive restarts.
+
+MEMORY_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "50000"))
+# The table is trimmed back to MAX_ROWS at most this often, not on every write.
+PRUNE_INTERVAL = 600
+
+
+class LRUCache:
+    """Small in-process LRU cache with an optional per-entry TTL.
+
+    Not thread-safe: use each one from a single thread (the event loop).
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        return self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_memory = LRUCache(MEMORY_SIZE, TTL_SECONDS)
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'db_evictions': 0}
+_last_prune = 0.0
+
+
+def prompt_version(template: str):
+    """Short hash of a prompt template; changes whenever the prompt is edited."""
+    return hashlib.sha256(template.encode()).hexdigest()[:12]
+
+
+def normalize(text: str):
+    return " ".join(text.lower().split())
+
+
+def make_key(namespace, text, model, version, *extra):
+    parts = [namespace, model, version, normalize(text), *[str(e) for e in extra]]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _get_from_db(key):
+    with Session(engine) as session:
+        row = session.get(LLMCacheEntry, key)
+        if row and row.created_at >= datetime.utcnow() - timedelta(seconds=TTL_SECONDS):
+            return json.loads(row.response)
+    return None
+
+
+def _put_to_db(key, namespace, version, value):
+    # An upsert rather than session.merge: callers that shared one coalesced
+    # LLM request all store its answer at once.
+    insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+    values = dict(namespace=namespace, prompt_version=version, response=json.dumps(value),
+                  created_at=datetime.utcnow())
+    statement = insert(LLMCacheEntry).values(key=key, **values)
+    statement = statement.on_conflict_do_update(index_elements=["key"], set_=values)
+    with Session(engine) as session:
+        session.exec(statement)
+        session.commit()
+
+    global _last_prune
+    if time.monotonic() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.monotonic()
+        prune()
+
+
+def prune(max_rows=MAX_ROWS):
+    """Keep the table bounded: drop the oldest rows once it is over max_rows."""
+    with Session(engine) as session:
+        count = session.exec(select(func.count()).select_from(LLMCacheEntry)).one()
+        if count > max_rows:
+            oldest = session.exec(
+                select(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.created_at)
+                .limit(count - max_rows)
+            ).all()
+            session.exec(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+            session.commit()
+            _stats['db_evictions'] += len(oldest)
+
+
+async def get(key):
+    """Memory first, then the table. The SQLite lookup runs off the event loop.
+
+    _memory is only touched on the event loop, never from the lookup thread:
+    the LRU is a plain OrderedDict.
+    """
+    value = _memory.get(key)
+    if value is not None:
+        _stats['memory_hits'] += 1
+        return value
+    value = await asyncio.to_thread(_get_from_db, key)
+    if value is None:
+        _stats['misses'] += 1
+        return None
+    _memory.put(key, value)
+    _stats['db_hits'] += 1
+    return value
+
+
+async def put(key, namespace, version, value):
+    _memory.put(key, value)
+    await asyncio.to_thread(_put_to_db, key, namespace, version, value)
+
+
+def invalidate_stale(current_versions):
+    """Drop entries written by older prompt templates.
+
+    current_versions maps namespace -> prompt_version.
+    """
+    _memory.clear()
+    with Session(engine) as session:
+        for namespace, version in current_versions.items():
+            session.exec(
+                delete(LLMCacheEntry)
+                .where(LLMCacheEntry.namespace == namespace)
+                .where(LLMCacheEntry.prompt_version != version)
+            )
+        session.exec(
+            delete(LLMCacheEntry)
+            .where(LLMCacheEntry.created_at < datetime.utcnow() - timedelta(seconds=TTL_SECONDS))
+        )
+        session.commit()
+
+
+def stats():
+    lookups = _stats['memory_hits'] + _stats['db_hits'] + _stats['misses']
+    return {
+        **_stats,
+        'hit_rate': (_stats['memory_hits'] + _stats['db_hits']) / lookups if lookups else 0.0,
+        'memory_entries': len(_memory),
+        'memory_evictions': _memory.evictions,
+    }
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import random
+import time
+import metrics
+
+
+# Every Groq call goes through one LLMGovernor (llm._complete):
+#
+#   - at most MAX_CONCURRENCY requests in flight; the rest wait for a slot,
+#     for up to QUEUE_TIMEOUT_SECONDS
+#   - each request to Groq is cut off after TIMEOUT_SECONDS
+#   - identical prompts already in flight share that one request
+#   - 429s are retried after a jittered exponential backoff (or Retry-After)
+#   - BREAKER_FAILURES failed calls in a row open the circuit: calls are
+#     refused straight away for BREAKER_COOLDOWN seconds, then one probe
+#     call decides whether to close it again
+#
+# Only Groq's own failures count toward the circuit: a call that gave up
+# waiting for a local slot says nothing about Groq's health.
+#
+# A refused or failed call raises LLMUnavailable; llm.py then answers from
+# the local parsers (fast_parser.fallback_entries, summary_grammar strict=False).
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT", "15"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+RETRY_MAX_SECONDS = 10.0
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not answer: circuit open, no free slot, timeout, or the call failed."""
+
+
+class _QueueTimeout(Exception):
+    """No concurrency slot freed up in time; Groq was never asked."""
+
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._probing:
+            return False
+        self._probing = True  # half open: let exactly one call through
+        return True
+
+    def success(self):
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    def abandon(self):
+        """A call that was let through never reached Groq; free the probe slot without judging."""
+        self._probing = False
+
+    def failure(self):
+        self._consecutive += 1
+        self._probing = False
+        if self._opened_at is not None or self._consecutive >= self.failures:
+            if self._opened_at is None:
+                print(f"LLM circuit opened after {self._consecutive} failures in a row")
+            self._opened_at = time.monotonic()
+
+
+def _rate_limited(error):
+    return getattr(error, "status_code", None) == 429
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class LLMGovernor:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, timeout=TIMEOUT_SECONDS, max_retries=MAX_RETRIES,
+                 retry_base=RETRY_BASE_SECONDS, breaker=None, queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+        self._stats = {'calls': 0, 'coalesced': 0, 'retries': 0, 'timeouts': 0, 'queue_timeouts': 0,
+                       'failures': 0, 'rejected': 0}
+
+    async def call(self, key, request):
+        """Run request() (a coroutine function) under the governor's limits.
+
+        Concurrent calls with the same key share one request and its result.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._stats['coalesced'] += 1
+            metrics.LLM_GOVERNOR.inc(event="coalesced")
+        else:
+            if not self.breaker.allow():
+                self._stats['rejected'] += 1
+                metrics.LLM_GOVERNOR.inc(event="rejected")
+                raise LLMUnavailable("circuit open")
+            self._stats['calls'] += 1
+            task = asyncio.ensure_future(self._run(request))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: one caller giving up must not cancel the others' request.
+        return await asyncio.shield(task)
+
+    async def _attempt(self, request):
+        # The slot wait has its own limit; only the request itself is timed
+        # against TIMEOUT_SECONDS.
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError as e:
+            raise _QueueTimeout() from e
+        try:
+            return await asyncio.wait_for(request(), self.timeout)
+        finally:
+            self._slots.release()
+
+    async def _run(self, request):
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await self._attempt(request)
+            except _QueueTimeout as e:
+                self._stats['queue_timeouts'] += 1
+                metrics.LLM_GOVERNOR.inc(event="queue_timeout")
+                self.breaker.abandon()
+                raise LLMUnavailable(f"no free LLM slot within {self.queue_timeout:g}s") from e
+            except asyncio.TimeoutError as e:
+                self._stats['timeouts'] += 1
+                metrics.LLM_GOVERNOR.inc(event="timeout")
+                self._fail()
+                raise LLMUnavailable(f"no answer within {self.timeout:g}s") from e
+            except Exception as e:
+                if _rate_limited(e) and attempt < self.max_retries:
+                    self._stats['retries'] += 1
+                    metrics.LLM_GOVERNOR.inc(event="retry")
+                    backoff = random.uniform(0, min(RETRY_MAX_SECONDS, self.retry_base * 2 ** attempt))
+                    await asyncio.sleep(max(backoff, _retry_after(e)))
+                    continue
+                self._fail()
+                raise LLMUnavailable(str(e) or type(e).__name__) from e
+            self.breaker.success()
+            return result
+
+    def _fail(self):
+        self._stats['failures'] += 1
+        self.breaker.failure()
+
+    def stats(self):
+        return {
+            **self._stats,
+            'in_flight': len(self._in_flight),
+            'circuit': self.breaker.state,
+        }
+
+
+governor = LLMGovernor()
@@ -1,30 +1,73 @@
+import config
 import os
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlmodel import Session, select
-from datetime import datetime, timedelta
-import requests
-import re
+import hmac
 from models import Transaction
-from database import engine, create_db
-from llm import categorize_expense, parse_summary_query
-from utils import send_message, build_summary_reply, get_summary
-from dotenv import load_dotenv
-from dateutil.relativedelta import relativedelta
-from datetime import datetime, timedelta
-import calendar
-
-
-load_dotenv()
-
-app = FastAPI()
-
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-if not TELEGRAM_TOKEN:
-    raise ValueError("TELEGRAM_TOKEN not set in .env")
-
-
-create_db()
+from database import engine_for, create_db
+import llm
+from llm import categorize_expense, parse_summary_query, invalidate_stale_cache
+from utils import send_message, build_summary_reply, build_entries_reply, get_summary
+import time
+import fast_parser
+import summary_grammar
+import llm_cache
+import llm_governor
+import rollups
+import summary_cache
+import telegram_sender
+import exporter
+import digests
+import budgets
+import money
+import idempotency
+import router
+import metrics
+from jobs import JobQueue
+
+
+# Bearer token for GET /export/{user_id}; the endpoint is off when unset.
+EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN")
+
+_initialized = False
+
+
+def init():
+    """Migrate the schema and drop stale LLM cache rows, once per process.
+
+    Run from the lifespan hook (and by poller.py), not at import, so that
+    importing main stays cheap for workers, scripts and benchmarks.
+    """
+    global _initialized
+    if not _initialized:
+        create_db()
+        invalidate_stale_cache()
+        _initialized = True
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(init)
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await telegram_sender.sender.close()
+    await llm.close()
+
+
+routes = APIRouter()
+
+
+def create_app():
+    """Build the web app: uvicorn main:app, or uvicorn main:create_app --factory."""
+    config.require("TELEGRAM_TOKEN")
+    config.require("GROQ_KEY")
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(routes)
+    return app
 
 
 # ----------------------
@@ -37,29 +80,51 @@ create_db()
 # ----------------------
 # Save Transaction
 # ----------------------
-def save_transaction(user_id, data):
-    with Session(engine) as session:
-        tx = Transaction(
-            user_id=user_id,
-            amount=data["amount"],
-            category=data["category"],
-            description=data["description"],
-            is_unnecessary=data["is_unnecessary"],
-            tx_type=data.get("tx_type", "expense")  
-        )
-        session.add(tx)
+def save_transactions(user_id, entries):
+    """Insert every entry of one message in a single commit.
+
+    Returns (transactions, budget alerts the entries triggered).
+    """
+    # expire_on_commit=False: ids and dates are set client-side, so there is
+    # nothing to re-read and no refresh per row.
+    with Session(engine_for(user_id), expire_on_commit=False) as session:
+        txs = [
+            Transaction(
+                user_id=user_id,
+                amount_minor=money.to_minor(data["amount"]),
+                category=data["category"],
+                description=data["description"],
+                is_unnecessary=data["is_unnecessary"],
+                tx_type=data.get("tx_type", "expense")
+            )
+            for data in entries
+        ]
+        session.add_all(txs)
+        moved = rollups.add_many(session, txs)
+        alerts = budgets.check(session, user_id, moved)
         session.commit()
-        session.refresh(tx)
-        return tx
+
+    for day in {tx.date.date() for tx in txs}:
+        summary_cache.cache.invalidate(user_id, day)
+    return txs, alerts
+
+
+def save_transaction(user_id, data):
+    txs, _ = save_transactions(user_id, [data])
+    return txs[0]
+
+
+def last_transaction_statement(user_id):
+    return (
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc())
+    )
 
 
 def delete_last_transaction(user_id):
-    with Session(engine) as session:
-        statement = (
-            select(Transaction)
-            .where(Transaction.user_id == user_id)
-            .order_by(Transaction.date.desc())
-        )
+    with Session(engine_for(user_id)) as session:
+        statement = last_transaction_statement(user_id)
 
         last_tx = session.exec(statement).first()
 
@@ -67,131 +132,113 @@ def delete_last_transaction(user_id):
             return None
 
         session.delete(last_tx)
+        rollups.remove(session, last_tx)
         session.commit()
+        summary_cache.cache.invalidate(user_id, last_tx.date.date())
 
         return last_tx
-# ----------------------
-# Detect if message is expense
-# ----------------------
-def is_expense_message(text):
-    text_lower = text.lower()
-    
-    # Detect digits (e.g., "20", "100.50")
-    if re.search(r'\d+(\.\d+)?', text):
-        return True
-    
-    # Detect spelled-out numbers (basic list; expand as needed)
-    number_words = [
-        'zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
-        'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen',
-        'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety',
-        'hundred', 'thousand', 'million', 'billion'
-    ]
-    # Check for number words, allowing compounds like "twenty five"
-    words = re.findall(r'\b\w+\b', text_lower)
-    if any(word in number_words for word in words):
-        return True
-    
-    # Detect currency symbols or words (e.g., "₹", "rupees", "$")
-    currency_indicators = ['₹', 'rs', 'rupee', 'rupees', 'dollar', 'dollars', '$', 'euro', 'euros', '£', 'pound', 'pounds']
-    if any(ind in text_lower for ind in currency_indicators):
-        return True
-    
-    # Exclude if it looks like a summary query (to avoid false positives)
-    summary_keywords = ['summary', 'report', 'show', 'waste', 'month', 'week', 'expenses', 'spent last']
-    if any(keyword in text_lower for keyword in summary_keywords):
-        return False
-    
-    return False
-
-
-def get_summary(user_id, period='month', unnecessary_only=False, start_date=None, end_date=None, tx_type=None):
-    """Fetch expense summary for a period."""
-    now = datetime.utcnow()
-    
-    if start_date and end_date:
-        # Custom range
-        date_filter_start = datetime.fromisoformat(start_date)
-        date_filter_end = datetime.fromisoformat(end_date) + timedelta(days=1)  # Include end day
-    
-    elif period == 'last_week':
-        # Last full week: Monday to Sunday
-        last_monday = now - timedelta(days=now.weekday())
-        date_filter_start = last_monday - timedelta(days=7)
-        date_filter_end = last_monday
-    elif period == 'this_week':
-        # This week to date: Current Monday to now
-        current_monday = now - timedelta(days=now.weekday())
-        date_filter_start = current_monday
-        date_filter_end = now + timedelta(days=1)
-    elif period == 'last_month':
-        # Last full month
-        first_of_month = now.replace(day=1)
-        date_filter_start = first_of_month - relativedelta(months=1)  # Last month
-        _, last_day = calendar.monthrange(date_filter_start.year, date_filter_start.month)
-        date_filter_end = date_filter_start.replace(day=last_day) + timedelta(days=1)
-    elif period == 'this_month':
-        # This month to date
-        date_filter_start = now.replace(day=1)
-        date_filter_end = now + timedelta(days=1)
-    else:
-        raise ValueError("Invalid period")
-
-    with Session(engine) as session:
-        statement = select(Transaction).where(Transaction.user_id == user_id)
-        statement = statement.where(Transaction.date >= date_filter_start)
-        statement = statement.where(Transaction.date < date_filter_end)
-
-        if unnecessary_only:
-            statement = statement.where(Transaction.is_unnecessary == True)
-        if tx_type:
-            statement = statement.where(Transaction.tx_type == tx_type)  # ← filter
-
-        results = session.exec(statement).all()
-
-        expenses = sum(tx.amount for tx in results if tx.tx_type == "expense")
-        income   = sum(tx.amount for tx in results if tx.tx_type == "income")
-        total    = sum(tx.amount for tx in results)
-
-        category_breakdown = {}
-        for tx in results:
-            category_breakdown[tx.category] = category_breakdown.get(tx.category, 0) + tx.amount
-
-        days_in_period = (date_filter_end - date_filter_start).days
-        avg_daily = expenses / days_in_period if days_in_period > 0 else 0
-        top_category = max(
-            (k for k in category_breakdown),
-            key=category_breakdown.get
-        ) if category_breakdown else None
-
-        return {
-            'total': total,
-            'expenses': expenses,       
-            'income': income,           
-            'net': income - expenses,   
-            'breakdown': category_breakdown,
-            'avg_daily': avg_daily,
-            'top_category': top_category,
-            'start_date': date_filter_start.date(),
-            'end_date': (date_filter_end - timedelta(days=1)).date()
-        }
+
 
 # ----------------------
 # Telegram Webhook
 # ----------------------
-@app.post("/webhook")
-async def telegram_webhook(request: Request):
-    data = await request.json()
+async def accept_update(data):
+    """Validate, dedupe and enqueue one Telegram update.
+
+    Shared by the webhook and the long-polling runner (poller.py).
+    """
+    message = data.get("message") if isinstance(data, dict) else None
+    if not message or "chat" not in message or "from" not in message:
+        return "ignored"
 
-    message = data.get("message")
-    if not message:
+    # A redelivered update was already queued once; drop it before any work.
+    update_id = data.get("update_id")
+    if update_id is not None and not await idempotency.deduper.claim(update_id):
+        return "duplicate"
+
+    job_queue.submit(message["chat"]["id"], data)
+    return "queued"
+
+
+@routes.post("/webhook")
+async def telegram_webhook(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
         return {"status": "ignored"}
 
+    # Reply to Telegram straight away; the slow work happens in the job queue.
+    return {"status": await accept_update(data)}
+
+
+@routes.get("/stats")
+async def stats():
+    return {
+        "jobs": job_queue.stats(),
+        "updates": idempotency.deduper.stats(),
+        "fast_parser": fast_parser.stats(),
+        "llm": llm_governor.governor.stats(),
+        "llm_cache": llm_cache.stats(),
+        "summary_cache": summary_cache.cache.stats(),
+        "telegram": telegram_sender.sender.stats(),
+    }
+
+
+# Read at scrape time from the same counters /stats reports.
+metrics.register_callback("bot_job_queue_depth", "Updates waiting in the job queue.", "gauge",
+                          lambda: job_queue.depth())
+metrics.register_callback("bot_job_workers_busy", "Job queue workers handling an update.", "gauge",
+                          lambda: job_queue.stats()["busy_workers"])
+metrics.register_callback("bot_duplicate_updates_total", "Redelivered updates dropped before queueing.",
+                          "counter", lambda: idempotency.deduper.stats()["duplicates"])
+metrics.register_callback("bot_llm_circuit_open", "1 while Groq calls are refused and local parsers answer.",
+                          "gauge", lambda: int(llm_governor.governor.breaker.state == "open"))
+metrics.register_callback("bot_fast_parser_hits_total", "Entries parsed without calling the LLM.",
+                          "counter", lambda: fast_parser.stats()["hits"])
+
+
+@routes.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@routes.get("/export/{user_id}")
+def export_transactions(user_id: str, request: Request, format: str = "csv"):
+    supplied = request.headers.get("authorization", "")
+    if not EXPORT_API_TOKEN or not hmac.compare_digest(supplied, f"Bearer {EXPORT_API_TOKEN}"):
+        raise HTTPException(status_code=404)
+    if format not in exporter.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {exporter.FORMATS}")
+    # A plain generator: Starlette iterates it in a worker thread, so the
+    # streaming DB cursor never blocks the event loop.
+    return StreamingResponse(
+        exporter.iter_export(user_id, format),
+        media_type=exporter.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions_{user_id}.{format}"'},
+    )
+
+
+async def handle_update(data):
+    started = time.perf_counter()
+    result = {"status": "failed"}
+    try:
+        result = await _handle_update(data)
+        return result
+    finally:
+        metrics.UPDATE_SECONDS.observe(time.perf_counter() - started, kind=result["status"])
+
+
+async def _handle_update(data):
+    message = data["message"]
     text = message.get("text", "")
     chat_id = message["chat"]["id"]
     user_id = str(message["from"]["id"])
 
-    if text == '/start':
+    with metrics.stage("route"):
+        routed = router.route(text)
+    command = routed["command"]
+
+    if command == 'start':
         reply = (
         "Hey 👋\n\n"
         "Just send your expenses like:\n"
@@ -206,9 +253,9 @@ async def telegram_webhook(request: Request):
         "Type /help if you get stuck."
         )
 
-        send_message(chat_id, reply)
+        await send_message(chat_id, reply)
         return {"status": "start"}
-    elif text == '/help':
+    elif command == 'help':
         reply = (
             "🤖 *Money Tracker Bot Help*\n\n"
 
@@ -238,19 +285,23 @@ async def telegram_webhook(request: Request):
             "↩️ *Other Commands*\n"
             "• /start – Welcome message\n"
             "• /undo – Delete last transaction\n"
+            "• /export – Download all transactions (CSV, or /export jsonl)\n"
+            "• /digest weekly|monthly|off – Scheduled summaries\n"
+            "• /budget Food 5000 – Monthly budget, alerts at 80% and 100% (/budget to list)\n"
             "• /help – Show this help message\n\n"
 
             "✨ Tip: You can just chat naturally. I understand context!"
         )
 
-        send_message(chat_id, reply)
+        await send_message(chat_id, reply)
         return {"status": "help"}
         
-    elif text == '/undo':
-        last_tx = delete_last_transaction(user_id)
+    elif command == 'undo':
+        with metrics.stage("db_undo"):
+            last_tx = await asyncio.to_thread(delete_last_transaction, user_id)
 
         if not last_tx:
-            send_message(chat_id, "⚠️ No transactions to undo.")
+            await send_message(chat_id, "⚠️ No transactions to undo.")
             return {"status": "nothing to undo"}
 
         reply = (
@@ -258,30 +309,76 @@ async def telegram_webhook(request: Request):
             f"from {last_tx.category}"
         )
 
-        send_message(chat_id, reply)
+        await send_message(chat_id, reply)
         return {"status": "undone"}
 
+    elif command == 'export':
+        fmt = routed["argument"] or "csv"
+        if fmt not in exporter.FORMATS:
+            await send_message(chat_id, "⚠️ Usage: /export or /export jsonl")
+            return {"status": "bad export format"}
 
-    # EXPENSE / INCOME ENTRY
-    if is_expense_message(text):
+        with metrics.stage("export"):
+            path, filename, rows = await asyncio.to_thread(exporter.export_to_file, user_id, fmt)
         try:
-            parsed = categorize_expense(text)
-            tx = save_transaction(user_id, parsed)
+            if rows == 0:
+                await send_message(chat_id, "⚠️ No transactions to export yet.")
+                return {"status": "nothing to export"}
+            await telegram_sender.sender.send_document(
+                chat_id, path, filename, caption=f"📦 {rows} transactions"
+            )
+        finally:
+            os.remove(path)
+        return {"status": "exported"}
+
+    elif command == 'digest':
+        choice = routed["argument"] or "status"
+        if choice not in (*digests.KINDS, "off", "status"):
+            await send_message(chat_id, "⚠️ Usage: /digest weekly, /digest monthly or /digest off")
+            return {"status": "bad digest option"}
+
+        kinds = await asyncio.to_thread(digests.set_subscription, user_id, chat_id, choice)
+        if kinds:
+            reply = f"🗞 You'll get a {' and a '.join(kinds)} summary. Stop with /digest off"
+        else:
+            reply = "🔕 No scheduled summaries. Start with /digest weekly or /digest monthly"
+        await send_message(chat_id, reply)
+        return {"status": "digest"}
+
+    elif command == 'budget':
+        parsed = budgets.parse_argument(routed["argument"])
+        if parsed is None:
+            await send_message(chat_id, "⚠️ Usage: /budget Food 5000, /budget Food off, or /budget to list")
+            return {"status": "bad budget"}
+
+        category, amount = parsed
+        if category:
+            await asyncio.to_thread(budgets.set_budget, user_id, category, amount)
+        rows = await asyncio.to_thread(budgets.budget_report, user_id)
+        await send_message(chat_id, budgets.build_budgets_reply(rows))
+        return {"status": "budget"}
 
-            if tx.tx_type == "income":
-                reply = (
-                    f"💰 ₹{tx.amount} income recorded under {tx.category}\n"
-                    f"📝 {tx.description}"
-                )
-            else:
-                reply = (
-                    f"✅ ₹{tx.amount} added under {tx.category}\n"
-                    f"Marked as {'Unnecessary' if tx.is_unnecessary else 'Essential'}"
-                )
-            send_message(chat_id, reply)
+
+    # EXPENSE / INCOME ENTRY
+    if routed["kind"] == "entry":
+        try:
+            with metrics.stage("fast_parse"):
+                entries = fast_parser.parse_entries(text)
+            if entries is None:
+                llm_started = time.perf_counter()
+                with metrics.stage("llm"):
+                    entries = await categorize_expense(text)
+                fast_parser.record_llm_call(time.perf_counter() - llm_started)
+            with metrics.stage("db_save"):
+                txs, alerts = await asyncio.to_thread(save_transactions, user_id, entries)
+
+            reply = build_entries_reply(txs)
+            if alerts:
+                reply += "\n\n" + budgets.build_alert_reply(alerts)
+            await send_message(chat_id, reply)
 
         except Exception as e:
-            send_message(chat_id, "❌ Could not understand. Try again.")
+            await send_message(chat_id, "❌ Could not understand. Try again.")
         return {"status": "recorded"}
 
     # QUERY SECTION
@@ -289,7 +386,11 @@ async def telegram_webhook(request: Request):
 
 
     try:
-        parsed = parse_summary_query(text)
+        with metrics.stage("grammar"):
+            parsed = summary_grammar.parse(text)
+        if parsed is None:
+            with metrics.stage("llm"):
+                parsed = await parse_summary_query(text)
         if parsed.get("is_summary"):
             period_type = parsed.get("period")
             unnecessary_only = parsed.get("unnecessary_only", False)
@@ -298,14 +399,16 @@ async def telegram_webhook(request: Request):
             
             if period_type == 'custom' and (start_date is None or end_date is None):
                 raise ValueError("Missing dates for custom period")
-            summary = get_summary(
-                user_id, 
-                period=period_type, 
-                unnecessary_only=unnecessary_only, 
-                start_date=start_date if period_type == 'custom' else None,
-                end_date=end_date if period_type == 'custom' else None,
-                tx_type=parsed.get("tx_type") 
-            )
+            with metrics.stage("db_summary"):
+                summary = await asyncio.to_thread(
+                    get_summary,
+                    user_id,
+                    period=period_type, 
+                    unnecessary_only=unnecessary_only, 
+                    start_date=start_date if period_type == 'custom' else None,
+                    end_date=end_date if period_type == 'custom' else None,
+                    tx_type=parsed.get("tx_type") 
+                )
             
             title_base = {
                 'last_week': 'Last Week',
@@ -318,14 +421,14 @@ async def telegram_webhook(request: Request):
             
             reply = build_summary_reply(summary, title, unnecessary_only)
             
-            send_message(chat_id, reply)
+            await send_message(chat_id, reply)
             return {"status": "summary sent"}
     except Exception as e:
-        send_message(chat_id, "❌ Could not generate summary. Try clearer phrasing like 'last month expenses' or check /help.")
+        await send_message(chat_id, "❌ Could not generate summary. Try clearer phrasing like 'last month expenses' or check /help.")
         return {"status": "error"}
 
     # FALLBACK (after try-except)
-    send_message(
+    await send_message(
         chat_id,
         "🤔 I didn't understand that.\n\n"
         "💰 Add income like:\n"
@@ -341,4 +444,8 @@ async def telegram_webhook(request: Request):
         "• From 2026-01-01 to 2026-01-31\n\n"
         "Type /help for full guide."
     )
-    return {"status": "default"}
\ No newline at end of file
+    return {"status": "default"}
+
+
+job_queue = JobQueue(handle_update, workers=int(os.getenv("WEBHOOK_WORKERS", "8")))
+app = create_app()
@@ -0,0 +1,222 @@
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, inspect
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel, Session, select, func
+from models import Transaction, DailyRollup, SchemaVersion, time_ordered_id
+from money import to_minor
+import rollups
+
+
+# Schema migrations, applied in order at startup by database.create_db().
+# create_all() only creates missing tables; anything that changes an
+# existing table (indexes, columns) needs a step here.
+#
+# A brand-new database is created at the latest schema by create_all(), so
+# it is stamped with the latest version instead of replaying every step.
+
+
+def _add_transaction_indexes(conn):
+    for index in Transaction.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _backfill_daily_rollups(conn):
+    # Databases from before step 3 have no amount_minor to sum yet; step 3
+    # rebuilds the rollups once amounts are converted.
+    columns = {c["name"] for c in inspect(conn).get_columns(Transaction.__tablename__)}
+    if "amount_minor" in columns:
+        rollups.rebuild(conn)
+
+
+COMPACT_CHUNK = 5000
+
+
+def _compact_transaction_schema(conn):
+    """Rewrite transaction with integer time-ordered ids and amounts in paise.
+
+    Old rows get ids from their own date, so id order matches date order.
+    The indexes are built after the copy, which is much faster than
+    maintaining them row by row.
+    """
+    table = Transaction.__table__
+    conn.exec_driver_sql('ALTER TABLE "transaction" RENAME TO transaction_legacy')
+    # Postgres keeps the primary key's name (transaction_pkey) through the
+    # rename, and constraint names must be unique, so move it out of the way.
+    pkey = inspect(conn).get_pk_constraint("transaction_legacy").get("name")
+    if conn.dialect.name == "postgresql" and pkey:
+        conn.exec_driver_sql(f'ALTER TABLE transaction_legacy RENAME CONSTRAINT "{pkey}" TO transaction_legacy_pkey')
+    conn.execute(CreateTable(table))
+
+    legacy = Table("transaction_legacy", MetaData(), autoload_with=conn)
+    rows = conn.execution_options(stream_results=True, yield_per=COMPACT_CHUNK).execute(
+        select(legacy).order_by(legacy.c.date)
+    )
+    for chunk in rows.partitions():
+        conn.execute(table.insert(), [
+            {
+                "id": time_ordered_id(row.date),
+                "user_id": row.user_id,
+                "amount_minor": to_minor(row.amount),
+                "category": row.category,
+                "description": row.description,
+                "is_unnecessary": row.is_unnecessary,
+                "tx_type": row.tx_type,
+                "date": row.date,
+            }
+            for row in chunk
+        ])
+
+    legacy.drop(conn)
+    for index in table.indexes:
+        index.create(conn)
+
+    DailyRollup.__table__.drop(conn, checkfirst=True)
+    DailyRollup.__table__.create(conn)
+    rollups.rebuild(conn)
+
+
+def _add_rollup_day_index(conn):
+    for index in DailyRollup.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _backfill_monthly_spend(conn):
+    rollups.rebuild_spend(conn)
+
+
+MIGRATIONS = [
+    (1, "Composite (user_id, date) indexes on transaction", _add_transaction_indexes),
+    (2, "Backfill dailyrollup from transaction", _backfill_daily_rollups),
+    (3, "Integer time-ordered transaction ids, amounts in paise", _compact_transaction_schema),
+    (4, "Index dailyrollup by day for scheduled digests", _add_rollup_day_index),
+    (5, "Backfill monthlyspend (month-to-date spend for budgets)", _backfill_monthly_spend),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# Any constant works, as long as every worker uses the same one.
+MIGRATION_LOCK_ID = 7_106_257
+# How long a worker waits for another one's migration (e.g. step 3 on a big table).
+MIGRATION_LOCK_TIMEOUT_MS = int(os.getenv("MIGRATION_LOCK_TIMEOUT_MS", "600000"))
+
+
+def current_version(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.max(SchemaVersion.version))).one() or 0
+
+
+@contextmanager
+def _locked(conn):
+    """Run a transaction on conn that holds the database-wide migration lock.
+
+    BEGIN IMMEDIATE takes SQLite's write lock up front; on Postgres a
+    transaction-scoped advisory lock does the same. Either is released by
+    the commit or rollback at the end.
+    """
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout={MIGRATION_LOCK_TIMEOUT_MS}")
+    try:
+        if sqlite:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})")
+        yield
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if sqlite:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout={busy_timeout}")
+
+
+def _stamp(conn, version, description):
+    conn.execute(SchemaVersion.__table__.insert().values(
+        version=version, description=description, applied_at=datetime.utcnow()
+    ))
+
+
+def migrate(engine):
+    """Create missing tables and apply pending migrations.
+
+    Every uvicorn worker calls this from its startup hook, so it runs under
+    the migration lock: the first worker creates or migrates the schema, the
+    others wait, then re-read the version and find nothing left to do.
+    """
+    with engine.connect() as conn:
+        with _locked(conn):
+            fresh = not inspect(conn).has_table(Transaction.__tablename__)
+            SQLModel.metadata.create_all(conn)
+            if fresh:
+                for version, description, _ in MIGRATIONS:
+                    _stamp(conn, version, description)
+                return
+
+        # One transaction per step, re-checking the version under the lock.
+        for version, description, step in MIGRATIONS:
+            with _locked(conn):
+                applied = conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+                if version <= applied:
+                    continue
+                print(f"Applying migration {version}: {description}")
+                step(conn)
+                _stamp(conn, version, description)
+
+
+# ----------------------
+# Query plan checks
+# ----------------------
+def hot_queries():
+    """The statements the bot runs on every summary, /undo, /export and digest run."""
+    from rollups import summary_statement, all_users_statement
+    from main import last_transaction_statement
+    from exporter import export_statement
+
+    now = datetime.utcnow()
+    start = now - timedelta(days=30)
+    return {
+        "summary": summary_statement("user", start, now),
+        "summary by tx_type": summary_statement("user", start, now, tx_type="expense"),
+        "summary unnecessary only": summary_statement("user", start, now, unnecessary_only=True),
+        "last transaction (/undo)": last_transaction_statement("user").limit(1),
+        "export (/export)": export_statement("user"),
+        "all users (digests)": all_users_statement(now - timedelta(days=7), now),
+    }
+
+
+def check_query_plans(engine):
+    """EXPLAIN every hot query and fail if any of them scans a whole table."""
+    ok = True
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as conn:
+        if postgres:
+            # Postgres prefers a seq scan on small tables even when an index
+            # fits; with seq scans priced out, one only shows up if no index does.
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, statement in hot_queries().items():
+            compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+            if postgres:
+                plan = [row[0].strip() for row in conn.exec_driver_sql(f"EXPLAIN {compiled}")]
+                scans = [step for step in plan if "Seq Scan" in step]
+            else:
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+                scans = [step for step in plan if step.startswith("SCAN")]
+            status = "SCAN" if scans else "ok"
+            ok = ok and not scans
+            print(f"[{status}] {name}: " + " | ".join(plan))
+    return ok
+
+
+if __name__ == "__main__":
+    from database import engine, create_db
+
+    create_db()
+    print(f"Schema version {current_version(engine)} (latest {LATEST_VERSION})")
+    if "--check-plans" in sys.argv:
+        sys.exit(0 if check_query_plans(engine) else 1)
@@ -1,12 +1,47 @@
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional
-from sqlmodel import SQLModel, Field
-import uuid
+import random
+import threading
+from sqlalchemy import BigInteger, Column, Integer
+from sqlmodel import SQLModel, Field, Index
+from money import from_minor
+
+# Transaction ids are 63-bit integers: milliseconds since ID_EPOCH in the high
+# 41 bits, a sequence in the low 22. They sort by creation time, so inserts
+# append to the end of the primary-key B-tree instead of landing on random
+# pages, and on SQLite the key is the rowid itself (no separate index).
+# The sequence starts at a random point each millisecond so ids from several
+# processes are very unlikely to meet.
+ID_EPOCH = datetime(2000, 1, 1)
+ID_SEQUENCE_BITS = 22
+# INTEGER PRIMARY KEY is SQLite's rowid alias; BIGINT elsewhere.
+ID_TYPE = BigInteger().with_variant(Integer, "sqlite")
+
+_id_lock = threading.Lock()
+_last_id = 0
+
+
+def time_ordered_id(when=None):
+    global _last_id
+    ms = max(0, int(((when or datetime.utcnow()) - ID_EPOCH).total_seconds() * 1000))
+    candidate = ms << ID_SEQUENCE_BITS | random.getrandbits(ID_SEQUENCE_BITS - 2)
+    with _id_lock:
+        _last_id = max(candidate, _last_id + 1)
+        return _last_id
+
 
 class Transaction(SQLModel, table=True):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    # Every hot query is per user and by date: summaries filter a date range
+    # (optionally by tx_type), /undo takes the latest row.
+    __table_args__ = (
+        Index("ix_transaction_user_date", "user_id", "date"),
+        Index("ix_transaction_user_type_date", "user_id", "tx_type", "date"),
+    )
+
+    id: int = Field(default_factory=time_ordered_id,
+                    sa_column=Column(ID_TYPE, primary_key=True, autoincrement=False))
     user_id: str
-    amount: float
+    amount_minor: int  # paise; see money.py
     category: str
     description: str
     is_unnecessary: bool
@@ -14,3 +49,81 @@ class Transaction(SQLModel, table=True):
 
     date: datetime = Field(default_factory=datetime.utcnow)
 
+    @property
+    def amount(self):
+        return from_minor(self.amount_minor)
+
+
+class DailyRollup(SQLModel, table=True):
+    """Per-user daily totals, kept in step with Transaction by rollups.py."""
+    # Scheduled digests read one date range for every user at once.
+    __table_args__ = (Index("ix_dailyrollup_day", "day"),)
+
+    user_id: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    tx_type: str = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    is_unnecessary: bool = Field(primary_key=True)
+    total_minor: int = 0
+    count: int = 0
+
+
+class MonthlySpend(SQLModel, table=True):
+    """Per-user month-to-date expense total per category, kept by rollups.py for budget checks."""
+    user_id: str = Field(primary_key=True)
+    month: date = Field(primary_key=True)  # first day of the month
+    category: str = Field(primary_key=True)
+    spent_minor: int = 0
+
+
+class WriteGeneration(SQLModel, table=True):
+    """Counts the writes to a user's transactions; summary_cache compares it, so every worker sees them."""
+    user_id: str = Field(primary_key=True)
+    generation: int = 0
+
+
+class CategoryBudget(SQLModel, table=True):
+    """Monthly spending limit a user set for one category (/budget Food 5000)."""
+    user_id: str = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    limit_minor: int
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    namespace: str
+    prompt_version: str
+    response: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ProcessedUpdate(SQLModel, table=True):
+    """Telegram update_ids already accepted, so redeliveries are dropped."""
+    # update_ids can outgrow a 32-bit INTEGER on Postgres.
+    update_id: int = Field(sa_column=Column(BigInteger, primary_key=True, autoincrement=False))
+    received_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class DigestSubscription(SQLModel, table=True):
+    """Users who asked for scheduled digests (/digest weekly|monthly)."""
+    user_id: str = Field(primary_key=True)
+    chat_id: int = Field(sa_column=Column(BigInteger, nullable=False))
+    weekly: bool = False
+    monthly: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DigestDelivery(SQLModel, table=True):
+    """One row per digest claimed for a user and period; sent_at is set once Telegram accepted it."""
+    kind: str = Field(primary_key=True)
+    period_start: date = Field(primary_key=True)
+    user_id: str = Field(primary_key=True)
+    claimed_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+
+class SchemaVersion(SQLModel, table=True):
+    version: int = Field(primary_key=True)
+    description: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,17 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+
+# Amounts are stored as integers in minor units (paise), so sums are exact.
+# Convert at the edges: to_minor() when an amount comes in from a user, the
+# LLM or a CSV, from_minor() when one goes out in a reply or an export.
+
+MINOR_UNITS = 100
+
+
+def to_minor(amount):
+    """150, 150.5 or "150.50" -> 15050. Rounds half up to the nearest paisa."""
+    return int((Decimal(str(amount)) * MINOR_UNITS).to_integral_value(ROUND_HALF_UP))
+
+
+def from_minor(minor):
+    return (minor or 0) / MINOR_UNITS
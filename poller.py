@@ -0,0 +1,137 @@
+import asyncio
+import os
+import signal
+import httpx
+import main
+import llm
+import telegram_sender
+
+
+# Long-polling alternative to the webhook, for running without a public
+# HTTPS endpoint:
+#
+#     python poller.py
+#
+# Updates are pulled with getUpdates in batches. Each batch goes through the
+# same main.accept_update() as /webhook, so the job queue processes chats in
+# parallel and each chat's updates in order. The next offset is only sent to
+# Telegram (which is what confirms the batch) once the whole batch has been
+# handled; if the process dies mid-batch, Telegram hands the batch out again
+# and the update_id store drops whatever had already been accepted.
+#
+# Telegram refuses getUpdates while a webhook is set, so it is removed on start.
+
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "30"))
+POLL_LIMIT = int(os.getenv("POLL_LIMIT", "100"))
+
+
+class Poller:
+    def __init__(self, timeout=POLL_TIMEOUT, limit=POLL_LIMIT):
+        self.timeout = timeout
+        self.limit = limit
+        self.offset = None
+        self._stopping = asyncio.Event()
+        self._failures = 0
+        self._stats = {'batches': 0, 'updates': 0, 'queued': 0, 'duplicates': 0, 'ignored': 0, 'errors': 0}
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _call(self, method, payload, timeout=10.0):
+        sender = telegram_sender.sender
+        response = await sender.client.post(sender.url(method), json=payload, timeout=timeout)
+        body = response.json()
+        if not body.get("ok"):
+            retry_after = body.get("parameters", {}).get("retry_after")
+            raise RuntimeError(f"{method} failed: {response.status_code} {body.get('description')}"
+                               + (f" (retry after {retry_after}s)" if retry_after else ""))
+        return body["result"]
+
+    async def get_updates(self, timeout, limit):
+        payload = {"timeout": timeout, "limit": limit, "allowed_updates": ["message"]}
+        if self.offset is not None:
+            payload["offset"] = self.offset
+        # The HTTP timeout has to outlast the long poll itself.
+        return await self._call("getUpdates", payload, timeout=timeout + 10)
+
+    async def _next_batch(self):
+        """Long-poll for the next batch; empty if stopping or on error."""
+        poll = asyncio.ensure_future(self.get_updates(self.timeout, self.limit))
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({poll, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not poll.done():
+            poll.cancel()
+            return []
+
+        try:
+            updates = poll.result()
+        except (httpx.HTTPError, ValueError, RuntimeError) as e:
+            await self._back_off(e)
+            return []
+        self._failures = 0
+        return updates
+
+    async def _back_off(self, error):
+        self._stats['errors'] += 1
+        self._failures += 1
+        delay = min(30, 2 ** self._failures)
+        print(f"Poller: {error}; retrying in {delay}s")
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def process(self, updates):
+        for update in updates:
+            try:
+                status = await main.accept_update(update)
+            except Exception as e:
+                # e.g. the update_id store's database is down. Leave the
+                # offset where it was: the whole batch is fetched again and
+                # the updates accepted so far are dropped as duplicates.
+                await main.job_queue.join()
+                await self._back_off(f"could not accept update {update.get('update_id')}: {e!r}")
+                return
+            self._stats[{'queued': 'queued', 'duplicate': 'duplicates'}.get(status, 'ignored')] += 1
+        await main.job_queue.join()
+        self.offset = updates[-1]["update_id"] + 1
+        self._stats['batches'] += 1
+        self._stats['updates'] += len(updates)
+
+    async def run(self):
+        await asyncio.to_thread(main.init)
+        await self._call("deleteWebhook", {"drop_pending_updates": False})
+        main.job_queue.start()
+        try:
+            while not self._stopping.is_set():
+                updates = await self._next_batch()
+                if updates:
+                    await self.process(updates)
+            if self.offset is not None:
+                # Confirm the last batch so a restart doesn't fetch it again.
+                try:
+                    await self.get_updates(timeout=0, limit=1)
+                except (httpx.HTTPError, ValueError, RuntimeError) as e:
+                    print(f"Poller: could not confirm offset {self.offset}: {e}")
+        finally:
+            await main.job_queue.stop()
+            await telegram_sender.sender.close()
+            await llm.close()
+
+    def stats(self):
+        return {**self._stats, 'offset': self.offset}
+
+
+async def _run():
+    poller = Poller()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, poller.stop)
+    print(f"Polling for updates (timeout {poller.timeout}s, up to {poller.limit} per batch)")
+    await poller.run()
+    print("Poller stopped:", poller.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(_run())
@@ -0,0 +1,286 @@
+import sys
+from sqlalchemy import Boolean, Date, bindparam, cast, text
+from sqlmodel import select, delete, func, case
+from models import Transaction, DailyRollup, MonthlySpend
+import summary_cache
+
+
+# Daily rollups: one row per (user, day, tx_type, category, is_unnecessary)
+# with the running total (in paise) and row count. save_transactions/delete_last_transaction
+# update them in the same DB transaction as the raw row, so a summary only
+# has to read O(days x categories) rows instead of every transaction.
+#
+# Expenses are also summed per (user, month, category) in monthlyspend, so a
+# budget check reads one row. Each month is its own row: totals start from
+# zero at month rollover without any reset job.
+
+def _key(tx):
+    return dict(
+        user_id=tx.user_id,
+        day=tx.date.date(),
+        tx_type=tx.tx_type,
+        category=tx.category,
+        is_unnecessary=tx.is_unnecessary,
+    )
+
+
+# Both upserts run on every save. SQLAlchemy's dialect insert().on_conflict_*
+# statements are not cacheable, so building them per call meant compiling
+# them per call, which cost more than executing them. They are written out
+# once instead: INSERT ... ON CONFLICT ... RETURNING reads the same on SQLite
+# and Postgres.
+ROLLUP_UPSERT = text(
+    "INSERT INTO dailyrollup (user_id, day, tx_type, category, is_unnecessary, total_minor, count) "
+    "VALUES (:user_id, :day, :tx_type, :category, :is_unnecessary, :total_minor, :count) "
+    "ON CONFLICT (user_id, day, tx_type, category, is_unnecessary) DO UPDATE SET "
+    "total_minor = dailyrollup.total_minor + excluded.total_minor, count = dailyrollup.count + excluded.count"
+).bindparams(bindparam("day", type_=Date), bindparam("is_unnecessary", type_=Boolean))
+
+SPEND_UPSERT = text(
+    "INSERT INTO monthlyspend (user_id, month, category, spent_minor) "
+    "VALUES (:user_id, :month, :category, :amount) "
+    "ON CONFLICT (user_id, month, category) DO UPDATE SET "
+    "spent_minor = monthlyspend.spent_minor + excluded.spent_minor "
+    "RETURNING spent_minor"
+).bindparams(bindparam("month", type_=Date))
+
+
+def _upsert(session, values, total, count):
+    # Core execution on the session's connection: same transaction, without
+    # the ORM's bulk-DML layer.
+    session.connection().execute(ROLLUP_UPSERT, {**values, "total_minor": total, "count": count})
+
+
+def _month(when):
+    return when.date().replace(day=1)
+
+
+def _add_spend(session, user_id, month, category, amount):
+    """Add amount to a month-to-date total and return the new total, in one statement.
+
+    The upsert takes the row's write lock, so concurrent savers each see the
+    total including their own amount and every earlier one.
+    """
+    params = {"user_id": user_id, "month": month, "category": category, "amount": amount}
+    return session.connection().execute(SPEND_UPSERT, params).scalar_one()
+
+
+def add_many(session, txs):
+    """Count new transactions, one upsert per rollup row. Call before session.commit().
+
+    Returns {(month, category): (spent before, spent after)} for the
+    month-to-date expense totals the transactions moved.
+    """
+    grouped = {}
+    spent = {}
+    for tx in txs:
+        key = tuple(_key(tx).items())
+        total, count = grouped.get(key, (0, 0))
+        grouped[key] = (total + tx.amount_minor, count + 1)
+        if tx.tx_type == "expense":
+            month_key = (tx.user_id, _month(tx.date), tx.category)
+            spent[month_key] = spent.get(month_key, 0) + tx.amount_minor
+    for key, (total, count) in grouped.items():
+        _upsert(session, dict(key), total, count)
+
+    moved = {}
+    for (user_id, month, category), amount in spent.items():
+        after = _add_spend(session, user_id, month, category, amount)
+        moved[(month, category)] = (after - amount, after)
+    for user_id in {tx.user_id for tx in txs}:
+        summary_cache.bump_generation(session.connection(), user_id)
+    return moved
+
+
+def remove(session, tx):
+    """Un-count a deleted transaction. Call before session.commit()."""
+    key = _key(tx)
+    _upsert(session, key, -tx.amount_minor, -1)
+    statement = delete(DailyRollup).where(DailyRollup.count <= 0)
+    for column, value in key.items():
+        statement = statement.where(getattr(DailyRollup, column) == value)
+    session.exec(statement)
+    if tx.tx_type == "expense":
+        _add_spend(session, tx.user_id, _month(tx.date), tx.category, -tx.amount_minor)
+    summary_cache.bump_generation(session.connection(), tx.user_id)
+
+
+def summary_statement(user_id, date_filter_start, date_filter_end, unnecessary_only=False, tx_type=None):
+    """Per-category (category, expenses, income, total) rows for get_summary, in paise.
+
+    Categories come back in the order they were first used in the range.
+    """
+    statement = (
+        select(
+            DailyRollup.category,
+            func.sum(case((DailyRollup.tx_type == "expense", DailyRollup.total_minor), else_=0)),
+            func.sum(case((DailyRollup.tx_type == "income", DailyRollup.total_minor), else_=0)),
+            func.sum(DailyRollup.total_minor),
+        )
+        .where(DailyRollup.user_id == user_id)
+        .where(DailyRollup.day >= date_filter_start.date())
+        .where(DailyRollup.day < date_filter_end.date())
+        .group_by(DailyRollup.category)
+        .order_by(func.min(DailyRollup.day), DailyRollup.category)
+    )
+    if unnecessary_only:
+        statement = statement.where(DailyRollup.is_unnecessary == True)
+    if tx_type:
+        statement = statement.where(DailyRollup.tx_type == tx_type)
+    return statement
+
+
+def all_users_statement(date_filter_start, date_filter_end):
+    """(user_id, category, expenses, income, total) rows for every user in one range, in paise.
+
+    The batch form of summary_statement for scheduled digests: one pass over
+    the range instead of one query per user. Rows come grouped by user, each
+    user's categories in summary_statement's order.
+    """
+    return (
+        select(
+            DailyRollup.user_id,
+            DailyRollup.category,
+            func.sum(case((DailyRollup.tx_type == "expense", DailyRollup.total_minor), else_=0)),
+            func.sum(case((DailyRollup.tx_type == "income", DailyRollup.total_minor), else_=0)),
+            func.sum(DailyRollup.total_minor),
+        )
+        .where(DailyRollup.day >= date_filter_start.date())
+        .where(DailyRollup.day < date_filter_end.date())
+        .group_by(DailyRollup.user_id, DailyRollup.category)
+        .order_by(DailyRollup.user_id, func.min(DailyRollup.day), DailyRollup.category)
+    )
+
+
+# ----------------------
+# Rebuild / verify
+# ----------------------
+def _raw_rollup_select(dialect, user_id=None):
+    day = func.date(Transaction.date) if dialect == "sqlite" else cast(Transaction.date, Date)
+    statement = (
+        select(
+            Transaction.user_id,
+            day.label("day"),
+            Transaction.tx_type,
+            Transaction.category,
+            Transaction.is_unnecessary,
+            func.sum(Transaction.amount_minor).label("total_minor"),
+            func.count().label("count"),
+        )
+        .group_by(Transaction.user_id, day, Transaction.tx_type, Transaction.category, Transaction.is_unnecessary)
+    )
+    if user_id:
+        statement = statement.where(Transaction.user_id == user_id)
+    return statement
+
+
+def _raw_spend_select(dialect, user_id=None):
+    if dialect == "sqlite":
+        month = func.date(Transaction.date, "start of month")
+    else:
+        month = cast(func.date_trunc("month", Transaction.date), Date)
+    statement = (
+        select(
+            Transaction.user_id,
+            month.label("month"),
+            Transaction.category,
+            func.sum(Transaction.amount_minor).label("spent_minor"),
+        )
+        .where(Transaction.tx_type == "expense")
+        .group_by(Transaction.user_id, month, Transaction.category)
+    )
+    if user_id:
+        statement = statement.where(Transaction.user_id == user_id)
+    return statement
+
+
+def rebuild(conn, user_id=None):
+    """Recompute rollups and month-to-date spend from the raw table (all users, or one).
+
+    Running bots notice a one-user rebuild at once; after a full rebuild
+    their cached summaries expire within SUMMARY_CACHE_TTL.
+    """
+    statement = delete(DailyRollup)
+    if user_id:
+        statement = statement.where(DailyRollup.user_id == user_id)
+    conn.execute(statement)
+    conn.execute(
+        DailyRollup.__table__.insert().from_select(
+            ["user_id", "day", "tx_type", "category", "is_unnecessary", "total_minor", "count"],
+            _raw_rollup_select(conn.dialect.name, user_id),
+        )
+    )
+    rebuild_spend(conn, user_id)
+    if user_id:
+        summary_cache.bump_generation(conn, user_id)
+
+
+def rebuild_spend(conn, user_id=None):
+    """Recompute only the month-to-date spend totals from the raw table."""
+    statement = delete(MonthlySpend)
+    if user_id:
+        statement = statement.where(MonthlySpend.user_id == user_id)
+    conn.execute(statement)
+    conn.execute(
+        MonthlySpend.__table__.insert().from_select(
+            ["user_id", "month", "category", "spent_minor"],
+            _raw_spend_select(conn.dialect.name, user_id),
+        )
+    )
+
+
+def verify(engine, user_id=None):
+    """Compare rollups with the raw table. Returns the keys that disagree."""
+    with engine.connect() as conn:
+        expected = {
+            (r.user_id, str(r.day), r.tx_type, r.category, bool(r.is_unnecessary)): (r.total_minor, r.count)
+            for r in conn.execute(_raw_rollup_select(engine.dialect.name, user_id))
+        }
+        statement = select(DailyRollup)
+        if user_id:
+            statement = statement.where(DailyRollup.user_id == user_id)
+        actual = {
+            (r.user_id, str(r.day), r.tx_type, r.category, bool(r.is_unnecessary)): (r.total_minor, r.count)
+            for r in conn.execute(statement)
+        }
+
+        # Month-to-date spend, keyed like the daily rows: (user, month, "spend", category).
+        for r in conn.execute(_raw_spend_select(engine.dialect.name, user_id)):
+            expected[(r.user_id, str(r.month), "spend", r.category)] = (r.spent_minor,)
+        statement = select(MonthlySpend)
+        if user_id:
+            statement = statement.where(MonthlySpend.user_id == user_id)
+        for r in conn.execute(statement):
+            if r.spent_minor:
+                actual[(r.user_id, str(r.month), "spend", r.category)] = (r.spent_minor,)
+
+    drift = []
+    for key in expected.keys() | actual.keys():
+        empty = (0, 0) if len(key) == 5 else (0,)
+        want, got = expected.get(key, empty), actual.get(key, empty)
+        if want != got:
+            drift.append((key, want, got))
+    return drift
+
+
+if __name__ == "__main__":
+    from database import create_db, engine_for, user_engines
+
+    usage = "usage: python rollups.py verify|rebuild [user_id]"
+    if len(sys.argv) < 2 or sys.argv[1] not in ("verify", "rebuild"):
+        sys.exit(usage)
+    user = sys.argv[2] if len(sys.argv) > 2 else None
+
+    create_db()
+    engines = [engine_for(user)] if user else user_engines()
+    if sys.argv[1] == "rebuild":
+        for engine in engines:
+            with engine.begin() as conn:
+                rebuild(conn, user)
+        print("Rollups rebuilt.")
+
+    drift = [d for engine in engines for d in verify(engine, user)]
+    for key, want, got in drift:
+        print(f"DRIFT {key}: raw total/count {want}, rollup {got}")
+    print(f"{len(drift)} rollup rows out of step with the raw table")
+    sys.exit(1 if drift else 0)
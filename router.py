@@ -0,0 +1,117 @@
+import re
+
+
+# Decides what an incoming message is before any parsing happens:
+#
+#   command  "/undo", "/export jsonl", "/help@MyExpenseBot"
+#   entry    "100 on food", "paid ₹250 for petrol", "five hundred rent"
+#   summary  "this month summary", "how much did I waste last week?",
+#            "From 2026-01-01 to 2026-01-31"
+#   unknown  nothing either way ("hello"); the summary path and the LLM decide
+#
+# route() tokenizes the message once with a single compiled pattern and
+# scores entry and summary cues from set lookups; confidence is the winning
+# side's share of the total score. Words are matched whole, so "rs" no
+# longer fires on "hours" or "drinks", and dates are not amounts. A period
+# phrase ("last 3 months", "past two weeks") counts like a date, so its
+# number is not an amount either.
+
+COMMANDS = {'start', 'help', 'undo', 'export', 'digest', 'budget'}
+
+COMMAND_RE = re.compile(r'/([a-z_]+)(?:@\w+)?(?:\s+(.*))?', re.S)
+TOKEN_RE = re.compile(
+    r'(?P<date>\d{4}-\d{2}-\d{2})'
+    r'|(?P<period>\b(?:last|past|previous)\s+'
+    r'(?:\d+|few|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)\s+(?:day|week|month|year)s?\b)'
+    r'|(?P<number>\d+(?:[.,]\d+)*)'
+    r'|(?P<symbol>[₹$£€])'
+    r'|(?P<word>[a-z]+)'
+)
+
+NUMBER_WORDS = {
+    'zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+    'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen',
+    'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety',
+    'hundred', 'thousand', 'lakh', 'lakhs', 'million', 'billion',
+}
+CURRENCY_WORDS = {
+    'rs', 'inr', 'rupee', 'rupees', 'dollar', 'dollars', 'usd', 'euro', 'euros',
+    'pound', 'pounds', 'bucks',
+}
+ENTRY_VERBS = {
+    'spent', 'paid', 'pay', 'bought', 'buy', 'gave', 'received', 'got', 'earned',
+    'credited', 'debited', 'transferred', 'sent',
+}
+QUERY_WORDS = {
+    'summary', 'report', 'overview', 'breakdown', 'total', 'totals', 'stats', 'show',
+    'waste', 'wasted', 'unnecessary', 'splurged', 'splurging',
+}
+# Weak summary cues: they only make a summary together with something else.
+TOPIC_WORDS = {
+    'how', 'what', 'where', 'much', 'money', 'spend', 'spending', 'expenses', 'income', 'earnings',
+    'today', 'yesterday', 'day', 'days', 'week', 'weeks', 'weekly', 'month', 'months',
+    'monthly', 'year', 'years', 'yearly', 'lately',
+}
+
+# Per-token weights. An entry needs an amount; without one, the verbs are
+# talking about past spending ("how much have I spent") and count as topic.
+NUMBER, NUMBER_WORD, CURRENCY, VERB = 2, 1, 2, 1
+QUERY, TOPIC, DATE, PERIOD = 2, 1, 2, 2
+SUMMARY_THRESHOLD = 2
+
+# word -> (score slot, weight), so each word costs one dict lookup.
+AMOUNT, VERBS, SUMMARY = 0, 1, 2
+WORD_SCORES = {
+    **{word: (SUMMARY, TOPIC) for word in TOPIC_WORDS},
+    **{word: (SUMMARY, QUERY) for word in QUERY_WORDS},
+    **{word: (VERBS, VERB) for word in ENTRY_VERBS},
+    **{word: (AMOUNT, CURRENCY) for word in CURRENCY_WORDS},
+    **{word: (AMOUNT, NUMBER_WORD) for word in NUMBER_WORDS},
+}
+
+
+def _route(kind, confidence, command=None, argument=""):
+    return {"kind": kind, "confidence": confidence, "command": command, "argument": argument}
+
+
+def route(text: str):
+    """Classify a message. Returns {"kind", "confidence", "command", "argument"}."""
+    text = text.strip()
+    if text.startswith('/'):
+        match = COMMAND_RE.fullmatch(text.lower())
+        if match and match.group(1) in COMMANDS:
+            return _route("command", 1.0, match.group(1), (match.group(2) or "").strip())
+
+    scores = [0, 0, 0]
+    for match in TOKEN_RE.finditer(text.lower()):
+        group = match.lastgroup
+        if group == 'word':
+            hit = WORD_SCORES.get(match.group())
+            if hit:
+                scores[hit[0]] += hit[1]
+        elif group == 'number':
+            scores[AMOUNT] += NUMBER
+        elif group == 'symbol':
+            scores[AMOUNT] += CURRENCY
+        elif group == 'period':
+            scores[SUMMARY] += PERIOD
+        else:
+            scores[SUMMARY] += DATE
+
+    amount, verbs, query = scores
+    if amount:
+        entry = amount + verbs
+        # Ties go to entry: "spent 500 this month" is more often a record than a question.
+        if entry >= query:
+            return _route("entry", entry / (entry + query))
+        return _route("summary", query / (entry + query))
+    query += verbs
+    if query >= SUMMARY_THRESHOLD:
+        return _route("summary", min(1.0, query / (2 * SUMMARY_THRESHOLD)))
+    return _route("unknown", query / SUMMARY_THRESHOLD)
+
+
+if __name__ == "__main__":
+    import sys
+    for message in sys.argv[1:]:
+        print(f"{message!r:45} {route(message)}")
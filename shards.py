@@ -0,0 +1,117 @@
+import argparse
+import glob
+import os
+import re
+import sys
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import sqlite
+import database
+from database import DB_SHARD_DIR, DB_SHARDS, engine_for
+from migrations import migrate
+from models import CategoryBudget, DailyRollup, MonthlySpend, Transaction, WriteGeneration
+import rollups
+
+
+# Moves users to the database that DB_SHARDS says they belong in:
+#
+#   python shards.py status                # where users are, and how many are misplaced
+#   python shards.py rebalance [--dry-run]  # move them
+#
+# Sources are expensess.db and every shard file in DB_SHARD_DIR, so the same
+# command splits the single file into shards, re-spreads users after DB_SHARDS
+# changes, and (with DB_SHARDS=0) merges everything back into expensess.db.
+# Run it with the bot stopped. Each user is copied (insert-or-ignore by id,
+# budgets included), their rollups rebuilt in the target, and only then
+# deleted from the source, so an interrupted run is safe to repeat.
+
+SHARD_FILE_RE = re.compile(r"expenses-(\d+)\.db$")
+COPY_ROWS = 1000
+
+
+def sources():
+    """[(name, engine)] for every database that may hold user data."""
+    found = [("expensess.db", database.engine)]
+    for path in sorted(glob.glob(os.path.join(DB_SHARD_DIR, "expenses-*.db"))):
+        match = SHARD_FILE_RE.search(path)
+        if not match:
+            continue
+        index = int(match.group(1))
+        if index < DB_SHARDS:
+            shard = database.shard_engine(index)
+        else:
+            shard = database.make_engine(database.DB_PROFILE, url=f"sqlite:///{path}")
+        found.append((os.path.basename(path), shard))
+    return found
+
+
+def users(engine):
+    """{user_id: transaction count} in one database, including users who only set budgets."""
+    statement = select(Transaction.user_id, func.count()).group_by(Transaction.user_id)
+    with engine.connect() as conn:
+        found = dict(conn.execute(statement).all())
+        for user_id in conn.execute(select(CategoryBudget.user_id).distinct()).scalars():
+            found.setdefault(user_id, 0)
+    return found
+
+
+def move_user(user_id, source, target):
+    """Copy one user's rows and budgets to target, rebuild their rollups there, then delete them from source."""
+    table = Transaction.__table__
+    copy = sqlite.insert(table).on_conflict_do_nothing(index_elements=["id"])
+    budgets = CategoryBudget.__table__
+    copy_budgets = sqlite.insert(budgets).on_conflict_do_nothing(index_elements=["user_id", "category"])
+    with source.connect() as src, target.begin() as dst:
+        result = src.execution_options(stream_results=True, yield_per=COPY_ROWS).execute(
+            table.select().where(table.c.user_id == user_id)
+        )
+        for partition in result.partitions():
+            dst.execute(copy, [dict(row._mapping) for row in partition])
+        rows = [dict(row._mapping) for row in src.execute(budgets.select().where(budgets.c.user_id == user_id))]
+        if rows:
+            dst.execute(copy_budgets, rows)
+        rollups.rebuild(dst, user_id)
+
+    with source.begin() as conn:
+        for model in (Transaction, DailyRollup, MonthlySpend, CategoryBudget, WriteGeneration):
+            conn.execute(delete(model).where(model.user_id == user_id))
+
+
+def rebalance(dry_run=False):
+    moved_users = moved_rows = 0
+    for name, source in sources():
+        migrate(source)
+        misplaced = {user: rows for user, rows in users(source).items() if engine_for(user) is not source}
+        for user, rows in misplaced.items():
+            if not dry_run:
+                move_user(user, source, engine_for(user))
+        moved_users += len(misplaced)
+        moved_rows += sum(misplaced.values())
+        if misplaced:
+            print(f"{name}: {'would move' if dry_run else 'moved'} {len(misplaced)} users "
+                  f"({sum(misplaced.values())} transactions)")
+    print(f"{'Would move' if dry_run else 'Moved'} {moved_users} users, {moved_rows} transactions "
+          f"(DB_SHARDS={DB_SHARDS})")
+
+
+def status():
+    misplaced_total = 0
+    for name, source in sources():
+        migrate(source)
+        counts = users(source)
+        misplaced = sum(1 for user in counts if engine_for(user) is not source)
+        misplaced_total += misplaced
+        print(f"{name:>20}: {len(counts):6} users {sum(counts.values()):9} transactions, {misplaced} misplaced")
+    print(f"DB_SHARDS={DB_SHARDS}: {misplaced_total} users to move")
+    return misplaced_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users between expensess.db and the shard files.")
+    parser.add_argument("command", choices=("status", "rebalance"))
+    parser.add_argument("--dry-run", action="store_true", help="rebalance: only report what would move")
+    args = parser.parse_args()
+
+    database.create_db()  # main file and every current shard, ready to receive users
+    if args.command == "status":
+        sys.exit(1 if status() else 0)
+    rebalance(args.dry_run)
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import text
+from models import WriteGeneration
+
+
+# Cache of get_summary results, keyed by user, resolved day range and
+# filters.
+#
+# Each process has its own cache, but the validity check is in the database:
+# rollups.add_many/remove bump the user's writegeneration row in the same
+# transaction as the write, and an entry is only served while that row still
+# holds the generation read before the entry was computed. A save handled by
+# another uvicorn worker, the poller or import_csv.py is seen by the next
+# summary, for the price of one primary-key read per summary. The writer's
+# own process also drops the entries whose range contains the day at once
+# (invalidate), which only frees memory sooner.
+
+MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_SIZE", "10000"))
+TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL", "300"))
+
+GENERATION_BUMP = text(
+    "INSERT INTO writegeneration (user_id, generation) VALUES (:user_id, 1) "
+    "ON CONFLICT (user_id) DO UPDATE SET generation = writegeneration.generation + 1"
+)
+
+
+class SummaryCache:
+    def __init__(self, maxsize=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (summary, generation, expires_at)
+        self._by_user = defaultdict(set)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(user_id, start_day, end_day, unnecessary_only, tx_type):
+        return (user_id, start_day, end_day, bool(unnecessary_only), tx_type)
+
+    def get(self, key, generation):
+        """The cached summary, if it was computed at the user's current generation."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1] != generation or item[2] < time.monotonic():
+                if item is not None:
+                    self._drop(key)
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return item[0]
+
+    def put(self, key, summary, generation):
+        """Store a summary computed after reading generation (read_generation)."""
+        user_id = key[0]
+        with self._lock:
+            self._entries[key] = (summary, generation, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_user[user_id].add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, user_id, day):
+        """Drop the user's cached summaries whose [start, end) range contains day."""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                _, start_day, end_day, _, _ = key
+                if start_day <= day < end_day:
+                    self._drop(key)
+                    self._stats['invalidations'] += 1
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+
+def bump_generation(conn, user_id):
+    """Mark user_id's summaries stale everywhere. Run in the writing transaction."""
+    conn.execute(GENERATION_BUMP, {"user_id": user_id})
+
+
+def read_generation(session, user_id):
+    row = session.get(WriteGeneration, user_id)
+    return row.generation if row else 0
+
+
+cache = SummaryCache()
@@ -0,0 +1,110 @@
+import re
+from datetime import date, datetime
+
+
+# Local grammar for summary requests ("this month summary",
+# "From 2026-01-01 to 2026-01-31", "how much did I waste last week?").
+# parse() returns the same dict as llm.parse_summary_query, or None when the
+# message uses words we don't know, in which case the LLM decides.
+
+PERIOD_RE = re.compile(r'\b(this|current|last|previous|past)\s+(week|month|year)\b')
+DATE_RE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+AMOUNT_RE = re.compile(r'\d')
+WORD_RE = re.compile(r'[a-z]+(?:-[a-z]+)?')
+
+UNNECESSARY_WORDS = {'waste', 'wasted', 'wasting', 'unnecessary', 'non-essential', 'nonessential'}
+INCOME_WORDS = {'income', 'incomes', 'salary', 'earnings', 'earned', 'earn', 'received', 'credited'}
+EXPENSE_WORDS = {'expense', 'expenses', 'spending', 'spendings', 'spent', 'spend', 'paid', 'costs', 'cost'}
+SUMMARY_WORDS = {'summary', 'report', 'overview', 'breakdown', 'total', 'totals', 'stats'}
+GREETINGS = {'hello', 'hi', 'hey', 'thanks', 'thank', 'you', 'ok', 'okay'}
+
+# Words that can appear around a summary request without changing its meaning.
+FILLER_WORDS = {
+    'show', 'me', 'my', 'the', 'a', 'for', 'of', 'in', 'on', 'from', 'to', 'till', 'until',
+    'between', 'and', 'how', 'much', 'did', 'do', 'i', 'what', 'was', 'were', 'is', 'are',
+    'give', 'get', 'tell', 'please', 'all', 'so', 'far', 'have', 'this', 'current', 'last',
+    'previous', 'past', 'week', 'month', 'year', 'money', 'full', 'complete', 's',
+}
+
+KNOWN_WORDS = UNNECESSARY_WORDS | INCOME_WORDS | EXPENSE_WORDS | SUMMARY_WORDS | FILLER_WORDS
+
+NOT_SUMMARY = {"is_summary": False}
+
+
+def _summary(period, unnecessary_only, tx_type, start_date=None, end_date=None):
+    return {
+        "is_summary": True,
+        "period": period,
+        "unnecessary_only": unnecessary_only,
+        "tx_type": tx_type,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def parse(message: str, today: date = None, strict: bool = True):
+    """Parse a summary request locally. Returns None if the LLM should decide.
+
+    strict=False is for when the LLM is unavailable: unknown words are
+    ignored and a request without a period means this month.
+    """
+    today = today or datetime.utcnow().date()
+    text = message.lower().strip()
+    words = WORD_RE.findall(text)
+
+    dates = DATE_RE.findall(text)
+    periods = PERIOD_RE.findall(text)
+
+    if not dates and not periods:
+        if words and all(w in GREETINGS for w in words):
+            return NOT_SUMMARY
+        # "last 3 months", "past 2 weeks", "over 500": periods and filters
+        # the grammar can't express, so the LLM decides.
+        if strict:
+            return None
+        # Without the LLM, "5000 salary" or "spent 100 on food" is an entry.
+        if AMOUNT_RE.search(text) and not any(w in SUMMARY_WORDS for w in words):
+            return NOT_SUMMARY
+        if not any(w in KNOWN_WORDS and w not in FILLER_WORDS for w in words):
+            return NOT_SUMMARY
+        periods = [('this', 'month')]
+
+    if strict and any(w not in KNOWN_WORDS for w in words):
+        return None
+    if len(dates) > 2 or len(periods) > 1 or (dates and periods):
+        return None
+    if AMOUNT_RE.search(DATE_RE.sub(' ', text)):
+        return None
+
+    unnecessary_only = any(w in UNNECESSARY_WORDS for w in words)
+    wants_income = any(w in INCOME_WORDS for w in words)
+    wants_expense = unnecessary_only or any(w in EXPENSE_WORDS for w in words)
+    if wants_income and wants_expense:
+        if unnecessary_only:
+            return None
+        tx_type = None
+    elif wants_income:
+        tx_type = "income"
+    elif wants_expense:
+        tx_type = "expense"
+    else:
+        tx_type = None
+
+    if dates:
+        try:
+            start, end = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+        except ValueError:
+            return None
+        if start > end:
+            return None
+        return _summary("custom", unnecessary_only, tx_type, start.isoformat(), end.isoformat())
+
+    which, unit = periods[0]
+    which = 'this' if which in ('this', 'current') else 'last'
+
+    if unit == 'year':
+        year = today.year if which == 'this' else today.year - 1
+        return _summary("custom", unnecessary_only, tx_type, f"{year}-01-01", f"{year}-12-31")
+
+    return _summary(f"{which}_{unit}", unnecessary_only, tx_type)
+
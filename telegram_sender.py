@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import time
+import httpx
+import config
+import metrics
+
+
+# Outbound Telegram calls go through one TelegramSender: a keep-alive
+# connection pool, token buckets for Telegram's global (~30 msg/s) and
+# per-chat (~1 msg/s) limits, and retries that honour 429 retry_after.
+
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+# rate + burst must stay within Telegram's ~30 messages in any one second.
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+GLOBAL_BURST = int(os.getenv("TELEGRAM_GLOBAL_BURST", "5"))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "5"))
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Reservation-style token bucket: callers take a token and sleep off any debt."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take one token and return how many seconds to wait before using it."""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class TelegramSender:
+    def __init__(self, token, base_url=TELEGRAM_API_BASE, transport=None,
+                 global_rate=GLOBAL_RATE, global_burst=GLOBAL_BURST,
+                 chat_rate=CHAT_RATE, chat_burst=CHAT_BURST, max_attempts=MAX_ATTEMPTS):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self._client = None
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats = {}
+        self._stats = {
+            'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0,
+            'throttle_seconds': 0.0, 'request_seconds': 0.0,
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self.transport,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def url(self, method):
+        return f"{self.base_url}/bot{self.token}/{method}"
+
+    async def _throttle(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._chats = {k: b for k, b in self._chats.items() if not b.is_full()}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+
+        # Wait for the chat's own slot first so a busy chat doesn't hold
+        # global capacity it can't use yet.
+        wait = bucket.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        global_wait = self._global.reserve()
+        if global_wait:
+            await asyncio.sleep(global_wait)
+        self._stats['throttle_seconds'] += wait + global_wait
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def call(self, method, chat_id, **request_kwargs):
+        """POST a Bot API method for chat_id, retrying transient failures.
+
+        Returns the decoded Telegram response, or None if delivery failed.
+        """
+        for attempt in range(self.max_attempts):
+            await self._throttle(chat_id)
+            # Uploads are re-read from the start on every attempt.
+            for upload in request_kwargs.get("files", {}).values():
+                upload[1].seek(0)
+            started = time.perf_counter()
+            try:
+                response = await self.client.post(self.url(method), **request_kwargs)
+            except httpx.HTTPError as e:
+                print(f"Telegram {method} error: {e}")
+                metrics.TELEGRAM_RESULTS.inc(method=method, outcome="network_error")
+                delay = self._backoff(attempt)
+            else:
+                elapsed = time.perf_counter() - started
+                self._stats['request_seconds'] += elapsed
+                metrics.TELEGRAM_SECONDS.observe(elapsed, method=method)
+                metrics.TELEGRAM_RESULTS.inc(method=method, outcome=str(response.status_code))
+                if response.status_code == 429:
+                    self._stats['rate_limited'] += 1
+                    try:
+                        delay = float(response.json().get("parameters", {}).get("retry_after", 1))
+                    except ValueError:
+                        delay = self._backoff(attempt)
+                elif response.status_code >= 500:
+                    delay = self._backoff(attempt)
+                elif response.is_success:
+                    self._stats['sent'] += 1
+                    return response.json()
+                else:
+                    # 400/403 etc. won't get better by retrying (blocked bot, bad chat id).
+                    print(f"Telegram {method} failed: {response.status_code} {response.text}")
+                    break
+
+            if attempt + 1 < self.max_attempts:
+                self._stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+        self._stats['failed'] += 1
+        return None
+
+    async def send_message(self, chat_id, text):
+        return await self.call("sendMessage", chat_id, json={"chat_id": chat_id, "text": text})
+
+    async def send_document(self, chat_id, path, filename, caption=None):
+        """Upload a file from disk; httpx streams it rather than loading it whole."""
+        data = {"chat_id": str(chat_id)}
+        if caption:
+            data["caption"] = caption
+        with open(path, "rb") as f:
+            return await self.call("sendDocument", chat_id, data=data, files={"document": (filename, f)})
+
+    def stats(self):
+        return {**self._stats, 'chat_buckets': len(self._chats)}
+
+
+sender = TelegramSender(os.getenv("TELEGRAM_TOKEN"))
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TELEGRAM_TOKEN", "test")
+os.environ.setdefault("GROQ_KEY", "test")
+# database.py opens expensess.db relative to the working directory.
+os.chdir(tempfile.mkdtemp(prefix="expensebot_tests_"))
@@ -0,0 +1,107 @@
+import multiprocessing
+import threading
+from datetime import date
+
+import pytest
+
+import budgets
+
+USER = "racer"
+AMOUNT = 10
+
+
+def _app(workdir):
+    import os
+    os.chdir(workdir)
+    import main
+    main.init()
+    return main
+
+
+def _entry():
+    return {"amount": AMOUNT, "category": "Food", "description": "test", "is_unnecessary": False,
+            "tx_type": "expense"}
+
+
+def _set_budget(workdir, limit):
+    _app(workdir).budgets.set_budget(USER, "Food", limit)
+
+
+def _racer(workdir, threads, entries, barrier, results):
+    main = _app(workdir)
+    alerts = []
+
+    def save():
+        for _ in range(entries):
+            alerts.extend(main.save_transactions(USER, [_entry()])[1])
+
+    workers = [threading.Thread(target=save) for _ in range(threads)]
+    barrier.wait()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    results.put(alerts)
+
+
+def _totals(workdir, results):
+    main = _app(workdir)
+    import database
+    import rollups
+    (_, _, spent), = main.budgets.budget_report(USER)
+    results.put((spent, rollups.verify(database.engine_for(USER), USER)))
+
+
+def _run(ctx, target, *args):
+    process = ctx.Process(target=target, args=args)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+
+def test_concurrent_entries_alert_once_per_threshold(tmp_path):
+    """Entries racing past 80% and 100% from several processes and threads."""
+    processes, threads, entries = 4, 2, 10
+    total = processes * threads * entries * AMOUNT
+    ctx = multiprocessing.get_context("spawn")
+    workdir = str(tmp_path)
+    _run(ctx, _set_budget, workdir, total // 2)
+
+    barrier, results = ctx.Barrier(processes), ctx.Queue()
+    procs = [ctx.Process(target=_racer, args=(workdir, threads, entries, barrier, results)) for _ in range(processes)]
+    for p in procs:
+        p.start()
+    alerts = [alert for _ in procs for alert in results.get(timeout=120)]
+    for p in procs:
+        p.join()
+
+    assert sorted(percent for _, percent, _, _ in alerts) == [80, 100]
+    _run(ctx, _totals, workdir, results)
+    spent, drift = results.get(timeout=60)
+    assert spent == total * 100
+    assert drift == []
+
+
+@pytest.mark.parametrize("argument, expected", [
+    ("", ("", None)),
+    ("food 5000", ("Food", 5000.0)),
+    ("eating out ₹2,500", ("Eating Out", 2500.0)),
+    ("food off", ("Food", 0)),
+    ("5000", None),
+])
+def test_parse_argument(argument, expected):
+    assert budgets.parse_argument(argument) == expected
+
+
+def test_check_reports_highest_threshold_crossed():
+    import database
+    from sqlmodel import Session
+
+    database.create_db()
+    budgets.set_budget("checker", "Food", 100)
+    month = date(2026, 3, 1)
+    with Session(database.engine_for("checker")) as session:
+        assert budgets.check(session, "checker", {(month, "Food"): (70_00, 79_99)}) == []
+        assert budgets.check(session, "checker", {(month, "Food"): (70_00, 85_00)}) == [("Food", 80, 85_00, 100_00)]
+        assert budgets.check(session, "checker", {(month, "Food"): (70_00, 120_00)}) == [("Food", 100, 120_00, 100_00)]
+        assert budgets.check(session, "checker", {(month, "Travel"): (0, 500_00)}) == []
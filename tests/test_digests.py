@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import digests
+import main
+
+USERS = [f"digest-{n}" for n in range(6)]
+
+
+class StallingSender:
+    """Delivers the first `delivered` messages, then hangs until cancelled."""
+
+    def __init__(self, delivered):
+        self.delivered = delivered
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if len(self.sent) >= self.delivered:
+            await asyncio.Event().wait()
+        self.sent.append(chat_id)
+        return {"message_id": len(self.sent)}
+
+
+def test_interrupted_run_leaves_one_round_unconfirmed():
+    main.init()
+    for n, user_id in enumerate(USERS):
+        digests.set_subscription(user_id, 1000 + n, "weekly")
+        main.save_transactions(user_id, [{"amount": 100, "category": "Food", "description": "lunch",
+                                          "is_unnecessary": False, "tx_type": "expense"}])
+    # Next week, so the weekly digest covers today's entries.
+    today = datetime.utcnow().date() + timedelta(days=7)
+    period_start = digests.period("weekly", today)[0].date()
+
+    def ledger():
+        return {user_id: sent_at for user_id, sent_at in digests.deliveries("weekly", period_start).items()
+                if user_id in USERS}
+
+    def reached(sender):
+        return sorted(USERS[int(chat_id) - 1000] for chat_id in sender.sent)
+
+    async def interrupted(sender):
+        task = asyncio.create_task(digests.run("weekly", today, sender, concurrency=2))
+        while len(sender.sent) < sender.delivered:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    # Rounds of 2: the second round stalls after one send and is cancelled.
+    first = StallingSender(delivered=3)
+    asyncio.run(interrupted(first))
+    claims = ledger()
+    assert sorted(user_id for user_id, sent_at in claims.items() if sent_at) == reached(first)
+    assert len([sent_at for sent_at in claims.values() if sent_at is None]) == 1
+    assert len(claims) == 4  # the last round was never claimed
+
+    # A plain rerun reaches the unclaimed users; --resend-unconfirmed the one left over.
+    rerun = StallingSender(delivered=len(USERS))
+    stats = asyncio.run(digests.run("weekly", today, rerun, concurrency=2))
+    assert (stats['sent'], stats['unconfirmed']) == (2, 1)
+    resend = StallingSender(delivered=len(USERS))
+    stats = asyncio.run(digests.run("weekly", today, resend, resend_unconfirmed=True, concurrency=2))
+    assert stats['sent'] == 1
+    assert sorted(reached(first) + reached(rerun) + reached(resend)) == sorted(USERS)
+    assert all(ledger().values())
@@ -0,0 +1,36 @@
+import pytest
+
+import fast_parser
+
+
+def amounts(entries):
+    return [(entry["amount"], entry["category"], entry["tx_type"]) for entry in entries]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,50,000 salary", [(150000.0, "Salary", "income")]),
+    ("paid 1,20,000 for bike emi", [(120000.0, "Bills", "expense")]),
+    ("12,50,000 salary, 200 lunch", [(1250000.0, "Salary", "income"), (200.0, "Food", "expense")]),
+    ("₹2,000 rent", [(2000.0, "Bills", "expense")]),
+    ("1,000,000 salary", [(1000000.0, "Salary", "income")]),
+    ("rs 1,00,000.50 freelance", [(100000.5, "Freelance", "income")]),
+    ("100 food, 50 coffee", [(100.0, "Food", "expense"), (50.0, "Food", "expense")]),
+    ("100 food,500 coffee", [(100.0, "Food", "expense"), (500.0, "Food", "expense")]),
+    ("2,500 uber and 1,20,000 rent", [(2500.0, "Transport", "expense"), (120000.0, "Bills", "expense")]),
+])
+def test_fallback_keeps_digit_groups_together(text, expected):
+    assert amounts(fast_parser.fallback_entries(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,50,000 salary", [(150000.0, "Salary", "income")]),
+    ("2,000 rent; 300 petrol", [(2000.0, "Bills", "expense"), (300.0, "Transport", "expense")]),
+])
+def test_parse_entries_grouping(text, expected):
+    assert amounts(fast_parser.parse_entries(text)) == expected
+
+
+@pytest.mark.parametrize("text", ["refund 500 amazon", "cashback 50 swiggy", "salary deducted 500"])
+def test_reversals_go_to_the_llm(text):
+    assert fast_parser.parse_entries(text) is None
+    assert fast_parser.fallback_entries(text) is None
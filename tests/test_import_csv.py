@@ -0,0 +1,28 @@
+import asyncio
+from datetime import datetime
+
+import import_csv
+import llm
+
+
+def test_low_confidence_rows_go_to_the_llm(monkeypatch):
+    asked = []
+
+    async def categorize_descriptions(items):
+        asked.extend(items)
+        return [{"category": "Shopping", "is_unnecessary": False} for _ in items]
+
+    monkeypatch.setattr(llm, "categorize_descriptions", categorize_descriptions)
+    day = datetime(2026, 1, 5)
+    rows = [
+        (day, "uber trip", 250.0, "expense"),
+        # Lexicon hit, but four unknown words put it under the threshold.
+        (day, "uber ref abcd qwe zz", 300.0, "expense"),
+        (day, "random thing xyz", 100.0, "expense"),
+    ]
+    memo = {}
+    asyncio.run(import_csv.categorize(rows, memo, batch_size=40))
+
+    assert asked == [("uber ref abcd qwe zz", "expense"), ("random thing xyz", "expense")]
+    assert memo[("uber trip", "expense")]["category"] == "Transport"
+    assert memo[("uber ref abcd qwe zz", "expense")]["category"] == "Shopping"
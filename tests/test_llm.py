@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import llm
+import llm_cache
+import metrics
+
+
+class StubClient:
+    """Stands in for AsyncGroq: answers every completion with a fixed reply."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **_):
+        self.calls += 1
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    database.create_db()
+
+    def use(reply):
+        stub = StubClient(json.dumps(reply))
+        monkeypatch.setattr(llm, "client", stub)
+        return stub
+    return use
+
+
+@pytest.mark.parametrize("entry", [
+    {"category": "Food", "description": "lunch"},
+    {"amount": 120, "description": "lunch"},
+    {"amount": 120, "category": "Food", "description": ""},
+    {"amount": -120, "category": "Food", "description": "lunch"},
+    {"amount": 0, "category": "Food", "description": "lunch"},
+    {"amount": "a lot", "category": "Food", "description": "lunch"},
+    {"amount": True, "category": "Food", "description": "lunch"},
+    {"amount": 120, "category": "Food", "description": "lunch", "tx_type": "transfer"},
+])
+def test_invalid_entries_are_not_cached(client, entry):
+    text = f"invalid entry {entry!r}"
+    stub = client([entry])
+    failures = metrics.LLM_PARSE_FAILURES.value(prompt="categorize")
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            asyncio.run(llm.categorize_expense(text))
+    assert stub.calls == 2
+    assert metrics.LLM_PARSE_FAILURES.value(prompt="categorize") == failures + 2
+    key = llm_cache.make_key("categorize", text, llm.MODEL, llm.CATEGORIZE_VERSION)
+    assert asyncio.run(llm_cache.get(key)) is None
+
+
+def test_valid_entries_are_normalized_and_cached(client):
+    stub = client([
+        {"amount": "1,200", "category": "Salary", "description": "Salary", "is_unnecessary": True, "tx_type": "Income"},
+        {"amount": 45.5, "category": "Food", "description": "Coffee", "is_unnecessary": True},
+    ])
+    expected = [
+        {"amount": 1200.0, "category": "Salary", "description": "Salary", "is_unnecessary": False, "tx_type": "income"},
+        {"amount": 45.5, "category": "Food", "description": "Coffee", "is_unnecessary": True, "tx_type": "expense"},
+    ]
+    assert asyncio.run(llm.categorize_expense("1200 salary, 45.5 coffee")) == expected
+    assert asyncio.run(llm.categorize_expense("1200 salary, 45.5 coffee")) == expected
+    assert stub.calls == 1
+
+
+@pytest.mark.parametrize("reply", [
+    ["Food", "Transport"],
+    [{"category": "Food", "is_unnecessary": False}, "Transport"],
+    [{"category": "Food", "is_unnecessary": False}],
+])
+def test_malformed_description_categories_are_parse_failures(client, reply):
+    client(reply)
+    items = [(f"swiggy order {reply!r}", "expense"), (f"uber ride {reply!r}", "expense")]
+    failures = metrics.LLM_PARSE_FAILURES.value(prompt="descriptions")
+    with pytest.raises(ValueError):
+        asyncio.run(llm.categorize_descriptions(items))
+    assert metrics.LLM_PARSE_FAILURES.value(prompt="descriptions") == failures + 1
+
+
+def test_description_categories(client):
+    client([{"category": "Food", "is_unnecessary": True}, {"category": "Salary", "is_unnecessary": True}])
+    items = [("zomato dinner", "expense"), ("acme payroll", "income")]
+    assert asyncio.run(llm.categorize_descriptions(items)) == [
+        {"category": "Food", "is_unnecessary": True}, {"category": "Salary", "is_unnecessary": False},
+    ]
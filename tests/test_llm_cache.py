@@ -0,0 +1,41 @@
+import asyncio
+
+import database
+import llm_cache
+
+
+def test_db_hit_fills_memory_on_the_event_loop(monkeypatch):
+    database.create_db()
+    key = llm_cache.make_key("test", "db hit", "model", "v1")
+    asyncio.run(llm_cache.put(key, "test", "v1", {"answer": 1}))
+    llm_cache._memory.clear()
+
+    # The lookup thread only reads the table; a write to the LRU from it
+    # would race the event loop's own gets and puts.
+    def put_from_thread(*_):
+        raise AssertionError("_memory.put called off the event loop")
+    monkeypatch.setattr(llm_cache._memory, "put", put_from_thread)
+    assert llm_cache._get_from_db(key) == {"answer": 1}
+    monkeypatch.undo()
+
+    before = llm_cache.stats()
+    assert asyncio.run(llm_cache.get(key)) == {"answer": 1}
+    assert asyncio.run(llm_cache.get(key)) == {"answer": 1}
+    after = llm_cache.stats()
+    assert (after['db_hits'] - before['db_hits'], after['memory_hits'] - before['memory_hits']) == (1, 1)
+
+
+def test_miss_is_counted():
+    database.create_db()
+    before = llm_cache.stats()['misses']
+    assert asyncio.run(llm_cache.get(llm_cache.make_key("test", "never stored", "model", "v1"))) is None
+    assert llm_cache.stats()['misses'] == before + 1
+
+
+def test_lru_evicts_oldest():
+    cache = llm_cache.LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c"), cache.evictions) == (1, None, 3, 1)
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import llm
+import llm_governor
+from llm_governor import CircuitBreaker, LLMGovernor, LLMUnavailable
+
+
+class RateLimited(Exception):
+    """Shaped like groq.RateLimitError: status_code 429 and the HTTP response."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+async def failing():
+    raise RuntimeError("upstream 500")
+
+
+async def answer():
+    return "ok"
+
+
+def test_breaker_opens_half_opens_and_closes():
+    async def run():
+        breaker = CircuitBreaker(failures=2, cooldown=0.1)
+        governor = LLMGovernor(breaker=breaker, max_retries=0)
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable):
+                await governor.call("p", failing)
+        assert breaker.state == "open"
+        with pytest.raises(LLMUnavailable, match="circuit open"):
+            await governor.call("p", answer)
+        assert governor.stats()['rejected'] == 1
+
+        await asyncio.sleep(0.15)
+        assert breaker.state == "half_open"
+        # One probe at a time: a second call while it is out is refused.
+        probe = asyncio.ensure_future(governor.call("probe", lambda: asyncio.sleep(0.05, "ok")))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMUnavailable, match="circuit open"):
+            await governor.call("other", answer)
+        assert await probe == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_failed_probe_reopens():
+    async def run():
+        breaker = CircuitBreaker(failures=1, cooldown=0.05)
+        governor = LLMGovernor(breaker=breaker, max_retries=0)
+        with pytest.raises(LLMUnavailable):
+            await governor.call("p", failing)
+        await asyncio.sleep(0.07)
+        assert breaker.state == "half_open"
+        with pytest.raises(LLMUnavailable):
+            await governor.call("p", failing)
+        assert breaker.state == "open"
+
+    asyncio.run(run())
+
+
+def test_identical_prompts_share_one_request():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        governor = LLMGovernor()
+        results = await asyncio.gather(*(governor.call("same prompt", request) for _ in range(5)),
+                                       governor.call("other prompt", request))
+        return governor, results
+
+    governor, results = asyncio.run(run())
+    assert results == ["shared"] * 6
+    assert len(calls) == 2
+    assert governor.stats()['coalesced'] == 4
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_429_waits_for_retry_after():
+    attempts = []
+
+    async def request():
+        attempts.append(time.perf_counter())
+        if len(attempts) == 1:
+            raise RateLimited(retry_after=0.2)
+        return "ok"
+
+    async def run():
+        governor = LLMGovernor(retry_base=0.001)
+        return governor, await governor.call("p", request)
+
+    governor, result = asyncio.run(run())
+    assert result == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert governor.stats()['retries'] == 1
+    assert governor.breaker.state == "closed"
+
+
+def test_429_retries_run_out():
+    async def rate_limited():
+        raise RateLimited(retry_after=0)
+
+    async def run():
+        governor = LLMGovernor(max_retries=2, retry_base=0.001)
+        with pytest.raises(LLMUnavailable):
+            await governor.call("p", rate_limited)
+        return governor
+
+    governor = asyncio.run(run())
+    assert (governor.stats()['retries'], governor.stats()['failures']) == (2, 1)
+
+
+def test_queue_timeout_is_unavailable_but_not_a_breaker_failure():
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, queue_timeout=0.05, timeout=5,
+                               breaker=CircuitBreaker(failures=1, cooldown=60))
+        slow = asyncio.ensure_future(governor.call("slow", lambda: asyncio.sleep(0.2, "slow")))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMUnavailable, match="no free LLM slot"):
+            await governor.call("queued", answer)
+        assert await slow == "slow"
+        return governor
+
+    governor = asyncio.run(run())
+    assert governor.stats()['queue_timeouts'] == 1
+    assert governor.stats()['failures'] == 0
+    assert governor.breaker.state == "closed"
+
+
+def test_upstream_timeout_is_a_breaker_failure():
+    async def run():
+        governor = LLMGovernor(timeout=0.05, breaker=CircuitBreaker(failures=1, cooldown=60))
+        with pytest.raises(LLMUnavailable, match="no answer within"):
+            await governor.call("p", lambda: asyncio.sleep(1))
+        return governor
+
+    governor = asyncio.run(run())
+    assert governor.stats()['timeouts'] == 1
+    assert governor.breaker.state == "open"
+
+
+class UnusedClient:
+    @property
+    def chat(self):
+        raise AssertionError("Groq was called with the circuit open")
+
+
+def test_categorize_falls_back_to_the_local_parser(monkeypatch):
+    database.create_db()
+    breaker = CircuitBreaker(failures=1, cooldown=60)
+    breaker.failure()
+    monkeypatch.setattr(llm_governor, "governor", LLMGovernor(breaker=breaker))
+    monkeypatch.setattr(llm, "client", UnusedClient())
+
+    entries = asyncio.run(llm.categorize_expense("1,50,000 salary and 300 something odd"))
+    assert [(e["amount"], e["category"], e["tx_type"]) for e in entries] == [
+        (150000.0, "Salary", "income"), (300.0, "Other", "expense"),
+    ]
+    # Nothing the local parser can't read safely is guessed at.
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(llm.categorize_expense("refund 500 amazon"))
@@ -0,0 +1,41 @@
+import multiprocessing
+
+
+def _start_worker(workdir, barrier, results):
+    import os
+    os.chdir(workdir)
+    import database
+    barrier.wait()
+    try:
+        database.create_db()
+        results.put(None)
+    except Exception as e:
+        results.put(repr(e))
+
+
+def test_hot_queries_use_indexes():
+    import database
+    import migrations
+
+    database.create_db()
+    assert migrations.current_version(database.engine) == migrations.LATEST_VERSION
+    assert migrations.check_query_plans(database.engine)
+
+
+def test_workers_migrate_a_fresh_database_at_once(tmp_path):
+    workers = 4
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_start_worker, args=(str(tmp_path), barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    errors = [results.get(timeout=120) for _ in procs]
+    for p in procs:
+        p.join()
+    assert errors == [None] * workers
+
+    import sqlite3
+    import migrations
+    with sqlite3.connect(tmp_path / "expensess.db") as conn:
+        versions = [v for v, in conn.execute("SELECT version FROM schemaversion ORDER BY version")]
+    assert versions == [version for version, _, _ in migrations.MIGRATIONS]
@@ -0,0 +1,34 @@
+import asyncio
+
+import main
+import poller
+
+
+class NoJobs:
+    async def join(self):
+        pass
+
+
+def test_failed_accept_keeps_the_offset(monkeypatch):
+    accepted, failing = [], {2}
+
+    async def accept_update(update):
+        if update["update_id"] in failing:
+            failing.clear()
+            raise RuntimeError("database is locked")
+        accepted.append(update["update_id"])
+        return "queued"
+
+    monkeypatch.setattr(main, "accept_update", accept_update)
+    monkeypatch.setattr(main, "job_queue", NoJobs())
+    batch = [{"update_id": n} for n in (1, 2, 3)]
+
+    async def run():
+        p = poller.Poller()
+        p.stop()  # so the back-off after the error returns at once
+        await p.process(batch)
+        assert (p.offset, p.stats()['errors'], accepted) == (None, 1, [1])
+        await p.process(batch)
+        assert (p.offset, p.stats()['errors'], accepted) == (4, 1, [1, 1, 2, 3])
+
+    asyncio.run(run())
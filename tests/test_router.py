@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.bench_router import load_corpus
+from router import route
+
+
+@pytest.mark.parametrize("label, message", load_corpus())
+def test_corpus(label, message):
+    assert route(message)["kind"] == label
+
+
+@pytest.mark.parametrize("text, command, argument", [
+    ("/undo", "undo", ""),
+    ("/help@MyExpenseBot", "help", ""),
+    ("/export jsonl", "export", "jsonl"),
+    ("/budget Food 5000", "budget", "food 5000"),
+])
+def test_commands(text, command, argument):
+    routed = route(text)
+    assert (routed["kind"], routed["command"], routed["argument"]) == ("command", command, argument)
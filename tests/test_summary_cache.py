@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+from datetime import date
+
+from summary_cache import SummaryCache
+
+DAY = date(2026, 3, 10)
+
+
+def key(user_id):
+    return SummaryCache.key(user_id, date(2026, 3, 1), date(2026, 4, 1), False, None)
+
+
+def test_entries_are_served_only_at_their_generation():
+    cache = SummaryCache()
+    cache.put(key("a"), "summary", 3)
+    assert cache.get(key("a"), 3) == "summary"
+    assert cache.get(key("a"), 4) is None
+    # A stale entry is dropped, not kept around for a later generation match.
+    assert cache.get(key("a"), 3) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_invalidate_drops_only_ranges_containing_the_day():
+    cache = SummaryCache()
+    march, april = key("a"), SummaryCache.key("a", date(2026, 4, 1), date(2026, 5, 1), False, None)
+    cache.put(march, "march", 1)
+    cache.put(april, "april", 1)
+    cache.invalidate("a", DAY)
+    assert (cache.get(march, 1), cache.get(april, 1)) == (None, "april")
+
+
+def _save_in_another_process(workdir, user_id):
+    os.chdir(workdir)
+    import main
+    main.save_transactions(user_id, [{"amount": 250, "category": "Food", "description": "dinner",
+                                      "is_unnecessary": False, "tx_type": "expense"}])
+
+
+def test_save_in_another_worker_is_seen_at_once():
+    import main
+    import utils
+
+    main.init()
+    user_id = "summary-cache-workers"
+    main.save_transactions(user_id, [{"amount": 100, "category": "Food", "description": "lunch",
+                                      "is_unnecessary": False, "tx_type": "expense"}])
+    assert utils.get_summary(user_id, period="this_month")['expenses'] == 100
+    hits = main.summary_cache.cache.stats()['hits']
+    assert utils.get_summary(user_id, period="this_month")['expenses'] == 100
+    assert main.summary_cache.cache.stats()['hits'] == hits + 1
+
+    # Like a second uvicorn worker: its save can't touch this process's cache.
+    worker = multiprocessing.get_context("spawn").Process(target=_save_in_another_process,
+                                                          args=(os.getcwd(), user_id))
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
+    assert utils.get_summary(user_id, period="this_month")['expenses'] == 350
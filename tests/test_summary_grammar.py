@@ -0,0 +1,63 @@
+import json
+import re
+from datetime import date
+
+import pytest
+
+import summary_grammar
+from llm import SUMMARY_PROMPT
+from summary_grammar import NOT_SUMMARY, _summary
+
+TODAY = date(2026, 3, 15)
+EXAMPLE_RE = re.compile(r'- "(?P<message>[^"]+)"\s+→\s+(?P<expected>\{.*\})')
+
+
+def prompt_examples(prompt):
+    """(message, expected) pairs from the examples in llm.SUMMARY_PROMPT."""
+    for match in EXAMPLE_RE.finditer(prompt):
+        expected = match.group('expected').replace('{{', '{').replace('}}', '}')
+        yield match.group('message'), json.loads(expected)
+
+
+# Phrases from the /help and fallback replies, and ones that were
+# mis-parsed. None means the grammar must leave the message to the LLM.
+HELP_EXAMPLES = [
+    ("Last week expenses", _summary("last_week", False, "expense")),
+    ("This month summary", _summary("this_month", False, None)),
+    ("This year income", _summary("custom", False, "income", "2026-01-01", "2026-12-31")),
+    ("Last year expenses", _summary("custom", False, "expense", "2025-01-01", "2025-12-31")),
+    ("From 2026-01-01 to 2026-01-31", _summary("custom", False, None, "2026-01-01", "2026-01-31")),
+    ("How much did I waste this month?", _summary("this_month", True, "expense")),
+    ("Unnecessary expenses last year", _summary("custom", True, "expense", "2025-01-01", "2025-12-31")),
+    ("Hello", NOT_SUMMARY),
+    ("Received 2000", None),
+    ("show expenses for last 3 months", None),
+    ("how much did I spend in the past 2 weeks", None),
+]
+
+# Without the LLM (strict=False) the grammar has to answer everything.
+FALLBACK_EXAMPLES = [
+    ("Received 2000", NOT_SUMMARY),
+    ("show me my expenses", _summary("this_month", False, "expense")),
+    ("hmm", NOT_SUMMARY),
+]
+
+
+@pytest.mark.parametrize("message, expected", list(prompt_examples(SUMMARY_PROMPT)))
+def test_prompt_examples(message, expected):
+    # The grammar may defer to the LLM, but never answer differently.
+    assert summary_grammar.parse(message, TODAY) in (expected, None)
+
+
+def test_prompt_examples_found():
+    assert len(list(prompt_examples(SUMMARY_PROMPT))) >= 10
+
+
+@pytest.mark.parametrize("message, expected", HELP_EXAMPLES)
+def test_help_examples(message, expected):
+    assert summary_grammar.parse(message, TODAY) == expected
+
+
+@pytest.mark.parametrize("message, expected", FALLBACK_EXAMPLES)
+def test_fallback_examples(message, expected):
+    assert summary_grammar.parse(message, TODAY, strict=False) == expected
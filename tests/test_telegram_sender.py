@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from telegram_sender import TelegramSender
+
+FAST = 10 ** 6  # a rate high enough that its bucket never throttles
+
+
+class FakeTelegram:
+    """httpx.MockTransport handler recording when each sendMessage arrived."""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)  # (status, body) to give before the plain successes
+        self.requests = []  # (seconds since start, chat_id)
+        self.started = time.perf_counter()
+
+    def __call__(self, request):
+        chat_id = json.loads(request.content)["chat_id"]
+        self.requests.append((time.perf_counter() - self.started, chat_id))
+        if self.responses:
+            status, body = self.responses.pop(0)
+            return httpx.Response(status, json=body)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.requests)}})
+
+
+def send_all(fake, messages, **limits):
+    async def run():
+        sender = TelegramSender("test", base_url="http://telegram", transport=httpx.MockTransport(fake), **limits)
+        fake.started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(sender.send_message(chat_id, "hi") for chat_id in messages))
+        finally:
+            await sender.close()
+        return sender, results
+    return asyncio.run(run())
+
+
+def arrivals(fake):
+    return sorted(at for at, _ in fake.requests)
+
+
+def test_per_chat_bucket():
+    fake = FakeTelegram()
+    # Burst of 2, then one message per 0.1s for the busy chat; the other chat isn't held up.
+    sender, results = send_all(fake, [1] * 6 + [2], chat_rate=10, chat_burst=2,
+                               global_rate=FAST, global_burst=FAST)
+    assert all(results)
+    chat_1 = sorted(at for at, chat_id in fake.requests if chat_id == 1)
+    chat_2 = [at for at, chat_id in fake.requests if chat_id == 2]
+    assert chat_1[1] < 0.05
+    for n, at in enumerate(chat_1[2:], start=1):
+        assert at >= n * 0.1 - 0.01
+    assert chat_2[0] < 0.05
+    assert sender.stats()['throttle_seconds'] > 0
+
+
+def test_global_bucket():
+    fake = FakeTelegram()
+    # Burst of 3, then 20 messages/s across all chats.
+    sender, results = send_all(fake, range(8), global_rate=20, global_burst=3, chat_rate=FAST, chat_burst=FAST)
+    assert all(results)
+    times = arrivals(fake)
+    assert times[2] < 0.05
+    assert times[-1] >= (8 - 3) / 20 - 0.01
+
+
+def test_429_retry_after_is_honoured():
+    fake = FakeTelegram([(429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.3}})])
+    sender, (result,) = send_all(fake, [1], chat_rate=FAST, chat_burst=FAST, global_rate=FAST, global_burst=FAST)
+    assert result["ok"]
+    (first, _), (second, _) = fake.requests
+    assert second - first >= 0.3
+    stats = sender.stats()
+    assert (stats['rate_limited'], stats['retries'], stats['sent'], stats['failed']) == (1, 1, 1, 0)
+
+
+def test_client_errors_are_not_retried():
+    fake = FakeTelegram([(403, {"ok": False, "description": "Forbidden: bot was blocked by the user"})])
+    sender, (result,) = send_all(fake, [1])
+    assert result is None
+    assert len(fake.requests) == 1
+    assert (sender.stats()['retries'], sender.stats()['failed']) == (0, 1)
@@ -1,28 +1,45 @@
-import os
-from fastapi import FastAPI, Request
-from sqlmodel import Session, select
-from datetime import datetime, timedelta
-import requests
-from models import Transaction
-from database import engine, create_db
-from llm import categorize_expense, parse_summary_query
-from dotenv import load_dotenv
+from sqlmodel import Session
+import telegram_sender
+import metrics
+import rollups
+import summary_cache
+from money import from_minor
+from database import engine_for
 from dateutil.relativedelta import relativedelta
 from datetime import datetime, timedelta
 import calendar
 
 
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-if not TELEGRAM_TOKEN:
-    raise ValueError("TELEGRAM_TOKEN not set in .env")
+async def send_message(chat_id, text):
+    with metrics.stage("send"):
+        await telegram_sender.sender.send_message(chat_id, text)
+
+def build_entries_reply(txs):
+    if len(txs) == 1:
+        tx = txs[0]
+        if tx.tx_type == "income":
+            return (
+                f"💰 ₹{tx.amount} income recorded under {tx.category}\n"
+                f"📝 {tx.description}"
+            )
+        return (
+            f"✅ ₹{tx.amount} added under {tx.category}\n"
+            f"Marked as {'Unnecessary' if tx.is_unnecessary else 'Essential'}"
+        )
 
+    lines = [f"✅ Recorded {len(txs)} entries:"]
+    for tx in txs:
+        if tx.tx_type == "income":
+            lines.append(f"  • 💰 ₹{tx.amount:.0f} income · {tx.category}")
+        else:
+            lines.append(f"  • ₹{tx.amount:.0f} · {tx.category}{' (Unnecessary)' if tx.is_unnecessary else ''}")
+
+    spent = sum(tx.amount for tx in txs if tx.tx_type == "expense")
+    earned = sum(tx.amount for tx in txs if tx.tx_type == "income")
+    lines.append("")
+    lines.append(f"💸 Spent: ₹{spent:.0f}   💰 Income: ₹{earned:.0f}")
+    return "\n".join(lines)
 
-def send_message(chat_id, text):
-    requests.post(TELEGRAM_API, json={
-        "chat_id": chat_id,
-        "text": text
-    })
 
 def build_summary_reply(summary, title, unnecessary_only=False):
     lines = [f"📊 *{title} Summary*", f"🗓 {summary['start_date']} → {summary['end_date']}", ""]
@@ -46,15 +63,15 @@ def build_summary_reply(summary, title, unnecessary_only=False):
 
     return "\n".join(lines)
 
-def get_summary(user_id, period='month', unnecessary_only=False, start_date=None, end_date=None):
-    """Fetch expense summary for a period."""
-    now = datetime.utcnow()
-    
+def resolve_period(period, start_date=None, end_date=None, now=None):
+    """Turn a period name (or custom dates) into a [start, end) datetime range."""
+    now = now or datetime.utcnow()
+
     if start_date and end_date:
         # Custom range
         date_filter_start = datetime.fromisoformat(start_date)
         date_filter_end = datetime.fromisoformat(end_date) + timedelta(days=1)  # Include end day
-    
+
     elif period == 'last_week':
         # Last full week: Monday to Sunday
         last_monday = now - timedelta(days=now.weekday())
@@ -78,29 +95,53 @@ def get_summary(user_id, period='month', unnecessary_only=False, start_date=None
     else:
         raise ValueError("Invalid period")
 
-    with Session(engine) as session:
-        statement = select(Transaction).where(Transaction.user_id == user_id)
-        statement = statement.where(Transaction.date >= date_filter_start)
-        statement = statement.where(Transaction.date < date_filter_end)
-        if unnecessary_only:
-            statement = statement.where(Transaction.is_unnecessary == True)
-        
-        results = session.exec(statement).all()
-        total = sum(tx.amount for tx in results)
-        category_breakdown = {}
-        for tx in results:
-            category_breakdown[tx.category] = category_breakdown.get(tx.category, 0) + tx.amount
-        
-        # Add insights: average daily spend, top category
-        days_in_period = (date_filter_end - date_filter_start).days
-        avg_daily = total / days_in_period if days_in_period > 0 else 0
-        top_category = max(category_breakdown, key=category_breakdown.get) if category_breakdown else None
-        
-        return {
-            'total': total,
-            'breakdown': category_breakdown,
-            'avg_daily': avg_daily,
-            'top_category': top_category,
-            'start_date': date_filter_start.date(),
-            'end_date': (date_filter_end - timedelta(days=1)).date()
-        }
+    return date_filter_start, date_filter_end
+
+
+def build_summary(rows, date_filter_start, date_filter_end):
+    """Summary dict from per-category (category, expenses, income, total) rows in paise."""
+    # Rollups are in paise; sum exactly, then convert once.
+    expenses = from_minor(sum(row[1] for row in rows))
+    income = from_minor(sum(row[2] for row in rows))
+    total = from_minor(sum(row[3] for row in rows))
+    category_breakdown = {row[0]: from_minor(row[3]) for row in rows}
+
+    days_in_period = (date_filter_end - date_filter_start).days
+    avg_daily = expenses / days_in_period if days_in_period > 0 else 0
+    top_category = max(category_breakdown, key=category_breakdown.get) if category_breakdown else None
+
+    return {
+        'total': total,
+        'expenses': expenses,
+        'income': income,
+        'net': income - expenses,
+        'breakdown': category_breakdown,
+        'avg_daily': avg_daily,
+        'top_category': top_category,
+        'start_date': date_filter_start.date(),
+        'end_date': (date_filter_end - timedelta(days=1)).date()
+    }
+
+
+def get_summary(user_id, period='month', unnecessary_only=False, start_date=None, end_date=None, tx_type=None):
+    """Fetch expense summary for a period."""
+    date_filter_start, date_filter_end = resolve_period(period, start_date, end_date)
+
+    cache_key = summary_cache.cache.key(
+        user_id, date_filter_start.date(), date_filter_end.date(), unnecessary_only, tx_type
+    )
+    with Session(engine_for(user_id)) as session:
+        # Read first: a write that lands during the query bumps it past
+        # what the entry is stored under, so the entry is never served.
+        generation = summary_cache.read_generation(session, user_id)
+        cached = summary_cache.cache.get(cache_key, generation)
+        if cached is not None:
+            return cached
+
+        # Read the daily rollups rather than every raw transaction in the range.
+        statement = rollups.summary_statement(user_id, date_filter_start, date_filter_end, unnecessary_only, tx_type)
+        rows = session.exec(statement).all()
+
+    summary = build_summary(rows, date_filter_start, date_filter_end)
+    summary_cache.cache.put(cache_key, summary, generation)
+    return summary